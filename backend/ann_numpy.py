@@ -0,0 +1,129 @@
+"""
+Pure-NumPy inference for the satisfaction ANN
+Exports the trained Keras model as plain weight arrays (BatchNormalization
+folded into the following Dense layer, Dropout dropped) so the API can serve
+it without importing TensorFlow.
+
+Export from an existing model (from backend/):
+    python ann_numpy.py
+"""
+import numpy as np
+
+ANN_MODEL_PATH = 'models/ann_model.keras'
+ANN_WEIGHTS_PATH = 'models/ann_weights.npz'
+
+ACTIVATIONS = {
+    'linear': lambda z: z,
+    'relu': lambda z: np.maximum(z, 0, out=z),
+}
+
+
+def fold_batchnorm(model) -> list:
+    """
+    Flatten a Dense/BatchNormalization/Dropout stack into (W, b, activation)
+    triples. BatchNormalization at inference is the affine map
+    x * s + t, with s = gamma / sqrt(var + eps) and t = beta - mean * s,
+    so it folds exactly into the next Dense layer:
+    W' = s[:, None] * W and b' = t @ W + b.
+    """
+    layers = []
+    pending = None  # (s, t) from a BatchNormalization waiting for its Dense
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dense':
+            W, b = (w.astype(np.float64) for w in layer.get_weights())
+            if pending is not None:
+                s, t = pending
+                W, b = s[:, None] * W, t @ W + b
+                pending = None
+            activation = layer.get_config()['activation']
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation '{activation}' in layer {layer.name}")
+            layers.append((W, b, activation))
+        elif kind == 'BatchNormalization':
+            config = layer.get_config()
+            weights = [w.astype(np.float64) for w in layer.get_weights()]
+            gamma = weights.pop(0) if config.get('scale', True) else 1.0
+            beta = weights.pop(0) if config.get('center', True) else 0.0
+            mean, var = weights
+            s = gamma / np.sqrt(var + config['epsilon'])
+            t = beta - mean * s
+            if pending is not None:
+                s, t = pending[0] * s, pending[1] * s + t
+            pending = (s, t)
+        elif kind in ('Dropout', 'InputLayer'):
+            continue
+        else:
+            raise ValueError(f"Unsupported layer type {kind} ({layer.name})")
+    if pending is not None:
+        raise ValueError("BatchNormalization must be followed by a Dense layer to be folded")
+    return layers
+
+
+class NumpyANN:
+    """Forward pass over folded Dense layers; mirrors keras.Model.predict's interface."""
+
+    def __init__(self, layers: list):
+        self.layers = [(W.astype(np.float32), b.astype(np.float32), activation) for W, b, activation in layers]
+
+    @classmethod
+    def load(cls, path: str = ANN_WEIGHTS_PATH) -> "NumpyANN":
+        with np.load(path) as data:
+            activations = [str(a) for a in data['activations']]
+            layers = [(data[f'W{i}'], data[f'b{i}'], activation) for i, activation in enumerate(activations)]
+        return cls(layers)
+
+    def save(self, path: str = ANN_WEIGHTS_PATH):
+        arrays = {}
+        for i, (W, b, _) in enumerate(self.layers):
+            arrays[f'W{i}'] = W
+            arrays[f'b{i}'] = b
+        np.savez(path, activations=np.array([a for _, _, a in self.layers]), **arrays)
+
+    def predict(self, X, verbose=0) -> np.ndarray:
+        """Return predictions with shape (n_rows, n_outputs), like Keras."""
+        out = np.asarray(X, dtype=np.float32)
+        for W, b, activation in self.layers:
+            out = ACTIVATIONS[activation](out @ W + b)
+        return out
+
+
+def check_parity(keras_model, engine: NumpyANN, X: np.ndarray, atol: float = 1e-3) -> float:
+    """Compare the NumPy engine with Keras on X; raises if they disagree."""
+    expected = keras_model.predict(X, verbose=0)
+    actual = engine.predict(X)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if expected.shape != actual.shape or max_diff > atol:
+        raise AssertionError(f"NumPy ANN disagrees with Keras: max |diff| = {max_diff:.2e} (atol {atol:.0e})")
+    return max_diff
+
+
+def export_ann(keras_model, X_check: np.ndarray, path: str = ANN_WEIGHTS_PATH) -> float:
+    """Fold, verify parity on X_check, then write the weight arrays."""
+    engine = NumpyANN(fold_batchnorm(keras_model))
+    # Random inputs far outside the training range catch folding mistakes
+    # that well-behaved rows might hide
+    rng = np.random.default_rng(42)
+    X_check = np.vstack([X_check, rng.normal(0, 3, size=(256, X_check.shape[1]))])
+    max_diff = check_parity(keras_model, engine, X_check)
+    engine.save(path)
+    return max_diff
+
+
+if __name__ == "__main__":
+    import joblib
+    import pandas as pd
+    from tensorflow import keras
+
+    model = keras.models.load_model(ANN_MODEL_PATH)
+    scaler = joblib.load('models/ann_scaler.pkl')
+    features = joblib.load('models/ann_features.pkl')
+    users = pd.read_csv('data/users.csv')
+    products = pd.read_csv('data/products.csv')
+    # Random user x product pairs as realistic parity inputs
+    rows = pd.concat([
+        users.sample(512, replace=True, random_state=42).reset_index(drop=True),
+        products.sample(512, replace=True, random_state=42).reset_index(drop=True),
+    ], axis=1)
+    max_diff = export_ann(model, scaler.transform(rows[features].values))
+    print(f"[OK] Exported {ANN_WEIGHTS_PATH} (max |diff| vs Keras: {max_diff:.2e})")
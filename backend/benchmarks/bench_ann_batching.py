@@ -0,0 +1,99 @@
+"""
+Benchmark: ANN micro-batching vs one forward pass per request
+Drives the /predict/ann inference path (without HTTP) with N concurrent
+closed-loop clients and reports throughput and latency percentiles for
+both the per-request path and the coalescing MicroBatcher.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ann_batching --concurrency 1 8 32 128 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import main
+from inference_pool import InferencePool
+from micro_batcher import MicroBatcher
+
+
+def sample_rows(features: list, n: int, seed: int = 42) -> np.ndarray:
+    """Random user x product pairs in the ANN's feature order."""
+    rng = np.random.default_rng(seed)
+    users = pd.read_csv('data/users.csv')
+    products = pd.read_csv('data/products.csv')
+    pairs = pd.concat([
+        users.iloc[rng.integers(0, len(users), n)].reset_index(drop=True),
+        products.iloc[rng.integers(0, len(products), n)].reset_index(drop=True),
+    ], axis=1)
+    return pairs[features].to_numpy(dtype=float)
+
+
+async def drive(call, rows: np.ndarray, concurrency: int) -> dict:
+    """Send every row through `call` using `concurrency` closed-loop clients."""
+    latencies = []
+    next_row = iter(range(len(rows)))
+
+    async def client():
+        for i in next_row:
+            start = time.perf_counter()
+            await call(rows[i:i + 1])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "throughput_rps": round(len(rows) / elapsed, 1),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+async def run(args) -> list:
+    bundle = main.registry.current()
+    rows = sample_rows(bundle['ann_features'], args.requests)
+    report = []
+    for concurrency in args.concurrency:
+        pool = InferencePool(max_workers=args.workers, max_queue=max(args.concurrency))
+        per_request = await drive(lambda X: pool.run(main.run_ann, X, bundle), rows, concurrency)
+
+        batcher = MicroBatcher(main.run_ann, pool.run, max_rows=args.max_rows, max_wait_ms=args.window_ms)
+        batched = await drive(lambda X: batcher.submit(X, bundle), rows, concurrency)
+        pool.shutdown()
+
+        report.append({
+            "concurrency": concurrency,
+            "per_request": per_request,
+            "micro_batched": {**batched, "mean_batch_size": batcher.stats()["mean_batch_size"]},
+        })
+        print(f"c={concurrency:<4} per-request {per_request['throughput_rps']:>8} rps  p50 {per_request['p50_ms']:>8} ms  p99 {per_request['p99_ms']:>8} ms"
+              f"  |  batched {batched['throughput_rps']:>8} rps  p50 {batched['p50_ms']:>8} ms  p99 {batched['p99_ms']:>8} ms")
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64, 128])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--workers", type=int, default=1, help="inference pool threads")
+    parser.add_argument("--max-rows", type=int, default=64)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    main.load_models()
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "ann_batching", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
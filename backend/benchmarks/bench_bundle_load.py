@@ -0,0 +1,87 @@
+"""
+Benchmark: model load time and per-worker memory by artifact format
+Starts N worker processes at once; each loads all six models from
+  - legacy:       the individual models/*.pkl files
+  - bundle:       the CURRENT bundle, arrays copied into the process
+  - bundle_mmap:  the CURRENT bundle, arrays memory-mapped
+runs one prediction batch per model to fault the pages in, and reports
+load time plus RSS / PSS / USS (from /proc/self/smaps_rollup, Linux only)
+while all N workers are alive. PSS splits shared pages between the
+processes mapping them, so it is the per-worker cost that adds up.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_bundle_load --workers 1 4
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+CHILD = r'''
+import json, sys, time, warnings
+warnings.filterwarnings("ignore")
+import numpy as np
+from model_bundle import MODEL_ARTIFACTS, BundleSource, LegacySource, current_bundle_dir
+
+fmt = sys.argv[1]
+source = LegacySource() if fmt == "legacy" else BundleSource(current_bundle_dir(), mmap=fmt == "bundle_mmap")
+start = time.perf_counter()
+artifacts = {}
+for name in MODEL_ARTIFACTS:
+    artifacts.update(source.load(name))
+load_ms = (time.perf_counter() - start) * 1000
+
+rng = np.random.default_rng(0)
+for name in MODEL_ARTIFACTS:
+    X = rng.normal(size=(256, len(artifacts[f"{name}_features"])))
+    model = artifacts[name]
+    model.predict_proba(X) if hasattr(model, "predict_proba") else model.predict(X)
+
+memory = {}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        key, _, value = line.partition(":")
+        if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+            memory[key] = int(value.split()[0]) / 1024
+print(json.dumps({"load_ms": load_ms, "rss_mb": memory["Rss"], "pss_mb": memory["Pss"],
+                  "uss_mb": memory["Private_Clean"] + memory["Private_Dirty"]}), flush=True)
+sys.stdin.read()  # stay alive until every worker has reported
+'''
+
+
+def measure(fmt: str, workers: int) -> dict:
+    procs = [subprocess.Popen([sys.executable, "-c", CHILD, fmt], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+    try:
+        samples = [json.loads(proc.stdout.readline()) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return {key: round(float(np.mean([s[key] for s in samples])), 2) for key in samples[0]}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--formats", nargs="+", default=["legacy", "bundle", "bundle_mmap"])
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    report = []
+    for workers in args.workers:
+        for fmt in args.formats:
+            result = {"format": fmt, "workers": workers, **measure(fmt, workers)}
+            report.append(result)
+            print(f"{fmt:<12} workers={workers:<3} load {result['load_ms']:>8.1f} ms   "
+                  f"RSS {result['rss_mb']:>7.1f} MB   PSS {result['pss_mb']:>7.1f} MB   USS {result['uss_mb']:>7.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "bundle_load", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+"""
+Benchmark: NumPy random-forest engine vs scikit-learn predict_proba
+Times RandomForestClassifier.predict_proba (models/decision_tree.pkl) and
+the flattened NumpyForest (forest_numpy.py) on random in-domain rows at
+several batch sizes and on the /recommend/top-k workload (one profile x the
+whole product catalog). Every measurement first checks that both engines
+agree: probabilities to 1e-12 and identical predicted classes.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_forest --batch-sizes 1 8 64 512 4096
+"""
+import argparse
+import json
+import types
+import warnings
+
+import joblib
+import numpy as np
+
+from benchmarks.bench_models import time_step
+from benchmarks.payloads import PROFILE
+from catalog import ProductCatalog
+from forest_numpy import FOREST_MODEL_PATH, NumpyForest, check_parity
+from lookup_tables import FEATURE_RANGES
+
+warnings.filterwarnings("ignore")
+
+
+def catalog_rows(features: list) -> np.ndarray:
+    """One user profile against every product in data/products.csv."""
+    return ProductCatalog.load().feature_matrix(features, types.SimpleNamespace(**PROFILE))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 512, 4096])
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to repeat each measurement")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    forest = joblib.load(FOREST_MODEL_PATH)
+    features = joblib.load('models/decision_tree_features.pkl')
+    engine = NumpyForest.from_sklearn(forest)
+    print(f"{forest.n_estimators} trees, {engine.describe()['nodes']} nodes, max depth {engine.max_depth}")
+
+    rng = np.random.default_rng(0)
+    workloads = [
+        (f"random x{n}", np.column_stack([rng.integers(*FEATURE_RANGES[f], endpoint=True, size=n) for f in features]).astype(float))
+        for n in args.batch_sizes
+    ]
+    try:
+        X_catalog = catalog_rows(features)
+        workloads.append((f"catalog x{len(X_catalog)}", X_catalog))
+    except FileNotFoundError:
+        print("data/products.csv not found; skipping the catalog workload")
+
+    report = []
+    for name, X in workloads:
+        max_diff = check_parity(forest, engine, X)
+        sklearn_ms = float(np.median(time_step(forest.predict_proba, X, args.min_time, 5)))
+        numpy_ms = float(np.median(time_step(engine.predict_proba, X, args.min_time, 5)))
+        result = {
+            "workload": name,
+            "rows": len(X),
+            "sklearn_ms": round(sklearn_ms, 4),
+            "numpy_ms": round(numpy_ms, 4),
+            "speedup": round(sklearn_ms / numpy_ms, 2),
+            "max_abs_diff": max_diff,
+        }
+        report.append(result)
+        print(f"{name:<16} sklearn {sklearn_ms:>10.3f} ms   numpy {numpy_ms:>10.3f} ms   "
+              f"x{result['speedup']:<7} parity OK (max |diff| {max_diff:.1e})", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "forest", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,77 @@
+"""
+Benchmark: KNN neighbour index backends, recall vs latency by training-set size
+For each size, draws rows over the KNN features' integer ranges (the same
+bounded grid the API accepts), standardizes them like knn_scaler, builds
+every backend from neighbor_index.py and measures
+  - build time
+  - single-query latency p50 / p99 (one row per call, like /predict/knn)
+  - recall@k against brute force (ties count as hits, see recall_at_k)
+
+Usage (from backend/):
+    python -m benchmarks.bench_knn_index --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from lookup_tables import FEATURE_RANGES
+from neighbor_index import make_index, recall_at_k
+
+KNN_FEATURES = ['age', 'oil_production', 'hydration_level', 'sensitivity_level', 'pore_size', 'wrinkle_score']
+
+
+def sample_rows(n: int, rng) -> np.ndarray:
+    return np.column_stack([rng.integers(FEATURE_RANGES[f][0], FEATURE_RANGES[f][1] + 1, n)
+                            for f in KNN_FEATURES]).astype(float)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--indexes", nargs="+", default=["brute", "kd_tree", "ball_tree", "lsh", "ivf"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=11, help="neighbours per query (the trained model uses 11)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    for size in args.sizes:
+        X = sample_rows(size, rng)
+        mean, std = X.mean(axis=0), X.std(axis=0)
+        X = (X - mean) / std
+        Q = (sample_rows(args.queries, rng) - mean) / std
+        exact_dist = make_index('brute').fit(X).kneighbors(Q, args.k)[0]
+
+        for kind in args.indexes:
+            start = time.perf_counter()
+            index = make_index(kind).fit(X)
+            build_s = time.perf_counter() - start
+
+            latencies, found = [], []
+            for q in Q:
+                start = time.perf_counter()
+                dist, _ = index.kneighbors(q[None, :], args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found.append(dist[0])
+            result = {
+                "rows": size,
+                **index.describe(),
+                "build_s": round(build_s, 3),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                "recall": round(recall_at_k(np.array(found), exact_dist), 4),
+            }
+            report.append(result)
+            print(f"rows={size:<8} {kind:<10} build {build_s:>7.2f} s   p50 {result['p50_ms']:>8.3f} ms   "
+                  f"p99 {result['p99_ms']:>8.3f} ms   recall@{args.k} {result['recall']:.4f}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "knn_index", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,198 @@
+"""
+Benchmark: API load test, throughput and latency per endpoint
+Replays request bodies built from real rows of data/users.csv and
+data/products.csv (so profiles follow the generated distributions and repeat
+the way returning users do) against every /predict/* endpoint with N
+concurrent closed-loop clients, and reports requests per second, p50 / p95 /
+p99 latency and errors per endpoint and concurrency level.
+
+The API runs in-process (ASGI, no sockets: measures the app itself), in a
+local uvicorn started for the run, or is an already running server (--url).
+Results are saved as JSON with the git commit they were measured on;
+--compare prints the change against an earlier result file.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_load --target uvicorn --concurrency 1 8 32 --requests 500 --output load.json
+    python -m benchmarks.bench_load --target uvicorn --compare load.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_startup import free_port, request
+from benchmarks.payloads import EXAMPLE_PAYLOADS
+
+PREDICT_ENDPOINTS = [path for path in EXAMPLE_PAYLOADS if path.startswith("/predict/")]
+
+
+def sample_bodies(path: str, n: int, seed: int = 42) -> list:
+    """n request bodies for `path` from random user x product pairs."""
+    rng = np.random.default_rng(seed)
+    users = pd.read_csv('data/users.csv')
+    products = pd.read_csv('data/products.csv')
+    pairs = pd.concat([
+        users.iloc[rng.integers(0, len(users), n)].reset_index(drop=True),
+        products.iloc[rng.integers(0, len(products), n)].reset_index(drop=True),
+    ], axis=1)
+    fields = list(EXAMPLE_PAYLOADS[path])
+    return [dict(zip(fields, map(int, row))) for row in pairs[fields].itertuples(index=False)]
+
+
+async def drive(client: httpx.AsyncClient, path: str, bodies: list, concurrency: int) -> dict:
+    """Send every body to `path` using `concurrency` closed-loop clients."""
+    latencies = []
+    errors = {}
+    next_body = iter(bodies)
+
+    async def worker():
+        for body in next_body:
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "errors": errors,
+    }
+
+
+async def run(client: httpx.AsyncClient, args) -> list:
+    report = []
+    for path in args.endpoints:
+        # Warm-up: loads the model and fills the connection pool
+        await drive(client, path, sample_bodies(path, args.warmup, args.seed - 1), max(args.concurrency))
+        for level, concurrency in enumerate(args.concurrency):
+            # A fresh sample per level, so later levels do not just hit the prediction cache
+            bodies = sample_bodies(path, args.requests, args.seed + level)
+            result = {"endpoint": path, "concurrency": concurrency, **await drive(client, path, bodies, concurrency)}
+            report.append(result)
+            errors = sum(result["errors"].values())
+            print(f"{path:<28} c={concurrency:<4} {result['throughput_rps']:>9} rps   p50 {result['p50_ms']:>8} ms   "
+                  f"p95 {result['p95_ms']:>8} ms   p99 {result['p99_ms']:>8} ms" + (f"   errors {errors}" if errors else ""), flush=True)
+    return report
+
+
+async def run_in_process(args) -> list:
+    import main
+    # Runs the startup / shutdown handlers (model warm-up, pools) like uvicorn would
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run(client, args)
+
+
+async def run_against(base_url: str, args) -> list:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        return await run(client, args)
+
+
+def start_uvicorn():
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    while True:
+        try:
+            request(f"{base}/health")
+            return server, base
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before /health answered")
+            time.sleep(0.05)
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: list, baseline_path: str):
+    """Print throughput and p99 change per endpoint / concurrency against an earlier run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    for result in report:
+        old = before.get((result["endpoint"], result["concurrency"]))
+        if old is None:
+            continue
+        rps = (result["throughput_rps"] / old["throughput_rps"] - 1) * 100
+        p99 = (result["p99_ms"] / old["p99_ms"] - 1) * 100
+        print(f"{result['endpoint']:<28} c={result['concurrency']:<4} rps {rps:+7.1f}%   p99 {p99:+7.1f}%")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=["in-process", "uvicorn"], default="in-process")
+    parser.add_argument("--url", help="benchmark an already running server instead (overrides --target)")
+    parser.add_argument("--endpoints", nargs="+", default=PREDICT_ENDPOINTS, choices=list(EXAMPLE_PAYLOADS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint per concurrency level")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint")
+    parser.add_argument("--seed", type=int, default=42, help="seed for sampling users and products")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    if args.url:
+        target = args.url
+        report = asyncio.run(run_against(args.url, args))
+    elif args.target == "uvicorn":
+        target = "uvicorn"
+        server, base = start_uvicorn()
+        try:
+            report = asyncio.run(run_against(base, args))
+        finally:
+            server.terminate()
+            server.wait()
+    else:
+        target = "in-process"
+        report = asyncio.run(run_in_process(args))
+
+    if args.compare:
+        compare(report, args.compare)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "benchmark": "load",
+                "commit": git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "target": target,
+                "cpu_count": os.cpu_count(),
+                "args": vars(args),
+                "results": report,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
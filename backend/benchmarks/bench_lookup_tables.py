@@ -0,0 +1,88 @@
+"""
+Benchmark: precomputed lookup tables vs live scaler + model inference
+For every model in the CURRENT bundle that ships a <model>_lookup table,
+draws random in-domain rows and times model_outputs() with and without
+the table at several batch sizes. Also checks that both paths agree on
+every row (labels exactly, probabilities / regression outputs to 1e-9).
+
+Usage (from backend/, after training or `python model_bundle.py`):
+    python -m benchmarks.bench_lookup_tables --batch-sizes 1 64 1024
+"""
+import argparse
+import json
+import time
+import warnings
+
+import numpy as np
+
+from lookup_tables import FEATURE_RANGES, model_outputs
+from model_bundle import MODEL_ARTIFACTS, BundleSource, current_bundle_dir
+
+warnings.filterwarnings("ignore")
+
+
+def random_rows(features: list, n: int, rng) -> np.ndarray:
+    return np.column_stack([rng.integers(FEATURE_RANGES[f][0], FEATURE_RANGES[f][1] + 1, n) for f in features]).astype(float)
+
+
+def time_call(fn, repeats: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    path = current_bundle_dir()
+    if path is None:
+        raise SystemExit("No CURRENT bundle; run `python model_bundle.py` first")
+    source = BundleSource(path)
+    rng = np.random.default_rng(0)
+
+    report = []
+    for name in MODEL_ARTIFACTS:
+        group = source.load(name)
+        table = group.get(f'{name}_lookup')
+        if table is None:
+            continue
+        model, scaler = group[name], group.get(f'{name}_scaler')
+        with_proba = table.probabilities is not None
+
+        # Parity over the whole domain
+        idx = np.arange(table.n_rows)
+        grid = np.column_stack(np.unravel_index(idx, table.sizes)) + table.lows
+        live_pred, live_proba = model_outputs(grid, model, scaler, None, with_proba)
+        table_pred, table_proba = model_outputs(grid, model, scaler, table, with_proba)
+        if with_proba:
+            assert np.array_equal(live_pred, table_pred), f"{name}: labels differ"
+            assert np.allclose(live_proba, table_proba, atol=1e-9), f"{name}: probabilities differ"
+        else:
+            assert np.allclose(live_pred, table_pred, atol=1e-9), f"{name}: predictions differ"
+
+        for batch_size in args.batch_sizes:
+            X = random_rows(table.features, batch_size, rng)
+            live_ms = time_call(lambda: model_outputs(X, model, scaler, None, with_proba), args.repeats)
+            table_ms = time_call(lambda: model_outputs(X, model, scaler, table, with_proba), args.repeats)
+            result = {"model": name, "domain_rows": table.n_rows, "batch_size": batch_size,
+                      "live_ms": round(live_ms, 4), "table_ms": round(table_ms, 4),
+                      "speedup": round(live_ms / table_ms, 1)}
+            report.append(result)
+            print(f"{name:<18} batch={batch_size:<5} live {live_ms:>9.3f} ms   "
+                  f"table {table_ms:>7.3f} ms   x{result['speedup']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "lookup_tables", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
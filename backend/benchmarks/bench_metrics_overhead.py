@@ -0,0 +1,87 @@
+"""
+Benchmark: request latency with and without metrics
+Starts `uvicorn main:app` once with METRICS_ENABLED=1 and once with
+METRICS_ENABLED=0 and sends the same warm requests to every /predict/*
+endpoint, alternating between the two servers request by request so drift
+hits both alike. Reports p50 / p99 per endpoint and the relative overhead of
+instrumentation.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_metrics_overhead --requests 500 --rounds 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_startup import free_port, request
+from benchmarks.payloads import EXAMPLE_PAYLOADS
+
+
+def start_server(metrics_enabled: str):
+    port = free_port()
+    env = {**os.environ, "METRICS_ENABLED": metrics_enabled, "MODEL_WARMUP": "1"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            request(f"{base}/health")
+            break
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before /health answered")
+            time.sleep(0.05)
+    # First request per endpoint loads the model (if warm-up has not yet)
+    for path, body in EXAMPLE_PAYLOADS.items():
+        request(base + path, body)
+    return server, base
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    servers = {mode: start_server(flag) for mode, flag in (("metrics", "1"), ("no_metrics", "0"))}
+    samples = {mode: {path: [] for path in EXAMPLE_PAYLOADS} for mode in servers}
+    try:
+        for _ in range(args.rounds):
+            for path, body in EXAMPLE_PAYLOADS.items():
+                for _ in range(args.requests):
+                    for mode, (_, base) in servers.items():
+                        samples[mode][path].append(request(base + path, body))
+    finally:
+        for server, _ in servers.values():
+            server.terminate()
+            server.wait()
+
+    report = {}
+    for path in EXAMPLE_PAYLOADS:
+        on, off = np.array(samples["metrics"][path]), np.array(samples["no_metrics"][path])
+        result = {
+            "metrics_p50_ms": round(float(np.percentile(on, 50)), 4),
+            "metrics_p99_ms": round(float(np.percentile(on, 99)), 4),
+            "no_metrics_p50_ms": round(float(np.percentile(off, 50)), 4),
+            "no_metrics_p99_ms": round(float(np.percentile(off, 99)), 4),
+        }
+        result["p50_overhead_pct"] = round((result["metrics_p50_ms"] / result["no_metrics_p50_ms"] - 1) * 100, 2)
+        report[path] = result
+        print(f"{path:<28} p50 {result['no_metrics_p50_ms']:>8.3f} -> {result['metrics_p50_ms']:>8.3f} ms "
+              f"({result['p50_overhead_pct']:+.2f}%)   p99 {result['no_metrics_p99_ms']:>8.3f} -> {result['metrics_p99_ms']:>8.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "metrics_overhead", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
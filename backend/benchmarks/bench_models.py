@@ -0,0 +1,188 @@
+"""
+Benchmark: per-model inference cost without HTTP
+Loads every model from models/ (or a bundle) and times each inference step
+the API runs on its own (scaler transform, Ridge predict, Naive Bayes and
+SVM predict_proba with Platt scaling, KNN neighbour search, random-forest
+predict_proba over all trees, ANN forward pass) at batch sizes 1, 8, 64, 512
+and 4096. Reports median latency, per-row cost, throughput and the peak
+memory NumPy allocates during a call (tracemalloc; libsvm's own buffers are
+not traced), plus the memory each model's arrays hold.
+
+--save-baseline stores the results; --baseline compares a later run against
+them and exits with status 1 if any step got slower than --tolerance.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_models --save-baseline model_baseline.json
+    python -m benchmarks.bench_models --baseline model_baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from lookup_tables import FEATURE_RANGES
+from model_bundle import MODEL_ARTIFACTS, BundleSource, LegacySource, current_bundle_dir
+
+warnings.filterwarnings("ignore")
+
+BATCH_SIZES = [1, 8, 64, 512, 4096]
+
+
+def inference_steps(name: str, group: dict) -> dict:
+    """{step: fn(X)} for one model; X is raw features, scaled first where the API scales."""
+    model = group[name]
+    scaler = group.get(f'{name}_scaler')
+    scaled = scaler.transform if scaler is not None else (lambda X: X)
+    steps = {}
+    if scaler is not None:
+        steps['scale'] = scaler.transform
+    if name == 'linear_regression':
+        steps['predict'] = lambda X: model.predict(scaled(X))
+    elif name == 'knn':
+        steps['kneighbors'] = lambda X: model.kneighbors(scaled(X))
+        steps['predict_proba'] = lambda X: model.predict_proba(scaled(X))
+    elif name == 'ann':
+        steps['predict'] = lambda X: model.predict(scaled(X), verbose=0)
+    else:
+        steps['predict_proba'] = lambda X: model.predict_proba(scaled(X))
+    return steps
+
+
+def array_bytes(obj, seen=None) -> int:
+    """Bytes held by the NumPy arrays reachable from obj's attributes."""
+    # Maps id -> object: keeping __getstate__ temporaries alive stops their ids being reused
+    seen = {} if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(array_bytes(item, seen) for item in obj)
+    if isinstance(obj, dict):
+        return sum(array_bytes(item, seen) for item in obj.values())
+    if hasattr(obj, '__dict__'):
+        return array_bytes(vars(obj), seen)
+    if hasattr(obj, '__getstate__') and type(obj).__module__.startswith('sklearn'):
+        # Cython trees keep their node arrays in __getstate__
+        return array_bytes(obj.__getstate__(), seen)
+    return 0
+
+
+def time_step(fn, X: np.ndarray, min_time: float, min_repeats: int) -> list:
+    """Wall times of fn(X) in ms, repeated for min_time seconds and at least min_repeats times."""
+    fn(X)
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_repeats or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def peak_alloc(fn, X: np.ndarray) -> int:
+    """Peak bytes traced by tracemalloc during one fn(X)."""
+    tracemalloc.start()
+    try:
+        fn(X)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare(report: list, baseline_path: str, tolerance: float, floor_ms: float) -> list:
+    """Steps whose median latency grew by more than tolerance (and floor_ms) against the baseline."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["model"], r["step"], r["batch_size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report:
+        old = before.get((result["model"], result["step"], result["batch_size"]))
+        if old is None:
+            continue
+        change = result["median_ms"] / old["median_ms"] - 1
+        result["baseline_median_ms"] = old["median_ms"]
+        result["change"] = round(change, 4)
+        if change > tolerance and result["median_ms"] - old["median_ms"] > floor_ms:
+            regressions.append(result)
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", default=list(MODEL_ARTIFACTS), choices=list(MODEL_ARTIFACTS))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--source", choices=["legacy", "bundle"], default="legacy",
+                        help="models/*.pkl (default) or the CURRENT bundle")
+    parser.add_argument("--ann-backend", choices=["numpy", "keras"], default="numpy")
+    parser.add_argument("--forest-backend", choices=["numpy", "sklearn"], default="numpy")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to repeat each measurement")
+    parser.add_argument("--min-repeats", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--save-baseline", help="write results as the baseline to this path")
+    parser.add_argument("--baseline", help="baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--floor-ms", type=float, default=0.02, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    if args.source == "bundle":
+        path = current_bundle_dir()
+        if path is None:
+            raise SystemExit("No CURRENT bundle; run `python model_bundle.py` first")
+        source = BundleSource(path)
+    else:
+        source = LegacySource(ann_backend=args.ann_backend, forest_backend=args.forest_backend)
+    rng = np.random.default_rng(0)
+
+    report = []
+    for name in args.models:
+        group = source.load(name)
+        features = group[f'{name}_features']
+        model_mb = array_bytes([group[name], group.get(f'{name}_scaler')]) / 2**20
+        X_all = np.column_stack([rng.integers(*FEATURE_RANGES[f], endpoint=True, size=max(args.batch_sizes))
+                                 for f in features]).astype(float)
+        print(f"\n{name} ({type(group[name]).__name__}, arrays {model_mb:.2f} MB)")
+        for step, fn in inference_steps(name, group).items():
+            for batch_size in args.batch_sizes:
+                X = X_all[:batch_size]
+                samples = time_step(fn, X, args.min_time, args.min_repeats)
+                median = float(np.median(samples))
+                result = {
+                    "model": name,
+                    "step": step,
+                    "batch_size": batch_size,
+                    "median_ms": round(median, 4),
+                    "p99_ms": round(float(np.percentile(samples, 99)), 4),
+                    "per_row_us": round(median * 1000 / batch_size, 3),
+                    "rows_per_s": round(batch_size / median * 1000, 1),
+                    "peak_alloc_kb": round(peak_alloc(fn, X) / 1024, 1),
+                    "model_mb": round(model_mb, 3),
+                    "repeats": len(samples),
+                }
+                report.append(result)
+                print(f"  {step:<14} batch {batch_size:>5}   {result['median_ms']:>10.4f} ms   {result['per_row_us']:>10.3f} us/row   "
+                      f"{result['rows_per_s']:>12.1f} rows/s   peak {result['peak_alloc_kb']:>10.1f} KB", flush=True)
+
+    regressions = []
+    if args.baseline:
+        regressions = compare(report, args.baseline, args.tolerance, args.floor_ms)
+        print(f"\nvs baseline {args.baseline}: {len(regressions)} regression(s) over {args.tolerance:.0%}")
+        for result in regressions:
+            print(f"  REGRESSION {result['model']:<18} {result['step']:<14} batch {result['batch_size']:>5}   "
+                  f"{result['baseline_median_ms']:.4f} -> {result['median_ms']:.4f} ms ({result['change']:+.1%})")
+
+    document = {"benchmark": "models", "source": source.describe(), "args": vars(args), "results": report}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(document, f, indent=2)
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
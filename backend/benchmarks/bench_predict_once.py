@@ -0,0 +1,90 @@
+"""
+Benchmark: predict + predict_proba vs one predict_proba pass per endpoint
+For every classifier endpoint, times the model call as the endpoints used to
+make it (scaler, predict, then predict_proba over the same rows) against
+lookup_tables.predict_outputs (scaler, predict_proba once, labels by argmax),
+at several batch sizes. Also counts how often the two disagree on the label
+over random in-domain rows: only SVC(probability=True) can, because its
+predict uses the decision function and its probabilities are Platt-scaled.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_predict_once --batch-sizes 1 64 500
+"""
+import argparse
+import json
+import warnings
+
+import numpy as np
+
+from benchmarks.bench_models import time_step
+from lookup_tables import FEATURE_RANGES, predict_outputs
+from model_bundle import LegacySource
+
+warnings.filterwarnings("ignore")
+
+# Endpoint -> model whose predict / predict_proba it called back to back
+ENDPOINTS = {
+    "/predict/naive-bayes": 'naive_bayes',
+    "/predict/knn": 'knn',
+    "/predict/svm": 'svm',
+    "/predict/decision-tree": 'decision_tree',
+}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 500])
+    parser.add_argument("--agreement-rows", type=int, default=20000, help="random rows for the label agreement check")
+    parser.add_argument("--forest-backend", choices=["numpy", "sklearn"], default="numpy")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to repeat each measurement")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    source = LegacySource(forest_backend=args.forest_backend)
+    rng = np.random.default_rng(0)
+
+    report = []
+    for endpoint, name in ENDPOINTS.items():
+        group = source.load(name)
+        model, scaler = group[name], group.get(f'{name}_scaler')
+        scale = scaler.transform if scaler is not None else (lambda X: X)
+
+        def two_passes(X):
+            X = scale(X)
+            return model.predict(X), model.predict_proba(X)
+
+        def one_pass(X):
+            return predict_outputs(model, scale(X))
+
+        features = group[f'{name}_features']
+        X_all = np.column_stack([rng.integers(*FEATURE_RANGES[f], endpoint=True, size=max(args.agreement_rows, *args.batch_sizes))
+                                 for f in features]).astype(float)
+        X_check = X_all[:args.agreement_rows]
+        disagree = int(np.sum(two_passes(X_check)[0] != one_pass(X_check)[0]))
+        print(f"\n{endpoint} ({type(model).__name__}): labels differ on {disagree} of {len(X_check)} random rows")
+
+        for batch_size in args.batch_sizes:
+            X = X_all[:batch_size]
+            before = float(np.median(time_step(two_passes, X, args.min_time, 5)))
+            after = float(np.median(time_step(one_pass, X, args.min_time, 5)))
+            result = {
+                "endpoint": endpoint,
+                "model": name,
+                "batch_size": batch_size,
+                "two_passes_ms": round(before, 4),
+                "one_pass_ms": round(after, 4),
+                "saved_pct": round((1 - after / before) * 100, 1),
+                "label_disagreements": disagree,
+                "agreement_rows": len(X_check),
+            }
+            report.append(result)
+            print(f"  batch {batch_size:>5}   predict + predict_proba {before:>9.3f} ms   "
+                  f"predict_proba once {after:>9.3f} ms   saved {result['saved_pct']:>5.1f}%", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "predict_once", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
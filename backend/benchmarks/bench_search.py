@@ -0,0 +1,64 @@
+"""
+Benchmark: hyperparameter search strategies, training time vs model quality
+Trains each model with every strategy from hyperparameter_search.py and
+reports wall / CPU seconds, CV fits, the best CV score and the held-out
+test score. Models are written to a temporary directory, so models/ is
+left untouched.
+
+Usage (from backend/, after generate_data.py):
+    python -m benchmarks.bench_search --models svm knn decision_tree --budget 60
+"""
+import argparse
+import json
+import os
+import tempfile
+import warnings
+
+warnings.filterwarnings("ignore")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", default=["linear_regression", "naive_bayes", "knn", "svm", "decision_tree"])
+    parser.add_argument("--strategies", nargs="+", default=["grid", "halving", "random"])
+    parser.add_argument("--budget", type=float, help="seconds per model for random search (default: 20 candidates)")
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    # Imported here: train_models pulls in TensorFlow
+    import train_models
+    data = train_models.load_training_data()
+
+    report = []
+    backend_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.makedirs(os.path.join(scratch, 'models'))
+        os.chdir(scratch)
+        try:
+            for name in args.models:
+                for strategy in args.strategies:
+                    options = {"strategy": strategy, "budget_seconds": args.budget if strategy == 'random' else None}
+                    _, metrics = train_models.run_trainer(name, args.n_jobs, options, data)
+                    result = {
+                        "model": name,
+                        "strategy": strategy,
+                        **metrics["training"],
+                        "fits": metrics["search"]["fits"],
+                        "best_cv_score": metrics["search"]["best_score"],
+                        "test_score": metrics.get("test_acc", metrics.get("test_r2")),
+                        "best_params": metrics.get("best_params"),
+                    }
+                    report.append(result)
+                    print(f"{name:<18} {strategy:<8} wall {result['wall_seconds']:>8.1f} s   cpu {result['cpu_seconds']:>8.1f} s   "
+                          f"fits {result['fits']:>4}   CV {result['best_cv_score']:.4f}   test {result['test_score']:.4f}", flush=True)
+        finally:
+            os.chdir(backend_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "search", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,134 @@
+"""
+Benchmark: per-request CPU spent on validation and JSON serialization
+Drives the app in-process through raw ASGI calls (no HTTP client, no
+sockets) with request bodies whose predictions are already cached, so what
+is left per request is routing, body parsing, pydantic validation and
+response encoding. Reports the median process CPU time per request for
+every /predict/* endpoint in the full and ?compact=true forms (alternating
+request by request), and the cost of encoding the same full body the way
+FastAPI does for a returned dict (jsonable_encoder, then json.dumps) against
+one FastJSONResponse pass with the standard library and with orjson.
+
+JSON_RESPONSE=json runs the API with the standard-library encoder.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_serialization --requests 2000
+    JSON_RESPONSE=json python -m benchmarks.bench_serialization --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import warnings
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.bench_load import PREDICT_ENDPOINTS, sample_bodies
+from json_response import json_encoder, orjson
+
+warnings.filterwarnings("ignore")
+
+
+async def asgi_post(app, path: str, query: bytes, body: bytes):
+    """One POST straight into the ASGI app; returns (status, response body)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    sent = []
+    request = {"type": "http.request", "body": body, "more_body": False}
+
+    async def receive():
+        return request
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+async def cpu_per_request(app, path: str, queries: list, bodies: list, n: int) -> list:
+    """
+    Median process CPU microseconds per request for each query string,
+    alternating between them request by request so drift hits all alike.
+    """
+    samples = [[] for _ in queries]
+    for i in range(n):
+        for query, times in zip(queries, samples):
+            start = time.process_time()
+            status, _ = await asgi_post(app, path, query, bodies[i % len(bodies)])
+            times.append(time.process_time() - start)
+            if status != 200:
+                raise RuntimeError(f"{path} answered {status}")
+    return [statistics.median(times) * 1e6 for times in samples]
+
+
+def encode_us(fn, repeats: int) -> float:
+    """Wall microseconds per call of fn, best of 5 runs of `repeats` calls."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / repeats * 1e6
+
+
+async def run(args) -> list:
+    import main
+    report = []
+    async with main.app.router.lifespan_context(main.app):
+        for path in args.endpoints:
+            bodies = [json.dumps(body).encode() for body in sample_bodies(path, args.distinct, args.seed)]
+            # Warm-up: loads the model and caches every body's prediction
+            await cpu_per_request(main.app, path, [b""], bodies, len(bodies))
+            full_cpu, compact_cpu = await cpu_per_request(main.app, path, [b"", b"compact=true"], bodies, args.requests)
+
+            _, full_body = await asgi_post(main.app, path, b"", bodies[0])
+            _, compact_body = await asgi_post(main.app, path, b"compact=true", bodies[0])
+            content = json.loads(full_body)
+            result = {
+                "endpoint": path,
+                "cpu_us": round(full_cpu, 1),
+                "compact_cpu_us": round(compact_cpu, 1),
+                "compact_saved_us": round(full_cpu - compact_cpu, 1),
+                "bytes": len(full_body),
+                "compact_bytes": len(compact_body),
+                # Encoding alone: a returned dict (two passes) vs FastJSONResponse
+                "dict_encode_us": round(encode_us(lambda: JSONResponse(jsonable_encoder(content)), args.encode_repeats), 2),
+                "json_encode_us": round(encode_us(lambda: JSONResponse(content), args.encode_repeats), 2),
+                "orjson_encode_us": round(encode_us(lambda: orjson.dumps(content), args.encode_repeats), 2) if orjson else None,
+            }
+            report.append(result)
+            orjson_us = f"{result['orjson_encode_us']:>6} us" if orjson else "   n/a"
+            print(f"{path:<28} CPU/request {full_cpu:>7.1f} us   compact {compact_cpu:>7.1f} us "
+                  f"({result['bytes']} -> {result['compact_bytes']} bytes)   encode: dict {result['dict_encode_us']:>6} us   "
+                  f"json {result['json_encode_us']:>6} us   orjson {orjson_us}", flush=True)
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--endpoints", nargs="+", default=PREDICT_ENDPOINTS, choices=PREDICT_ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per endpoint and form")
+    parser.add_argument("--distinct", type=int, default=200, help="distinct request bodies per endpoint")
+    parser.add_argument("--encode-repeats", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42, help="seed for sampling users and products")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    print(f"API encoder: {json_encoder()}")
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "serialization", "encoder": json_encoder(), "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
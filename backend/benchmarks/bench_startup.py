@@ -0,0 +1,102 @@
+"""
+Benchmark: API cold start
+Starts `uvicorn main:app` in a fresh process and measures
+  - import time of `main` (separate interpreter)
+  - time until /health first answers
+  - first request per /predict/* endpoint (includes lazy model loading)
+  - warm request latency per endpoint
+once with background warm-up and once purely lazy.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --warm-requests 50
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks.payloads import EXAMPLE_PAYLOADS
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url: str, body: dict = None) -> float:
+    """Send one request; returns latency in ms."""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=120) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_import(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def measure_server(env: dict, warm_requests: int) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                request(f"{base}/health")
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before /health answered")
+                time.sleep(0.01)
+        result = {"time_to_health_ms": round((time.perf_counter() - start) * 1000, 1), "endpoints": {}}
+
+        for path, body in EXAMPLE_PAYLOADS.items():
+            first = request(base + path, body)
+            warm = [request(base + path, body) for _ in range(warm_requests)]
+            result["endpoints"][path] = {
+                "first_request_ms": round(first, 2),
+                "warm_p50_ms": round(float(np.percentile(warm, 50)), 3),
+            }
+        result["time_to_all_warm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--warm-requests", type=int, default=50)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    report = {}
+    for mode, warmup in (("background_warmup", "1"), ("lazy", "0")):
+        env = {**os.environ, "MODEL_WARMUP": warmup}
+        report[mode] = {"import_ms": round(measure_import(env), 1), **measure_server(env, args.warm_requests)}
+        print(f"\n[{mode}] import {report[mode]['import_ms']} ms, /health after {report[mode]['time_to_health_ms']} ms")
+        for path, timings in report[mode]["endpoints"].items():
+            print(f"  {path:<28} first {timings['first_request_ms']:>9} ms   warm p50 {timings['warm_p50_ms']:>7} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "startup", "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
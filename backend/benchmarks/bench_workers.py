@@ -0,0 +1,177 @@
+"""
+Benchmark: memory per worker and throughput scaling, serve.py vs uvicorn --workers
+Starts the API with 1..N worker processes, either as `python serve.py`
+(models loaded once in the parent, workers forked after) or as `uvicorn
+main:app --workers N` (every worker imports and loads on its own). For each
+worker count it reports the time until every worker answers /health as
+ready, requests per second on a few /predict/* endpoints with closed-loop
+clients, and, once the load has run, RSS / PSS / USS of every process of the
+server (/proc/<pid>/smaps_rollup, Linux only). PSS splits shared pages
+between the processes mapping them, so the sum over the server is what it
+really costs; USS is what each worker holds on its own.
+
+The prediction cache is off by default (--cache-size) so every request runs
+its model; /predict/ann requests are still coalesced by each worker's ANN
+micro-batcher, as in production. The load generator runs in this process:
+on a small machine it competes with the workers for the same cores.
+
+Usage (from backend/, after training):
+    python -m benchmarks.bench_workers --workers 1 2 4 --output workers.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_load import drive, sample_bodies
+from benchmarks.bench_startup import free_port
+
+ENDPOINTS = ["/predict/knn", "/predict/decision-tree", "/predict/ann", "/predict/all"]
+
+
+def process_tree(root: int) -> list:
+    """root and all of its descendants, from the parent pids in /proc/<pid>/stat."""
+    parent = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; fields after it are fixed
+                    parent[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError):
+                continue
+    tree = [root]
+    for pid in tree:
+        tree.extend(child for child, ppid in parent.items() if ppid == pid)
+    return tree
+
+
+def memory_mb(pid: int) -> dict:
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                memory[key] = int(value.split()[0]) / 1024
+    return {"rss_mb": memory["Rss"], "pss_mb": memory["Pss"], "uss_mb": memory["Private_Clean"] + memory["Private_Dirty"]}
+
+
+def start_server(mode: str, workers: int, env: dict):
+    port = free_port()
+    if mode == "serve":
+        cmd = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers), "--port", str(port),
+               "--log-level", "warning"]
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def wait_until_ready(server, base: str, workers: int, timeout: float = 300) -> float:
+    """Seconds until `workers` distinct worker pids have answered /health with every model ready."""
+    start = time.perf_counter()
+    ready = set()
+    while len(ready) < workers:
+        if server.poll() is not None:
+            raise RuntimeError("server exited before its workers were ready")
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(f"only {len(ready)} of {workers} workers ready after {timeout} s")
+        try:
+            with httpx.Client(timeout=10) as client:
+                health = client.get(f"{base}/health").json()
+            if health["ready"]:
+                ready.add(health["pid"])
+            else:
+                time.sleep(0.05)
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    return time.perf_counter() - start
+
+
+async def throughput(base: str, args, seed: int) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        results = {}
+        for path in args.endpoints:
+            await drive(client, path, sample_bodies(path, args.warmup, seed - 1), args.concurrency)
+            results[path] = await drive(client, path, sample_bodies(path, args.requests, seed), args.concurrency)
+        return results
+
+
+def measure(mode: str, workers: int, args) -> dict:
+    env = {
+        **os.environ,
+        "PREDICTION_CACHE_SIZE": str(args.cache_size),
+        # Same split of the cores between workers for both modes
+        "INFERENCE_WORKERS": os.getenv("INFERENCE_WORKERS", str(max(1, (os.cpu_count() or 1) // workers))),
+    }
+    server, base = start_server(mode, workers, env)
+    try:
+        ready_s = wait_until_ready(server, base, workers)
+        load = asyncio.run(throughput(base, args, args.seed + workers))
+        processes = [{"pid": pid, **memory_mb(pid)} for pid in process_tree(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    # uvicorn's supervisor and serve.py's parent do not serve requests;
+    # `uvicorn --workers 1` has no supervisor and serves from the root process
+    parent, children = (processes[0], processes[1:]) if len(processes) > 1 else (None, processes)
+    per_worker = lambda key: round(sum(p[key] for p in children) / len(children), 1)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "ready_s": round(ready_s, 2),
+        "total_pss_mb": round(sum(p["pss_mb"] for p in processes), 1),
+        "parent_pss_mb": round(parent["pss_mb"], 1) if parent else None,
+        "worker_pss_mb": per_worker("pss_mb"),
+        "worker_uss_mb": per_worker("uss_mb"),
+        "worker_rss_mb": per_worker("rss_mb"),
+        "processes": processes,
+        "endpoints": {path: {key: result[key] for key in ("throughput_rps", "p50_ms", "p99_ms", "errors")}
+                      for path, result in load.items()},
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, max(1, os.cpu_count() or 1)}))
+    parser.add_argument("--modes", nargs="+", choices=["serve", "uvicorn"], default=["serve", "uvicorn"])
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop clients")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests per endpoint")
+    parser.add_argument("--cache-size", type=int, default=0, help="PREDICTION_CACHE_SIZE for the server")
+    parser.add_argument("--seed", type=int, default=42, help="seed for sampling users and products")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    report = []
+    for mode in args.modes:
+        baseline = None
+        for workers in args.workers:
+            result = measure(mode, workers, args)
+            rps = {path: r["throughput_rps"] for path, r in result["endpoints"].items()}
+            baseline = baseline or {"workers": workers, "rps": rps}
+            # Throughput relative to perfect scaling from the smallest worker count
+            result["scaling"] = {path: round(rps[path] / (baseline["rps"][path] * workers / baseline["workers"]), 2)
+                                 for path in rps}
+            report.append(result)
+            print(f"{mode:<8} workers={workers:<3} ready {result['ready_s']:>6} s   total PSS {result['total_pss_mb']:>7} MB   "
+                  f"per worker PSS {result['worker_pss_mb']:>6} MB / USS {result['worker_uss_mb']:>6} MB", flush=True)
+            for path, r in result["endpoints"].items():
+                print(f"    {path:<24} {r['throughput_rps']:>8} rps   p99 {r['p99_ms']:>8} ms   "
+                      f"scaling {result['scaling'][path]:.2f}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"benchmark": "workers", "cpu_count": os.cpu_count(), "args": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
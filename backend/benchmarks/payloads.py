@@ -0,0 +1,18 @@
+"""
+Example request bodies for every /predict/* and /recommend/* endpoint
+"""
+PROFILE = {"age": 30, "oil_production": 6, "sensitivity_level": 8, "pore_size": 4, "hydration_level": 5, "wrinkle_score": 3}
+PRODUCT = {"suitable_for_oily": 1, "suitable_for_dry": 0, "suitable_for_sensitive": 1, "has_fragrance": 1, "has_alcohol": 0, "is_hypoallergenic": 1}
+
+EXAMPLE_PAYLOADS = {
+    "/predict/linear-regression": PROFILE,
+    "/predict/naive-bayes": PROFILE,
+    "/predict/knn": PROFILE,
+    "/predict/svm": {key: value for key, value in {**PROFILE, **PRODUCT}.items()
+                     if key in ("sensitivity_level", "has_fragrance", "has_alcohol", "is_hypoallergenic")},
+    "/predict/decision-tree": {key: value for key, value in {**PROFILE, **PRODUCT}.items()
+                               if key not in ("pore_size", "wrinkle_score", "is_hypoallergenic")},
+    "/predict/ann": {**PROFILE, **PRODUCT},
+    "/predict/all": {**PROFILE, **PRODUCT},
+    "/recommend/top-k": PROFILE,
+}
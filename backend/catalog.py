@@ -0,0 +1,114 @@
+"""
+Product catalog ranking for /recommend/top-k
+The catalog (data/products.csv) is read once into per-model feature
+templates: an (n_products x n_features) matrix with every product column
+already filled in. Scoring a profile copies a template, writes the profile's
+values into the user columns and runs one vectorized call per model, so
+ranking the whole catalog costs three matrix operations instead of one
+model call per product.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from lookup_tables import model_outputs
+
+CATALOG_PATH = 'data/products.csv'
+
+# Product fields returned with every recommendation
+PRODUCT_FIELDS = ['product_id', 'name', 'type', 'brand', 'price', 'rating']
+
+
+class ProductCatalog:
+    """The product table plus cached per-model feature templates."""
+
+    def __init__(self, products: pd.DataFrame):
+        self.products = products.reset_index(drop=True)
+        # Tie-breaker: products with identical model features rank by rating
+        self.ratings = self.products['rating'].to_numpy(dtype=float)
+        self.loaded_at = time.time()
+        self._templates = {}
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> "ProductCatalog":
+        return cls(pd.read_csv(path))
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def template(self, features: list):
+        """
+        (matrix, user columns) for one model's feature order: product columns
+        are filled from the catalog, user columns are left for the profile.
+        """
+        key = tuple(features)
+        if key not in self._templates:
+            matrix = np.zeros((len(self.products), len(features)))
+            user_columns = []
+            for j, feature in enumerate(features):
+                if feature in self.products.columns:
+                    matrix[:, j] = self.products[feature].to_numpy(dtype=float)
+                else:
+                    user_columns.append((j, feature))
+            self._templates[key] = (matrix, user_columns)
+        return self._templates[key]
+
+    def feature_matrix(self, features: list, profile) -> np.ndarray:
+        """Every product paired with one profile, in the model's feature order."""
+        matrix, user_columns = self.template(features)
+        X = matrix.copy()
+        for j, feature in user_columns:
+            X[:, j] = getattr(profile, feature)
+        return X
+
+    def warm(self, features_lists: list):
+        """Precompute templates so the first request doesn't pay for them."""
+        for features in features_lists:
+            self.template(features)
+
+
+def rank_products(catalog: ProductCatalog, profile, bundle, k: int):
+    """
+    Score every product for one profile and return (top k, stage timings in ms).
+    score = ANN satisfaction (0-10) x P(suitable) x (1 - P(allergic reaction)),
+    ties broken by catalog rating.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal start
+        now = time.perf_counter()
+        timings[stage] = round((now - start) * 1000, 3)
+        start = now
+
+    X_ann = catalog.feature_matrix(bundle['ann_features'], profile)
+    X_tree = catalog.feature_matrix(bundle['decision_tree_features'], profile)
+    X_svm = catalog.feature_matrix(bundle['svm_features'], profile)
+    lap("features")
+
+    satisfaction = bundle['ann'].predict(bundle['ann_scaler'].transform(X_ann), verbose=0)[:, 0]
+    lap("ann")
+    # Column 1 is the positive class for both binary classifiers
+    _, suitability = model_outputs(X_tree, bundle['decision_tree'], None, bundle.get('decision_tree_lookup'))
+    lap("decision_tree")
+    _, risk = model_outputs(X_svm, bundle['svm'], bundle['svm_scaler'], bundle.get('svm_lookup'))
+    lap("svm")
+
+    scores = np.clip(satisfaction, 0, 10) * suitability[:, 1] * (1 - risk[:, 1])
+    top = np.lexsort((-catalog.ratings, -scores))[:k]
+    products = catalog.products.iloc[top][PRODUCT_FIELDS].to_dict('records')
+    lap("rank")
+
+    results = []
+    for rank, (i, product) in enumerate(zip(top, products), start=1):
+        results.append({
+            "rank": rank,
+            **{field: value.item() if hasattr(value, 'item') else value for field, value in product.items()},
+            "score": round(float(scores[i]), 4),
+            "predicted_satisfaction": round(float(satisfaction[i]), 2),
+            "suitability_probability": round(float(suitability[i, 1]) * 100, 2),
+            "allergen_risk_probability": round(float(risk[i, 1]) * 100, 2),
+        })
+    return results, timings
@@ -0,0 +1,279 @@
+"""
+On-disk layout of the SkinSync datasets
+    data/users.csv                  one row per user
+    data/products.csv               one row per product (also the API catalog)
+    data/interactions/part-*.parquet
+                                    user-product interactions, written in
+                                    fixed-size chunks (part-*.csv when
+                                    pyarrow is not installed)
+    data/cache/*.npy                memory-mapped training matrix (see below)
+Interactions only carry user_id / product_id; the user and product columns
+are joined in when training loads the data, instead of being repeated on
+every row of a denormalized file.
+
+Training reads only the 12 model features and 4 targets, typed (uint8
+features, categorical skin type, float32 scores), into one shared matrix
+that every trainer slices by column name. The matrix is cached as .npy
+files and memory-mapped on the next run until a source file changes.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = 'data'
+USERS_PATH = os.path.join(DATA_DIR, 'users.csv')
+PRODUCTS_PATH = os.path.join(DATA_DIR, 'products.csv')
+INTERACTIONS_DIR = os.path.join(DATA_DIR, 'interactions')
+
+# Denormalized file written by older versions of generate_data.py
+LEGACY_COMBINED_PATH = os.path.join(DATA_DIR, 'combined_data.csv')
+
+# Memory-mapped NumPy copy of the training columns, rebuilt when the sources change
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# Every column a trainer reads, by source table. All features are small
+# integers (ages <= 100, 1-10 scores, 0/1 flags) and fit in uint8.
+USER_FEATURES = ['age', 'oil_production', 'hydration_level', 'sensitivity_level', 'pore_size', 'wrinkle_score']
+PRODUCT_FEATURES = ['suitable_for_oily', 'suitable_for_dry', 'suitable_for_sensitive',
+                    'has_fragrance', 'has_alcohol', 'is_hypoallergenic']
+FEATURES = USER_FEATURES + PRODUCT_FEATURES
+TARGET_DTYPES = {
+    'skin_type': 'category',
+    'would_recommend': np.uint8,
+    'had_reaction': np.uint8,
+    'satisfaction_score': np.float32,
+}
+INTERACTION_COLUMNS = ['user_id', 'product_id', 'satisfaction_score', 'would_recommend', 'had_reaction']
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_format() -> str:
+    return 'parquet' if parquet_available() else 'csv'
+
+
+class PartWriter:
+    """Writes DataFrame chunks as numbered part files in one directory."""
+
+    def __init__(self, directory: str = INTERACTIONS_DIR, fmt: str = None):
+        self.directory = directory
+        self.fmt = fmt or default_format()
+        self.parts = 0
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+        # A rerun replaces the whole dataset, never mixes old and new parts
+        for stale in glob.glob(os.path.join(directory, 'part-*')):
+            os.remove(stale)
+
+    def write(self, df: pd.DataFrame):
+        path = os.path.join(self.directory, f'part-{self.parts:05d}.{self.fmt}')
+        if self.fmt == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        self.parts += 1
+        self.rows += len(df)
+
+
+def interaction_parts(directory: str = INTERACTIONS_DIR) -> list:
+    return sorted(glob.glob(os.path.join(directory, 'part-*.parquet')) +
+                  glob.glob(os.path.join(directory, 'part-*.csv')))
+
+
+def read_part(path: str, columns: list = None) -> pd.DataFrame:
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def part_rows(path: str) -> int:
+    """Row count of a part file without loading it (Parquet footer, or a line count)."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f) - 1
+
+
+def append_interactions(df: pd.DataFrame, directory: str = INTERACTIONS_DIR, fmt: str = None) -> str:
+    """Add df as the next part after the existing ones (incremental updates); returns its path."""
+    parts = interaction_parts(directory)
+    fmt = fmt or (os.path.splitext(parts[-1])[1][1:] if parts else default_format())
+    next_part = int(os.path.basename(parts[-1])[5:10]) + 1 if parts else 0
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'part-{next_part:05d}.{fmt}')
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def read_interactions(directory: str = INTERACTIONS_DIR, columns: list = None) -> pd.DataFrame:
+    parts = interaction_parts(directory)
+    if not parts:
+        raise FileNotFoundError(f"No interaction parts in {directory}; run generate_data.py first")
+    return pd.concat([read_part(path, columns) for path in parts], ignore_index=True)
+
+
+class TrainingData:
+    """
+    One shared (rows x FEATURES) uint8 matrix plus the target columns.
+    Trainers take column subsets by name instead of slicing a DataFrame.
+    Categorical targets are stored as uint8 codes and decoded on access.
+    """
+
+    def __init__(self, matrix: np.ndarray, targets: dict, categories: dict = None,
+                 feature_names: list = FEATURES, source: str = None):
+        self.matrix = matrix
+        self.targets = targets
+        self.categories = categories or {}
+        self.feature_names = list(feature_names)
+        self.source = source
+        self._column = {name: j for j, name in enumerate(self.feature_names)}
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def features(self, names: list) -> np.ndarray:
+        return self.matrix[:, [self._column[name] for name in names]]
+
+    def target(self, name: str) -> np.ndarray:
+        if name in self._column:
+            return self.matrix[:, self._column[name]]
+        if name in self.categories:
+            return self.categories[name][self.targets[name]]
+        return self.targets[name]
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + sum(array.nbytes for array in self.targets.values())
+
+
+def _read_table(path: str, key: str, columns: list) -> pd.DataFrame:
+    dtypes = {column: np.uint8 for column in columns if column in FEATURES}
+    dtypes.update({column: TARGET_DTYPES[column] for column in columns if column in TARGET_DTYPES})
+    return pd.read_csv(path, usecols=[key] + columns, dtype=dtypes).set_index(key)
+
+
+def _join(interactions: pd.DataFrame, users: pd.DataFrame, products: pd.DataFrame):
+    """
+    Inner-join one chunk of interactions by index arrays, gathering user and
+    product rows straight into a uint8 matrix. Returns (matrix, targets).
+    """
+    user_rows = users.index.get_indexer(interactions['user_id'])
+    product_rows = products.index.get_indexer(interactions['product_id'])
+    keep = (user_rows >= 0) & (product_rows >= 0)
+    user_rows, product_rows = user_rows[keep], product_rows[keep]
+
+    matrix = np.empty((len(user_rows), len(FEATURES)), dtype=np.uint8)
+    for j, name in enumerate(FEATURES):
+        if name in USER_FEATURES:
+            matrix[:, j] = users[name].to_numpy()[user_rows]
+        else:
+            matrix[:, j] = products[name].to_numpy()[product_rows]
+    targets = {
+        'skin_type': users['skin_type'].cat.codes.to_numpy().astype(np.uint8)[user_rows],
+        **{name: interactions[name].to_numpy(dtype=TARGET_DTYPES[name])[keep]
+           for name in ('would_recommend', 'had_reaction', 'satisfaction_score')},
+    }
+    return matrix, targets
+
+
+def join_interactions(interactions: pd.DataFrame) -> TrainingData:
+    """
+    TrainingData for one interactions frame, e.g. a delta of new interactions.
+    Rows whose user or product is not in users.csv / products.csv are dropped.
+    """
+    users = _read_table(USERS_PATH, 'user_id', USER_FEATURES + ['skin_type'])
+    products = _read_table(PRODUCTS_PATH, 'product_id', PRODUCT_FEATURES)
+    matrix, targets = _join(interactions, users, products)
+    categories = {'skin_type': users['skin_type'].cat.categories.to_numpy()}
+    return TrainingData(matrix, targets, categories, source='delta')
+
+
+def _source_paths() -> list:
+    parts = interaction_parts()
+    if not parts and os.path.exists(LEGACY_COMBINED_PATH):
+        return [LEGACY_COMBINED_PATH]
+    return [USERS_PATH, PRODUCTS_PATH] + parts
+
+
+def _signature(paths: list) -> list:
+    return [[path, os.path.getsize(path), os.path.getmtime(path)] for path in paths]
+
+
+def read_training_data() -> TrainingData:
+    """
+    Read only the training columns, typed, from the part files (or a legacy
+    combined CSV). Parts are joined one at a time into a matrix preallocated
+    from their row counts, so peak memory is the compact matrix plus a
+    single part.
+    """
+    paths = _source_paths()
+    if paths == [LEGACY_COMBINED_PATH]:
+        combined = pd.read_csv(LEGACY_COMBINED_PATH, usecols=INTERACTION_COLUMNS + ['skin_type'] + FEATURES)
+        combined = combined.astype({name: np.uint8 for name in FEATURES} | TARGET_DTYPES)
+        users = combined.drop_duplicates('user_id').set_index('user_id')
+        products = combined.drop_duplicates('product_id').set_index('product_id')
+        matrix, targets = _join(combined, users, products)
+    else:
+        users = _read_table(USERS_PATH, 'user_id', USER_FEATURES + ['skin_type'])
+        products = _read_table(PRODUCTS_PATH, 'product_id', PRODUCT_FEATURES)
+        parts = interaction_parts()
+        if not parts:
+            raise FileNotFoundError(f"No interaction parts in {INTERACTIONS_DIR}; run generate_data.py first")
+        # Sized from the part row counts; rows the join drops are trimmed at the end
+        capacity = sum(part_rows(path) for path in parts)
+        matrix = np.empty((capacity, len(FEATURES)), dtype=np.uint8)
+        targets = {name: np.empty(capacity, dtype=np.uint8 if dtype == 'category' else dtype)
+                   for name, dtype in TARGET_DTYPES.items()}
+        filled = 0
+        for path in parts:
+            part_matrix, part_targets = _join(read_part(path, INTERACTION_COLUMNS), users, products)
+            end = filled + len(part_matrix)
+            matrix[filled:end] = part_matrix
+            for name, values in part_targets.items():
+                targets[name][filled:end] = values
+            filled = end
+        matrix = matrix[:filled]
+        targets = {name: values[:filled] for name, values in targets.items()}
+
+    categories = {'skin_type': users['skin_type'].cat.categories.to_numpy()}
+    return TrainingData(matrix, targets, categories, source='files')
+
+
+def load_training_data(cache_dir: str = CACHE_DIR, use_cache: bool = True) -> TrainingData:
+    """
+    Training data from the memory-mapped cache in cache_dir when it matches
+    the current source files, otherwise read from them and refresh the cache.
+    """
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    signature = _signature(_source_paths())
+    if use_cache and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['signature'] == signature and meta['features'] == FEATURES:
+            matrix = np.load(os.path.join(cache_dir, 'features.npy'), mmap_mode='r')
+            targets = {name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r') for name in meta['targets']}
+            categories = {name: np.array(labels, dtype=object) for name, labels in meta['categories'].items()}
+            return TrainingData(matrix, targets, categories, source='cache')
+
+    data = read_training_data()
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(os.path.join(cache_dir, 'features.npy'), data.matrix)
+        for name, array in data.targets.items():
+            np.save(os.path.join(cache_dir, f'{name}.npy'), array)
+        with open(meta_path, 'w') as f:
+            json.dump({"signature": signature, "features": FEATURES, "targets": list(data.targets),
+                       "categories": {name: labels.tolist() for name, labels in data.categories.items()}}, f)
+    return data
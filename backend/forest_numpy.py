@@ -0,0 +1,238 @@
+"""
+Pure-NumPy inference for the suitability random forest
+Flattens every tree of the trained RandomForestClassifier into shared node
+arrays and walks all (row, tree) pairs of a batch together, one tree level
+per step, instead of scikit-learn's per-tree predict_proba calls (which cost
+~20 ms per request for 300 trees however few rows there are).
+
+Layout: node i owns two slots, 2i (test false: go left) and 2i + 1 (go
+right), so one step is
+
+    slot = child[slot + (x[feature[slot]] > threshold[slot])]
+
+Leaves point back at themselves with a +inf threshold, so rows that reach a
+leaf early just stay there. Nodes are numbered level by level across all
+trees, which keeps the levels every row visits in a few cache lines, and
+pairs that have reached their leaf are dropped at the depths where most
+training rows ended. Thresholds are stored as float32 rounded down, which
+gives exactly scikit-learn's float32 `x <= threshold` decisions.
+
+Export from an existing model (from backend/):
+    python forest_numpy.py
+"""
+import numpy as np
+
+FOREST_MODEL_PATH = 'models/decision_tree.pkl'
+FOREST_ARRAYS_PATH = 'models/decision_tree_forest.npz'
+
+# Fractions of training rows that have reached their leaf when pairs get compacted
+COMPACT_QUANTILES = (0.5, 0.75, 0.9)
+
+
+def flatten_forest(forest) -> dict:
+    """Node arrays (see module docstring) for a fitted single-output RandomForestClassifier."""
+    if forest.n_outputs_ != 1:
+        raise ValueError("Only single-output forests can be flattened")
+    feature, threshold, left, right, value, depth, weight, roots = [], [], [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(n) + offset
+        left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+        right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        # Leaf class distribution, normalized the way DecisionTreeClassifier.predict_proba does
+        proba = tree.value[:, 0, :].astype(np.float64)
+        normalizer = proba.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer)
+        # Children always come after their parent, so one forward pass sets every depth
+        node_depth = np.zeros(n, dtype=np.int64)
+        for i in np.flatnonzero(~is_leaf):
+            node_depth[tree.children_left[i]] = node_depth[tree.children_right[i]] = node_depth[i] + 1
+        depth.append(node_depth)
+        weight.append(np.where(is_leaf, tree.weighted_n_node_samples, 0.0))
+        roots.append(offset)
+        offset += n
+
+    feature, left, right = np.concatenate(feature), np.concatenate(left), np.concatenate(right)
+    threshold, value = np.concatenate(threshold), np.concatenate(value)
+    depth, weight = np.concatenate(depth), np.concatenate(weight)
+
+    # Renumber level by level (roots of every tree first, then all depth-1 nodes, ...)
+    order = np.lexsort((np.arange(offset), depth))
+    new_id = np.empty(offset, dtype=np.int64)
+    new_id[order] = np.arange(offset)
+
+    child = np.empty(2 * offset, dtype=np.int32)
+    child[0::2] = 2 * new_id[left[order]]
+    child[1::2] = 2 * new_id[right[order]]
+    # float32 thresholds rounded down: for float32 x, x <= t exactly when x <= t32
+    threshold32 = threshold[order].astype(np.float32)
+    too_high = threshold32.astype(np.float64) > threshold[order]
+    threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+
+    # Steps after which most pairs sit in a leaf, from where the training rows ended up
+    leaf_depth, leaf_weight = depth[weight > 0], weight[weight > 0]
+    by_depth = np.bincount(leaf_depth, weights=leaf_weight)
+    ended = np.cumsum(by_depth) / by_depth.sum()
+    compact_steps = np.unique([int(np.searchsorted(ended, q)) for q in COMPACT_QUANTILES])
+
+    return {
+        "feature": np.repeat(feature[order].astype(np.int32), 2),
+        "threshold": np.repeat(threshold32, 2),
+        "child": child,
+        "value": value[order],
+        "roots": (2 * new_id[roots]).astype(np.int32),
+        "classes": np.asarray(forest.classes_),
+        "max_depth": np.int64(depth.max()),
+        "compact_steps": compact_steps[compact_steps > 0].astype(np.int64),
+        "n_features": np.int64(forest.n_features_in_),
+    }
+
+
+class NumpyForest:
+    """Batched traversal of a flattened random forest; mirrors RandomForestClassifier's predict_proba / predict."""
+
+    # (row, tree) pairs walked together; larger batches go through in chunks
+    CHUNK = 32768
+
+    def __init__(self, arrays: dict):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.child = arrays["child"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.max_depth = int(arrays["max_depth"])
+        self.compact_steps = frozenset(int(step) for step in arrays["compact_steps"])
+        self.n_features_in_ = int(arrays["n_features"])
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "NumpyForest":
+        return cls(flatten_forest(forest))
+
+    @classmethod
+    def load(cls, path: str = FOREST_ARRAYS_PATH) -> "NumpyForest":
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def save(self, path: str = FOREST_ARRAYS_PATH):
+        np.savez(path, feature=self.feature, threshold=self.threshold, child=self.child, value=self.value,
+                 roots=self.roots, classes=self.classes_, max_depth=self.max_depth,
+                 compact_steps=np.array(sorted(self.compact_steps), dtype=np.int64), n_features=self.n_features_in_)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index of every row in every tree, shape (n_rows, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        if n_features != self.n_features_in_:
+            raise ValueError(f"X has {n_features} features, but the forest expects {self.n_features_in_}")
+        n_trees = len(self.roots)
+        leaves = np.empty(n_rows * n_trees, dtype=np.int32)
+        rows_per_chunk = max(1, self.CHUNK // n_trees)
+        for start in range(0, n_rows, rows_per_chunk):
+            stop = min(n_rows, start + rows_per_chunk)
+            self._walk(X[start:stop].ravel(), stop - start, n_features, leaves[start * n_trees:stop * n_trees])
+        return (leaves >> 1).reshape(n_rows, n_trees)
+
+    def _walk(self, x: np.ndarray, n_rows: int, n_features: int, out: np.ndarray):
+        """Walk every (row, tree) pair of one chunk to its leaf slot, written to out."""
+        n_pairs = n_rows * len(self.roots)
+        slot = np.tile(self.roots, n_rows)
+        row_start = np.repeat(np.arange(n_rows, dtype=np.int32) * n_features, len(self.roots))
+        position = None  # pairs still walking, once some have been dropped
+        index = np.empty(n_pairs, dtype=np.int32)
+        x_value = np.empty(n_pairs, dtype=np.float32)
+        bound = np.empty(n_pairs, dtype=np.float32)
+        go_right = np.empty(n_pairs, dtype=bool)
+        for step in range(1, self.max_depth + 1):
+            k = len(slot)
+            np.take(self.feature, slot, out=index[:k])
+            index[:k] += row_start
+            np.take(x, index[:k], out=x_value[:k])
+            np.take(self.threshold, slot, out=bound[:k])
+            np.greater(x_value[:k], bound[:k], out=go_right[:k])
+            slot += go_right[:k]
+            np.take(self.child, slot, out=slot)
+            if step in self.compact_steps and step < self.max_depth:
+                # Drop pairs that reached their leaf (a leaf's left slot points to itself)
+                done = self.child[slot] == slot
+                if position is None:
+                    position = np.arange(n_pairs, dtype=np.int32)
+                out[position[done]] = slot[done]
+                walking = ~done
+                slot, row_start, position = slot[walking], row_start[walking], position[walking]
+                if not len(slot):
+                    return
+        if position is None:
+            out[:] = slot
+        else:
+            out[position] = slot
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean of the trees' leaf class distributions, like RandomForestClassifier.predict_proba."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or not len(X):
+            return np.zeros((len(X), len(self.classes_)))
+        # Repeated rows (a catalog shares most product flags) are walked once
+        unique, inverse = np.unique(X, axis=0, return_inverse=True) if len(X) > 1 else (X, None)
+        # Summing over the tree axis adds the trees in order, as scikit-learn accumulates them
+        proba = self.value[self.apply(unique)].sum(axis=1) / len(self.roots)
+        return proba if inverse is None else proba[inverse.ravel()]
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def describe(self) -> dict:
+        return {"engine": "numpy", "n_estimators": len(self.roots), "nodes": len(self.value), "max_depth": self.max_depth}
+
+
+def check_parity(forest, engine: NumpyForest, X: np.ndarray, atol: float = 1e-12) -> float:
+    """Compare the NumPy engine with scikit-learn on X; raises if they disagree."""
+    expected = forest.predict_proba(X)
+    actual = engine.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if expected.shape != actual.shape or max_diff > atol:
+        raise AssertionError(f"NumPy forest disagrees with scikit-learn: max |diff| = {max_diff:.2e} (atol {atol:.0e})")
+    mismatched = int(np.sum(forest.predict(X) != engine.predict(X)))
+    if mismatched:
+        raise AssertionError(f"NumPy forest predicts a different class for {mismatched} of {len(X)} rows")
+    return max_diff
+
+
+def export_forest(forest, X_check: np.ndarray, path: str = FOREST_ARRAYS_PATH) -> float:
+    """Flatten, verify parity on X_check, then write the node arrays."""
+    engine = NumpyForest.from_sklearn(forest)
+    # Random rows beyond the training range take paths real rows might not
+    rng = np.random.default_rng(42)
+    X_check = np.asarray(X_check, dtype=np.float64)
+    low, high = X_check.min(axis=0) - 2, X_check.max(axis=0) + 2
+    X_check = np.vstack([X_check, np.round(rng.uniform(low, high, size=(256, X_check.shape[1])), 1)])
+    max_diff = check_parity(forest, engine, X_check)
+    engine.save(path)
+    return max_diff
+
+
+if __name__ == "__main__":
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(FOREST_MODEL_PATH)
+    features = joblib.load('models/decision_tree_features.pkl')
+    users = pd.read_csv('data/users.csv')
+    products = pd.read_csv('data/products.csv')
+    # Random user x product pairs as realistic parity inputs
+    rows = pd.concat([
+        users.sample(2048, replace=True, random_state=42).reset_index(drop=True),
+        products.sample(2048, replace=True, random_state=42).reset_index(drop=True),
+    ], axis=1)
+    max_diff = export_forest(model, rows[features].values)
+    print(f"[OK] Exported {FOREST_ARRAYS_PATH} (max |diff| vs scikit-learn: {max_diff:.2e})")
@@ -1,16 +1,33 @@
 """
 Generate synthetic skincare dataset for training ML models
+Every table is generated column-wise with NumPy, so sizes scale to millions
+of interactions:
+    python generate_data.py --users 2000 --products 500 --interactions 3000
+Interactions are streamed to data/interactions/ in fixed-size chunks (see
+dataset.py), so memory stays bounded by --chunk-size, not by the dataset.
+
+A delta of new interactions between the existing users and products, for
+update_models.py:
+    python generate_data.py --delta data/delta.csv --interactions 500
 """
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import time
+from dataset import PRODUCTS_PATH, USERS_PATH, PartWriter, default_format
 
 # Set random seed for reproducibility
 np.random.seed(42)
 
-# Number of samples
-N_SAMPLES = 2000
+# Default dataset sizes (override from the command line)
+N_USERS = 2000
+N_PRODUCTS = 500
+N_INTERACTIONS = 3000
+
+# Interactions generated and written per part file
+CHUNK_ROWS = 1_000_000
 
 # Define product categories and ingredients
 PRODUCT_TYPES = ['Moisturizer', 'Cleanser', 'Serum', 'Sunscreen', 'Toner', 'Mask']
@@ -25,19 +42,19 @@ INGREDIENTS = {
     'protective': ['Vitamin C', 'Vitamin E', 'Zinc Oxide', 'Titanium Dioxide']
 }
 
-def generate_user_data():
+def generate_user_data(n_users=N_USERS):
     """Generate synthetic user data"""
     data = {
-        'user_id': range(1, N_SAMPLES + 1),
-        'age': np.random.randint(18, 65, N_SAMPLES),
-        'skin_type': np.random.choice(SKIN_TYPES, N_SAMPLES, p=[0.25, 0.20, 0.25, 0.15, 0.15]),
-        'skin_condition': np.random.choice(SKIN_CONDITIONS, N_SAMPLES, p=[0.20, 0.10, 0.10, 0.15, 0.20, 0.25]),
-        'climate': np.random.choice(['Humid', 'Dry', 'Temperate', 'Cold'], N_SAMPLES),
-        'sensitivity_level': np.random.randint(1, 11, N_SAMPLES),  # 1-10 scale
-        'oil_production': np.random.randint(1, 11, N_SAMPLES),
-        'hydration_level': np.random.randint(1, 11, N_SAMPLES),
-        'pore_size': np.random.randint(1, 11, N_SAMPLES),
-        'wrinkle_score': np.random.randint(1, 11, N_SAMPLES),
+        'user_id': np.arange(1, n_users + 1),
+        'age': np.random.randint(18, 65, n_users),
+        'skin_type': np.random.choice(SKIN_TYPES, n_users, p=[0.25, 0.20, 0.25, 0.15, 0.15]),
+        'skin_condition': np.random.choice(SKIN_CONDITIONS, n_users, p=[0.20, 0.10, 0.10, 0.15, 0.20, 0.25]),
+        'climate': np.random.choice(['Humid', 'Dry', 'Temperate', 'Cold'], n_users),
+        'sensitivity_level': np.random.randint(1, 11, n_users),  # 1-10 scale
+        'oil_production': np.random.randint(1, 11, n_users),
+        'hydration_level': np.random.randint(1, 11, n_users),
+        'pore_size': np.random.randint(1, 11, n_users),
+        'wrinkle_score': np.random.randint(1, 11, n_users),
     }
     
     df = pd.DataFrame(data)
@@ -52,119 +69,108 @@ def generate_user_data():
     
     return df
 
-def generate_product_data():
+def generate_product_data(n_products=N_PRODUCTS):
     """Generate synthetic product data"""
-    products = []
-    
-    for i in range(500):
-        product_type = np.random.choice(PRODUCT_TYPES)
-        
-        # Select ingredients based on product type
-        num_ingredients = np.random.randint(3, 8)
-        selected_categories = np.random.choice(list(INGREDIENTS.keys()), num_ingredients, replace=True)
-        ingredient_list = [np.random.choice(INGREDIENTS[cat]) for cat in selected_categories]
-        
-        product = {
-            'product_id': i + 1,
-            'name': f'{product_type} {i+1}',
-            'type': product_type,
-            'brand': f'Brand {np.random.choice(["A", "B", "C", "D", "E"])}',
-            'price': round(np.random.uniform(10, 150), 2),
-            'rating': round(np.random.uniform(3.0, 5.0), 1),
-            'ingredients': ','.join(ingredient_list),
-            'suitable_for_oily': np.random.choice([0, 1]),
-            'suitable_for_dry': np.random.choice([0, 1]),
-            'suitable_for_sensitive': np.random.choice([0, 1]),
-            'suitable_for_combination': np.random.choice([0, 1]),
-            'suitable_for_normal': np.random.choice([0, 1]),
-            'has_fragrance': np.random.choice([0, 1]),
-            'has_alcohol': np.random.choice([0, 1]),
-            'is_hypoallergenic': np.random.choice([0, 1]),
-            'spf_level': np.random.choice([0, 15, 30, 50]) if product_type == 'Sunscreen' else 0,
-        }
-        products.append(product)
-    
-    return pd.DataFrame(products)
+    product_type = np.random.choice(PRODUCT_TYPES, n_products)
+    product_id = np.arange(1, n_products + 1)
+    
+    # Select 3-7 ingredients per product: a random category, then a random ingredient in it
+    num_ingredients = np.random.randint(3, 8, n_products)
+    ingredient_table = np.array([INGREDIENTS[category] for category in INGREDIENTS])
+    categories = np.random.randint(0, len(ingredient_table), (n_products, 7))
+    picks = ingredient_table[categories, np.random.randint(0, ingredient_table.shape[1], (n_products, 7))]
+    ingredients = [','.join(row[:count]) for row, count in zip(picks, num_ingredients)]
+    
+    binary = lambda: np.random.choice([0, 1], n_products)
+    return pd.DataFrame({
+        'product_id': product_id,
+        'name': [f'{t} {i}' for t, i in zip(product_type, product_id)],
+        'type': product_type,
+        'brand': np.char.add('Brand ', np.random.choice(["A", "B", "C", "D", "E"], n_products)),
+        'price': np.round(np.random.uniform(10, 150, n_products), 2),
+        'rating': np.round(np.random.uniform(3.0, 5.0, n_products), 1),
+        'ingredients': ingredients,
+        'suitable_for_oily': binary(),
+        'suitable_for_dry': binary(),
+        'suitable_for_sensitive': binary(),
+        'suitable_for_combination': binary(),
+        'suitable_for_normal': binary(),
+        'has_fragrance': binary(),
+        'has_alcohol': binary(),
+        'is_hypoallergenic': binary(),
+        'spf_level': np.where(product_type == 'Sunscreen', np.random.choice([0, 15, 30, 50], n_products), 0),
+    })
+
+def generate_interaction_data(user_df, product_df, n_interactions=N_INTERACTIONS):
+    """
+    Generate user-product interaction data
+    Users and products are drawn as index arrays and every rule below is
+    applied to whole columns at once.
+    """
+    user_idx = np.random.randint(0, len(user_df), n_interactions)
+    product_idx = np.random.randint(0, len(product_df), n_interactions)
+    
+    # Simulate satisfaction based on skin type match: +2 if the product suits
+    # the user's skin type (its suitable_for_<type> flag), -1 otherwise
+    skin_type_code = pd.Categorical(user_df['skin_type'], categories=SKIN_TYPES).codes[user_idx]
+    suitable = product_df[[f'suitable_for_{t.lower()}' for t in SKIN_TYPES]].to_numpy()
+    matched = suitable[product_idx, skin_type_code] == 1
+    base_satisfaction = np.where(matched, 7.0, 4.0)
+    
+    # Sensitivity to fragrance and alcohol
+    sensitive = user_df['sensitivity_level'].to_numpy()[user_idx] > 7
+    irritants = product_df['has_fragrance'].to_numpy()[product_idx] + product_df['has_alcohol'].to_numpy()[product_idx]
+    base_satisfaction -= 1.5 * irritants * sensitive
+    
+    satisfaction = np.clip(base_satisfaction + np.random.normal(0, 0.5, n_interactions), 1, 10)
+    
+    # Allergen risk based on sensitivity: 30% for sensitive users, 5% otherwise
+    allergen_risk = (np.random.random(n_interactions) < np.where(sensitive, 0.3, 0.05)).astype(int)
+    
+    return pd.DataFrame({
+        'user_id': user_df['user_id'].to_numpy()[user_idx],
+        'product_id': product_df['product_id'].to_numpy()[product_idx],
+        'satisfaction_score': np.round(satisfaction, 1),
+        'would_recommend': (satisfaction >= 7).astype(int),
+        'had_reaction': allergen_risk,
+        'usage_days': np.random.randint(7, 90, n_interactions)
+    })
 
-def generate_interaction_data(user_df, product_df):
-    """Generate user-product interaction data"""
-    interactions = []
-    
-    for _ in range(3000):
-        user_id = np.random.choice(user_df['user_id'])
-        product_id = np.random.choice(product_df['product_id'])
-        
-        user = user_df[user_df['user_id'] == user_id].iloc[0]
-        product = product_df[product_df['product_id'] == product_id].iloc[0]
-        
-        # Simulate satisfaction based on skin type match
-        base_satisfaction = 5.0
-        
-        if user['skin_type'] == 'Oily' and product['suitable_for_oily']:
-            base_satisfaction += 2
-        elif user['skin_type'] == 'Dry' and product['suitable_for_dry']:
-            base_satisfaction += 2
-        elif user['skin_type'] == 'Sensitive' and product['suitable_for_sensitive']:
-            base_satisfaction += 2
-        elif user['skin_type'] == 'Combination' and product['suitable_for_combination']:
-            base_satisfaction += 2
-        elif user['skin_type'] == 'Normal' and product['suitable_for_normal']:
-            base_satisfaction += 2
-        else:
-            base_satisfaction -= 1
-        
-        # Sensitivity to fragrance and alcohol
-        if user['sensitivity_level'] > 7:
-            if product['has_fragrance']:
-                base_satisfaction -= 1.5
-            if product['has_alcohol']:
-                base_satisfaction -= 1.5
-        
-        satisfaction = max(1, min(10, base_satisfaction + np.random.normal(0, 0.5)))
-        
-        # Allergen risk based on sensitivity and ingredients
-        allergen_risk = 0
-        if user['sensitivity_level'] > 7:
-            allergen_risk = np.random.choice([0, 1], p=[0.7, 0.3])
-        else:
-            allergen_risk = np.random.choice([0, 1], p=[0.95, 0.05])
-        
-        interaction = {
-            'user_id': user_id,
-            'product_id': product_id,
-            'satisfaction_score': round(satisfaction, 1),
-            'would_recommend': 1 if satisfaction >= 7 else 0,
-            'had_reaction': allergen_risk,
-            'usage_days': np.random.randint(7, 90)
-        }
-        interactions.append(interaction)
-    
-    return pd.DataFrame(interactions)
+def peak_rss_mb():
+    """Peak resident memory of this process (None where the resource module is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
-def main():
+def main(n_users=N_USERS, n_products=N_PRODUCTS, n_interactions=N_INTERACTIONS,
+         chunk_rows=CHUNK_ROWS, fmt=None):
     """Generate and save all datasets"""
     print("Generating synthetic skincare dataset...")
+    start = time.perf_counter()
     
-    # Generate data
-    user_df = generate_user_data()
-    product_df = generate_product_data()
-    interaction_df = generate_interaction_data(user_df, product_df)
-    
-    # Create combined dataset for training
-    # Merge user and interaction data
-    combined_df = interaction_df.merge(user_df, on='user_id')
-    combined_df = combined_df.merge(product_df, on='product_id')
+    # Generate the user and product tables; they are small and stay in memory
+    user_df = generate_user_data(n_users)
+    product_df = generate_product_data(n_products)
+    user_df.to_csv(USERS_PATH, index=False)
+    product_df.to_csv(PRODUCTS_PATH, index=False)
     
-    # Save datasets
-    user_df.to_csv('data/users.csv', index=False)
-    product_df.to_csv('data/products.csv', index=False)
-    interaction_df.to_csv('data/interactions.csv', index=False)
-    combined_df.to_csv('data/combined_data.csv', index=False)
+    # Stream interactions chunk by chunk, keeping only running statistics
+    writer = PartWriter(fmt=fmt or default_format())
+    satisfaction_sum, reactions = 0.0, 0
+    for offset in range(0, n_interactions, chunk_rows):
+        chunk = generate_interaction_data(user_df, product_df, min(chunk_rows, n_interactions - offset))
+        writer.write(chunk)
+        satisfaction_sum += chunk['satisfaction_score'].sum()
+        reactions += int(chunk['had_reaction'].sum())
+        del chunk
+    elapsed = time.perf_counter() - start
     
     print(f"[OK] Generated {len(user_df)} users")
     print(f"[OK] Generated {len(product_df)} products")
-    print(f"[OK] Generated {len(interaction_df)} interactions")
-    print(f"[OK] Combined dataset: {len(combined_df)} records")
+    print(f"[OK] Generated {writer.rows} interactions in {writer.parts} {writer.fmt} part(s)")
+    print(f"[OK] {writer.rows / elapsed:,.0f} interactions/s, peak RSS {peak_rss_mb() or float('nan'):.1f} MB")
     
     # Print statistics
     print("\n=== Dataset Statistics ===")
@@ -172,12 +178,39 @@ def main():
     print(user_df['skin_type'].value_counts())
     print(f"\nProduct Type Distribution:")
     print(product_df['type'].value_counts())
-    print(f"\nAverage Satisfaction Score: {interaction_df['satisfaction_score'].mean():.2f}")
-    print(f"Allergen Reaction Rate: {interaction_df['had_reaction'].mean()*100:.2f}%")
+    if writer.rows:
+        print(f"\nAverage Satisfaction Score: {satisfaction_sum / writer.rows:.2f}")
+        print(f"Allergen Reaction Rate: {reactions / writer.rows * 100:.2f}%")
     
     print("\n[OK] All datasets saved in 'data/' folder")
 
+def generate_delta(path, n_interactions=N_INTERACTIONS):
+    """Write new interactions between the users and products already in data/"""
+    user_df = pd.read_csv(USERS_PATH)
+    product_df = pd.read_csv(PRODUCTS_PATH)
+    delta = generate_interaction_data(user_df, product_df, n_interactions)
+    if path.endswith('.parquet'):
+        delta.to_parquet(path, index=False)
+    else:
+        delta.to_csv(path, index=False)
+    print(f"[OK] Generated {len(delta)} new interactions in {path}")
+
 if __name__ == "__main__":
     import os
-    os.makedirs('data', exist_ok=True)
-    main()
+    parser = argparse.ArgumentParser(description="Generate the synthetic SkinSync datasets in data/")
+    parser.add_argument("--users", type=int, default=N_USERS)
+    parser.add_argument("--products", type=int, default=N_PRODUCTS)
+    parser.add_argument("--interactions", type=int, default=N_INTERACTIONS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS, help="interactions per part file")
+    parser.add_argument("--format", choices=["parquet", "csv"], help="part file format (default: parquet if pyarrow is installed)")
+    parser.add_argument("--delta", metavar="PATH", help="only write --interactions new interactions to PATH (.csv or .parquet)")
+    parser.add_argument("--seed", type=int, help="random seed (default: 42, or a fresh seed per --delta)")
+    args = parser.parse_args()
+    if args.delta:
+        np.random.seed(args.seed)
+        generate_delta(args.delta, args.interactions)
+    else:
+        if args.seed is not None:
+            np.random.seed(args.seed)
+        os.makedirs('data', exist_ok=True)
+        main(args.users, args.products, args.interactions, args.chunk_size, args.format)
@@ -0,0 +1,153 @@
+"""
+Hyperparameter search with a compute budget for train_models.py
+Three strategies over the same parameter grids:
+    grid      exhaustive GridSearchCV (every candidate on all the data)
+    halving   successive halving: every candidate on a small resource
+              (training rows, or n_estimators for forests), only the best
+              third moves on to 3x the resource, until one round uses it all
+    random    candidates in random order, cross-validated one at a time
+              until n_iter candidates or budget_seconds is used up
+Every strategy returns the winning candidate's per-fold CV scores, so
+trainers report them instead of cross-validating the best model again.
+"""
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, ParameterGrid, cross_validate
+
+STRATEGIES = ('grid', 'halving', 'random')
+
+# Candidates random search evaluates when no time budget is given
+RANDOM_SEARCH_ITER = 20
+
+
+def _plain(value):
+    """NumPy scalars -> Python scalars so results serialize to JSON."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+@dataclass
+class SearchResult:
+    best_estimator: object
+    best_params: dict
+    cv_scores: np.ndarray  # per-fold scores of the best candidate
+    strategy: str
+    candidates: int  # distinct parameter sets evaluated
+    fits: int  # estimator fits including CV folds (not the final refit)
+    seconds: float
+    # (seconds elapsed or fit seconds, best mean CV score so far) per round / candidate
+    history: list = field(default_factory=list)
+
+    @property
+    def best_score(self) -> float:
+        return float(np.mean(self.cv_scores))
+
+    def summary(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "candidates": self.candidates,
+            "fits": self.fits,
+            "seconds": round(self.seconds, 3),
+            "best_score": round(self.best_score, 6),
+            "history": self.history,
+        }
+
+
+def _from_sklearn(search, strategy: str, seconds: float, history: list) -> SearchResult:
+    results = search.cv_results_
+    folds = np.array([results[f'split{i}_test_score'][search.best_index_] for i in range(search.n_splits_)])
+    return SearchResult(
+        best_estimator=search.best_estimator_,
+        best_params={key: _plain(value) for key, value in search.best_params_.items()},
+        cv_scores=folds,
+        strategy=strategy,
+        candidates=len(ParameterGrid(search.param_grid)),
+        fits=len(results['params']) * search.n_splits_,
+        seconds=seconds,
+        history=history,
+    )
+
+
+def grid_search(estimator, param_grid, X, y, scoring, cv=5, n_jobs=-1) -> SearchResult:
+    start = time.perf_counter()
+    search = GridSearchCV(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs).fit(X, y)
+    seconds = time.perf_counter() - start
+    return _from_sklearn(search, 'grid', seconds, [[round(seconds, 3), round(float(search.best_score_), 6)]])
+
+
+def halving_search(estimator, param_grid, X, y, scoring, cv=5, n_jobs=-1,
+                   resource='n_samples', factor=3, random_state=42) -> SearchResult:
+    """
+    Successive halving. With resource set to an estimator parameter (e.g.
+    n_estimators) its grid values give the min/max resource and it is
+    removed from the grid.
+    """
+    options = {}
+    if resource != 'n_samples':
+        values = param_grid[resource]
+        param_grid = {key: value for key, value in param_grid.items() if key != resource}
+        options = {"min_resources": min(values), "max_resources": max(values)}
+    start = time.perf_counter()
+    search = HalvingGridSearchCV(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs, factor=factor,
+                                 resource=resource, random_state=random_state, **options).fit(X, y)
+    seconds = time.perf_counter() - start
+
+    # One history point per round: summed fit + score time so far, best mean score of the round
+    results = search.cv_results_
+    cost = (results['mean_fit_time'] + results['mean_score_time']) * search.n_splits_
+    history, spent = [], 0.0
+    for round_ in range(search.n_iterations_):
+        in_round = results['iter'] == round_
+        spent += float(cost[in_round].sum())
+        history.append([round(spent, 3), round(float(np.max(results['mean_test_score'][in_round])), 6)])
+    result = _from_sklearn(search, 'halving', seconds, history)
+    result.candidates = int(search.n_candidates_[0])
+    return result
+
+
+def random_search(estimator, param_grid, X, y, scoring, cv=5, n_jobs=-1,
+                  n_iter=RANDOM_SEARCH_ITER, budget_seconds=None, random_state=42) -> SearchResult:
+    """Random candidates until n_iter are done or budget_seconds have passed (at least one is always evaluated)."""
+    candidates = list(ParameterGrid(param_grid))
+    order = np.random.default_rng(random_state).permutation(len(candidates))
+    if budget_seconds is None:
+        order = order[:n_iter]
+
+    start = time.perf_counter()
+    best_params, best_scores, history = None, None, []
+    for i in order:
+        if best_params is not None and budget_seconds is not None and time.perf_counter() - start >= budget_seconds:
+            break
+        params = candidates[i]
+        scores = cross_validate(clone(estimator).set_params(**params), X, y, cv=cv, scoring=scoring,
+                                n_jobs=n_jobs)['test_score']
+        if best_scores is None or scores.mean() > best_scores.mean():
+            best_params, best_scores = params, scores
+        history.append([round(time.perf_counter() - start, 3), round(float(best_scores.mean()), 6)])
+
+    model = clone(estimator).set_params(**best_params).fit(X, y)
+    return SearchResult(
+        best_estimator=model,
+        best_params={key: _plain(value) for key, value in best_params.items()},
+        cv_scores=best_scores,
+        strategy='random',
+        candidates=len(history),
+        fits=len(history) * len(best_scores),
+        seconds=time.perf_counter() - start,
+        history=history,
+    )
+
+
+def search(estimator, param_grid, X, y, scoring, strategy='halving', cv=5, n_jobs=-1,
+           budget_seconds=None, resource='n_samples') -> SearchResult:
+    """Run one of STRATEGIES; budget_seconds applies to random search only."""
+    if strategy == 'grid':
+        return grid_search(estimator, param_grid, X, y, scoring, cv, n_jobs)
+    if strategy == 'halving':
+        return halving_search(estimator, param_grid, X, y, scoring, cv, n_jobs, resource)
+    if strategy == 'random':
+        return random_search(estimator, param_grid, X, y, scoring, cv, n_jobs, budget_seconds=budget_seconds)
+    raise ValueError(f"Unknown search strategy '{strategy}'. Use {', '.join(STRATEGIES)}.")
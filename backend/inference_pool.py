@@ -0,0 +1,112 @@
+"""
+Bounded worker pool for CPU-bound model inference
+Keeps sklearn/Keras calls off the asyncio event loop and reports how long
+each call waited in the queue versus how long it actually ran.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+
+class PoolSaturated(Exception):
+    """Raised when the queue is full and the request should be shed."""
+
+
+@dataclass
+class InferenceTiming:
+    queue_ms: float
+    exec_ms: float
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header value."""
+        return f"queue;dur={self.queue_ms:.3f}, exec;dur={self.exec_ms:.3f}"
+
+
+class InferencePool:
+    """
+    Thread pool with a hard cap on outstanding work.
+    A thread pool (not a process pool) is used because the models live in
+    this process and NumPy/sklearn/TensorFlow release the GIL in their
+    heavy kernels, so threads run inference in parallel without copying
+    models into other processes.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, window: int = 2048):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._completed = 0
+        self._rejected = 0
+        # Recent timings for percentile reporting
+        self._queue_ms = deque(maxlen=window)
+        self._exec_ms = deque(maxlen=window)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool; returns (result, InferenceTiming)."""
+        with self._lock:
+            if self._outstanding >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturated(f"Inference queue full ({self.max_queue} waiting)")
+            self._outstanding += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started, time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(self._executor, task)
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+
+        timing = InferenceTiming(
+            queue_ms=(started - submitted) * 1000,
+            exec_ms=(finished - started) * 1000,
+        )
+        with self._lock:
+            self._completed += 1
+            self._queue_ms.append(timing.queue_ms)
+            self._exec_ms.append(timing.exec_ms)
+        return result, timing
+
+    def stats(self) -> dict:
+        """Pool configuration, counters and recent queue/exec latency percentiles."""
+        with self._lock:
+            queue_ms = np.array(self._queue_ms)
+            exec_ms = np.array(self._exec_ms)
+            stats = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "outstanding": self._outstanding,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        for name, values in (("queue_wait_ms", queue_ms), ("exec_ms", exec_ms)):
+            if len(values):
+                p50, p99 = np.percentile(values, [50, 99])
+                stats[name] = {"p50": round(float(p50), 3), "p99": round(float(p99), 3), "max": round(float(values.max()), 3)}
+            else:
+                stats[name] = None
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pool_from_env() -> InferencePool:
+    """Build the pool from INFERENCE_WORKERS / INFERENCE_QUEUE_DEPTH."""
+    workers = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    queue_depth = int(os.getenv("INFERENCE_QUEUE_DEPTH", "64"))
+    return InferencePool(max_workers=max(1, workers), max_queue=max(0, queue_depth))
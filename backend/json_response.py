@@ -0,0 +1,33 @@
+"""
+JSON responses for the prediction endpoints
+A dict returned from a FastAPI endpoint is encoded twice: jsonable_encoder
+walks and copies it (~60 us for one prediction), then JSONResponse runs
+json.dumps over the copy. The prediction endpoints hold only JSON-native
+values (str, int, float, bool, lists and dicts), so they build a
+FastJSONResponse themselves, which skips the first pass and renders with
+orjson when it is installed, and with the standard library otherwise.
+"""
+import os
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON_RESPONSE=json keeps the standard-library encoder even when orjson is installed
+USE_ORJSON = orjson is not None and os.getenv("JSON_RESPONSE", "orjson") == "orjson"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson when available; same output as JSONResponse otherwise."""
+
+    def render(self, content) -> bytes:
+        if USE_ORJSON:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+
+def json_encoder() -> str:
+    return "orjson" if USE_ORJSON else "json"
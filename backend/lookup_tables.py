@@ -0,0 +1,136 @@
+"""
+Precomputed lookup tables for models with small discrete input domains
+Every input feature is a bounded integer, so for some models the whole
+input space is tiny (the SVM allergen model sees 10 sensitivity levels x 3
+binary flags = 80 inputs). Those models are evaluated once over their full
+domain at bundle-packing time and served with an O(1) array index; rows
+outside the domain, and models whose domain is too large, use the live
+scaler + model.
+"""
+import os
+
+import numpy as np
+
+# Inclusive integer range of every feature as the API accepts it
+FEATURE_RANGES = {
+    'age': (18, 100),
+    'oil_production': (1, 10),
+    'hydration_level': (1, 10),
+    'sensitivity_level': (1, 10),
+    'pore_size': (1, 10),
+    'wrinkle_score': (1, 10),
+    'suitable_for_oily': (0, 1),
+    'suitable_for_dry': (0, 1),
+    'suitable_for_sensitive': (0, 1),
+    'has_fragrance': (0, 1),
+    'has_alcohol': (0, 1),
+    'is_hypoallergenic': (0, 1),
+}
+
+# Largest domain worth tabulating (rows); larger models stay live
+LOOKUP_MAX_ROWS = int(os.getenv("LOOKUP_MAX_ROWS", "100000"))
+
+
+class LookupTable:
+    """Model outputs for every point of a mixed-radix integer grid."""
+
+    def __init__(self, features: list, lows: np.ndarray, sizes: np.ndarray,
+                 predictions: np.ndarray, probabilities: np.ndarray = None):
+        self.features = list(features)
+        self.lows = lows
+        self.sizes = sizes
+        # Row-major strides: the last feature varies fastest
+        self.strides = np.concatenate([np.cumprod(sizes[::-1])[::-1][1:], [1]]).astype(np.int64)
+        self.predictions = predictions
+        self.probabilities = probabilities
+
+    @property
+    def n_rows(self) -> int:
+        return int(np.prod(self.sizes))
+
+    def index(self, X: np.ndarray):
+        """Table index per row plus a mask of rows that fall inside the domain."""
+        offsets = X - self.lows
+        covered = np.all((offsets >= 0) & (offsets < self.sizes) & (X == np.round(X)), axis=1)
+        idx = np.zeros(len(X), dtype=np.int64)
+        idx[covered] = offsets[covered].astype(np.int64) @ self.strides
+        return idx, covered
+
+
+def domain_size(features: list) -> int:
+    """Number of distinct inputs, or 0 if a feature has no known range."""
+    if any(f not in FEATURE_RANGES for f in features):
+        return 0
+    return int(np.prod([hi - lo + 1 for lo, hi in (FEATURE_RANGES[f] for f in features)]))
+
+
+def compile_table(features: list, model, scaler=None, max_rows: int = LOOKUP_MAX_ROWS):
+    """Evaluate scaler + model over the full input domain, or None if it is too large."""
+    n_rows = domain_size(features)
+    if n_rows == 0 or n_rows > max_rows:
+        return None
+    lows = np.array([FEATURE_RANGES[f][0] for f in features], dtype=np.float64)
+    sizes = np.array([FEATURE_RANGES[f][1] - FEATURE_RANGES[f][0] + 1 for f in features], dtype=np.int64)
+    # Every grid point in row-major order, matching LookupTable.strides
+    grid = np.indices(sizes).reshape(len(features), -1).T + lows
+    X = scaler.transform(grid) if scaler is not None else grid
+    predictions, probabilities = predict_outputs(model, X)
+    return LookupTable(features, lows, sizes, predictions, probabilities)
+
+
+def predict_outputs(model, X: np.ndarray, with_proba: bool = True):
+    """
+    (predictions, probabilities) from one pass over the model. Classifiers
+    run predict_proba once and take the most probable class, which is what
+    their predict does anyway (forests, KNN, Naive Bayes) and for
+    SVC(probability=True) keeps the label consistent with the Platt-scaled
+    probability it is reported with. Regressors, and classifiers when
+    with_proba is False, run predict; probabilities is then None.
+    """
+    if not with_proba or not hasattr(model, 'predict_proba'):
+        return model.predict(X), None
+    probabilities = model.predict_proba(X)
+    return model.classes_.take(np.argmax(probabilities, axis=1)), probabilities
+
+
+def model_outputs(X: np.ndarray, model, scaler=None, table: LookupTable = None, with_proba: bool = True,
+                  timer=None):
+    """
+    (predictions, probabilities) for X: table lookups where the table covers
+    a row, one live scaler + predict_outputs pass for the rest. probabilities
+    is None when with_proba is False or the model is a regressor. timer (a
+    telemetry.StageTimer) is marked after the lookup, scale and predict /
+    predict_proba stages.
+    """
+    mark = timer.mark if timer is not None else _no_mark
+    if table is not None:
+        idx, covered = table.index(X)
+        mark('lookup')
+        if covered.all():
+            return table.predictions[idx], table.probabilities[idx] if with_proba else None
+    else:
+        covered = np.zeros(len(X), dtype=bool)
+
+    live = ~covered
+    X_live = scaler.transform(X[live]) if scaler is not None else X[live]
+    mark('scale')
+    live_predictions, live_probabilities = predict_outputs(model, X_live, with_proba)
+    mark('predict' if live_probabilities is None else 'predict_proba')
+    if not covered.any():
+        return live_predictions, live_probabilities
+
+    # Mixed batch: stitch table and live rows back into input order
+    predictions = np.empty(len(X), dtype=live_predictions.dtype)
+    predictions[covered] = table.predictions[idx[covered]]
+    predictions[live] = live_predictions
+    probabilities = None
+    if live_probabilities is not None:
+        probabilities = np.empty((len(X), live_probabilities.shape[1]))
+        probabilities[covered] = table.probabilities[idx[covered]]
+        probabilities[live] = live_probabilities
+    mark('lookup')
+    return predictions, probabilities
+
+
+def _no_mark(stage: str):
+    pass
@@ -2,23 +2,35 @@
 SkinSync FastAPI Backend
 Main application with ML model endpoints
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
-import joblib
+import asyncio
+import dataclasses
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
 import os
 import json
+import signal
+import time
 from pathlib import Path
+from catalog import ProductCatalog, rank_products
+from inference_pool import PoolSaturated, pool_from_env
+from json_response import FastJSONResponse, json_encoder
+from lookup_tables import model_outputs
+from micro_batcher import batcher_from_env
+from model_bundle import MODEL_ARTIFACTS, BundleSource, LegacySource, current_bundle_dir
+from model_registry import ModelRegistry
+from prediction_cache import cache_from_env
+from telemetry import CONTENT_TYPE, MetricsMiddleware, TimedRoute, telemetry_from_env
 
 # Initialize FastAPI app
 app = FastAPI(
     title="SkinSync ML API",
     description="Machine Learning API for personalized skincare recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson-rendered JSON (standard library without orjson) for every endpoint
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware - Allow all origins for debugging
@@ -30,55 +42,93 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load all models at startup
-models = {}
+# Prometheus metrics on /metrics; METRICS_ENABLED=0 turns off per-request and per-stage timing
+api_metrics = telemetry_from_env()
+if api_metrics.enabled:
+    # Routes record when their endpoint runs, splitting latency into validate / handler / serialize
+    app.router.route_class = TimedRoute
+    app.add_middleware(MetricsMiddleware, telemetry=api_metrics)
+
+# ANN serving backend: "numpy" (default, no TensorFlow needed) or "keras"
+ANN_BACKEND = os.getenv("ANN_BACKEND", "numpy")
+
+# Random-forest engine: "numpy" (default, flattened node arrays) or "sklearn"
+FOREST_BACKEND = os.getenv("FOREST_BACKEND", "numpy")
+
+# Memory-map bundle arrays so worker processes share them (MODEL_MMAP=0 copies them in)
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+
+def artifact_source():
+    """Serve the CURRENT model bundle if training wrote one, else the per-file artifacts."""
+    bundle_dir = current_bundle_dir()
+    # Bundles carry the NumPy ANN and forest only; the Keras and scikit-learn
+    # fallbacks read ann_model.keras / decision_tree.pkl
+    if bundle_dir and ANN_BACKEND != "keras" and FOREST_BACKEND != "sklearn":
+        return BundleSource(bundle_dir, mmap=MODEL_MMAP)
+    return LegacySource(MODEL_ARTIFACTS, ANN_BACKEND, FOREST_BACKEND)
+
+# Versioned model bundles; models load on first use (or via background
+# warm-up, see startup_event) and /models/reload swaps bundles atomically
+registry = ModelRegistry(MODEL_ARTIFACTS, artifact_source)
+
+# Warm every model in the background once the server is up (MODEL_WARMUP=0 keeps it purely lazy)
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+# Per-row prediction cache keyed by (model, bundle version, features)
+# (size via PREDICTION_CACHE_SIZE, 0 disables it)
+prediction_cache = cache_from_env()
+
+# Bounded pool that runs blocking inference off the event loop
+# (size via INFERENCE_WORKERS, queue depth via INFERENCE_QUEUE_DEPTH)
+inference_pool = pool_from_env()
+
+# Product catalog ranked by /recommend/top-k; read on first use, dropped on /models/reload
+product_catalog = None
+
+# Parent process pid when running as a serve.py worker (set after fork)
+serve_parent_pid = None
+
+# Models combined by /recommend/top-k
+RECOMMEND_MODELS = ('ann', 'decision_tree', 'svm')
 
 def load_models():
     """Load all trained models"""
-    try:
-        # Linear Regression
-        models['linear_regression'] = joblib.load('models/linear_regression.pkl')
-        models['linear_regression_scaler'] = joblib.load('models/linear_regression_scaler.pkl')
-        models['linear_regression_features'] = joblib.load('models/linear_regression_features.pkl')
-        
-        # Naive Bayes
-        models['naive_bayes'] = joblib.load('models/naive_bayes.pkl')
-        models['naive_bayes_scaler'] = joblib.load('models/naive_bayes_scaler.pkl')
-        models['naive_bayes_encoder'] = joblib.load('models/naive_bayes_encoder.pkl')
-        models['naive_bayes_features'] = joblib.load('models/naive_bayes_features.pkl')
-        
-        # KNN
-        models['knn'] = joblib.load('models/knn.pkl')
-        models['knn_scaler'] = joblib.load('models/knn_scaler.pkl')
-        models['knn_features'] = joblib.load('models/knn_features.pkl')
-        
-        # SVM
-        models['svm'] = joblib.load('models/svm.pkl')
-        models['svm_scaler'] = joblib.load('models/svm_scaler.pkl')
-        models['svm_features'] = joblib.load('models/svm_features.pkl')
-        
-        # Decision Tree
-        models['decision_tree'] = joblib.load('models/decision_tree.pkl')
-        models['decision_tree_features'] = joblib.load('models/decision_tree_features.pkl')
-        
-        # ANN
-        models['ann'] = keras.models.load_model('models/ann_model.keras')
-        models['ann_scaler'] = joblib.load('models/ann_scaler.pkl')
-        models['ann_features'] = joblib.load('models/ann_features.pkl')
-        
+    errors = registry.current().load_all()
+    if errors:
+        for name, error in errors.items():
+            print(f"Error loading {name}: {error}")
+        print("Please run 'python generate_data.py' and 'python train_models.py' first")
+    else:
         print("✓ All models loaded successfully")
+    return errors
+
+async def ensure_model(name: str, bundle=None):
+    """
+    Return the current model bundle (or the given one) with `name` loaded,
+    loading it on first use without blocking the event loop. Callers use the
+    returned bundle for the whole request so a concurrent reload can't mix versions.
+    """
+    bundle = bundle or registry.current()
+    if bundle.is_ready(name):
+        return bundle
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, bundle.load, name)
     except Exception as e:
-        print(f"Error loading models: {e}")
-        print("Please run 'python generate_data.py' and 'python train_models.py' first")
+        raise HTTPException(status_code=503, detail=f"Model '{name}' not loaded: {e}. Train and try /models/reload.")
+    return bundle
 
-def ensure_model_keys(required_keys: list):
-    """Ensure given model keys exist; attempt reload if missing."""
-    missing = [k for k in required_keys if k not in models]
-    if missing:
-        load_models()
-        missing = [k for k in required_keys if k not in models]
-        if missing:
-            raise HTTPException(status_code=503, detail=f"Models not loaded: {', '.join(missing)}. Train and try /models/reload.")
+async def ensure_catalog(bundle) -> ProductCatalog:
+    """Read the product catalog and precompute its feature templates for the bundle's models."""
+    global product_catalog
+    catalog = product_catalog
+    if catalog is None:
+        try:
+            catalog = await asyncio.get_running_loop().run_in_executor(None, ProductCatalog.load)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=503, detail=f"Product catalog not found: {e}. Run generate_data.py first.")
+        product_catalog = catalog
+    catalog.warm([bundle[f'{name}_features'] for name in RECOMMEND_MODELS])
+    return catalog
 
 # Pydantic models for request/response
 class UserProfile(BaseModel):
@@ -119,11 +169,37 @@ class SatisfactionInput(BaseModel):
     has_alcohol: int
     is_hypoallergenic: int
 
+class AllergenInput(BaseModel):
+    sensitivity_level: int = Field(..., ge=1, le=10)
+    has_fragrance: int = Field(..., ge=0, le=1)
+    has_alcohol: int = Field(..., ge=0, le=1)
+    is_hypoallergenic: int = Field(..., ge=0, le=1)
+
+class ProfileProductInput(UserProfile, ProductFeatures):
+    # One user profile + product: the union of every model's input features
+    suitable_for_oily: int = Field(..., ge=0, le=1)
+    suitable_for_dry: int = Field(..., ge=0, le=1)
+    suitable_for_sensitive: int = Field(..., ge=0, le=1)
+
+# Upper bound on rows accepted by one /predict/{model}/batch request
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+class BatchRequest(BaseModel):
+    # Rows are validated one by one against the model's input schema so that
+    # a single bad row is reported instead of rejecting the whole batch
+    inputs: List[dict] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
 # API Endpoints
 @app.on_event("startup")
 async def startup_event():
-    """Load models on startup"""
-    load_models()
+    """Start background model warm-up; requests load models on demand meanwhile"""
+    if MODEL_WARMUP:
+        registry.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the inference pool"""
+    inference_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -148,11 +224,27 @@ async def get_training_metrics():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/models/reload")
-async def reload_models():
-    """Force reload models from disk (use after training)."""
+async def reload_models(force: bool = False):
+    """
+    Reload models from disk (use after training).
+    The new bundle is loaded on a background thread and swapped in only once
+    every model loaded; requests in flight finish on the old bundle. Models
+    whose files are unchanged are reused unless force=true.
+    Under serve.py the parent reloads once and replaces every worker instead
+    (SIGHUP, or SIGUSR1 for force=true).
+    """
+    if serve_parent_pid is not None:
+        os.kill(serve_parent_pid, signal.SIGUSR1 if force else signal.SIGHUP)
+        return {"status": "reload requested", "workers": "replaced once the parent has loaded the new models",
+                "model_version": registry.current().version}
     try:
-        load_models()
-        return {"status": "ok", "loaded_keys": list(models.keys())}
+        summary = await asyncio.get_running_loop().run_in_executor(None, registry.reload, force)
+        # Entries are keyed by bundle version and can never hit again
+        prediction_cache.clear()
+        # Re-read the catalog on next use in case generate_data.py rewrote it
+        global product_catalog
+        product_catalog = None
+        return {**summary, "loaded_keys": list(registry.current().keys())}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -266,26 +358,30 @@ async def get_models_info():
         ]
     }
 
-@app.post("/predict/linear-regression")
-async def predict_hydration(profile: UserProfile):
-    """
-    Linear Regression: Predict skin hydration level
-    Business Context: Helps users understand their skin's moisture needs
-    """
-    try:
-        ensure_model_keys(['linear_regression', 'linear_regression_scaler'])
-        # Prepare features
-        features = [
-            profile.age,
-            profile.oil_production,
-            profile.sensitivity_level,
-            profile.pore_size
-        ]
-        
-        # Scale and predict
-        features_scaled = models['linear_regression_scaler'].transform([features])
-        prediction = models['linear_regression'].predict(features_scaled)[0]
-        
+# Shared inference helpers: every runner takes a (n_rows, n_features) matrix,
+# makes one vectorized scaler + model call and returns one result per row.
+# Classifiers' labels come from the same predict_proba pass as their
+# probabilities (lookup_tables.model_outputs), never from a second predict.
+SKIN_TYPE_RECOMMENDATIONS = {
+    "Oily": "Use oil-free, mattifying products with Salicylic Acid and Niacinamide",
+    "Dry": "Focus on rich moisturizers with Hyaluronic Acid, Ceramides, and Squalane",
+    "Combination": "Use targeted treatments - lightweight for T-zone, richer for dry areas",
+    "Sensitive": "Choose fragrance-free, hypoallergenic products with soothing ingredients",
+    "Normal": "Maintain balance with gentle cleansers and lightweight moisturizers"
+}
+
+def feature_matrix(rows: list, features: list) -> np.ndarray:
+    """Stack validated inputs into one matrix using the model's feature column order."""
+    return np.array([[getattr(row, f) for f in features] for row in rows], dtype=float)
+
+def run_linear_regression(X: np.ndarray, bundle) -> list:
+    """Predict hydration levels for every row of X using one model bundle."""
+    timer = api_metrics.stage_timer('linear_regression', len(X))
+    predictions, _ = model_outputs(X, bundle['linear_regression'], bundle['linear_regression_scaler'],
+                                   bundle.get('linear_regression_lookup'), with_proba=False, timer=timer)
+    
+    results = []
+    for prediction in predictions:
         # Interpret result
         if prediction < 4:
             interpretation = "Low hydration - Your skin needs intensive moisturizing products"
@@ -297,64 +393,331 @@ async def predict_hydration(profile: UserProfile):
             interpretation = "High hydration - Your skin is well-moisturized"
             recommendation = "Use oil-control products and lighter formulations"
         
-        return {
+        results.append({
             "algorithm": "Linear Regression",
             "predicted_hydration_level": round(float(prediction), 2),
             "interpretation": interpretation,
-            "recommendation": recommendation,
+            "recommendation": recommendation
+        })
+    timer.done('format')
+    return results
+
+def run_naive_bayes(X: np.ndarray, bundle) -> list:
+    """Classify skin type for every row of X."""
+    timer = api_metrics.stage_timer('naive_bayes', len(X))
+    predictions, probabilities = model_outputs(X, bundle['naive_bayes'], bundle['naive_bayes_scaler'],
+                                               bundle.get('naive_bayes_lookup'), timer=timer)
+    
+    # Decode predictions in one call
+    encoder = bundle['naive_bayes_encoder']
+    skin_types = encoder.inverse_transform(predictions)
+    timer.mark('inverse_transform')
+    
+    results = []
+    for skin_type, row_probabilities in zip(skin_types, probabilities):
+        confidence = float(max(row_probabilities)) * 100
+        results.append({
+            "algorithm": "Naive Bayes",
+            "predicted_skin_type": skin_type,
+            "confidence": round(confidence, 2),
+            "all_probabilities": {
+                label: round(float(prob) * 100, 2)
+                for label, prob in zip(encoder.classes_, row_probabilities)
+            },
+            "recommendation": SKIN_TYPE_RECOMMENDATIONS[skin_type]
+        })
+    timer.done('format')
+    return results
+
+def run_knn(X: np.ndarray, bundle) -> list:
+    """Recommend / not recommend for every row of X."""
+    timer = api_metrics.stage_timer('knn', len(X))
+    predictions, probabilities = model_outputs(X, bundle['knn'], bundle['knn_scaler'], timer=timer)
+    
+    results = []
+    for prediction, row_probabilities in zip(predictions, probabilities):
+        confidence = float(max(row_probabilities)) * 100
+        would_recommend = bool(prediction)
+        results.append({
+            "algorithm": "K-Nearest Neighbors (KNN)",
+            "recommendation": "Recommended" if would_recommend else "Not Recommended",
+            "would_recommend": would_recommend,
+            "confidence": round(confidence, 2),
+            "explanation": "Based on similar users' experiences and satisfaction scores",
+            "similar_users_liked": would_recommend
+        })
+    timer.done('format')
+    return results
+
+def run_svm(X: np.ndarray, bundle) -> list:
+    """Assess allergen risk for every row of X."""
+    timer = api_metrics.stage_timer('svm', len(X))
+    predictions, probabilities = model_outputs(X, bundle['svm'], bundle['svm_scaler'], bundle.get('svm_lookup'),
+                                               timer=timer)
+    
+    results = []
+    for prediction, row_probabilities in zip(predictions, probabilities):
+        risk_probability = float(row_probabilities[1]) * 100  # Probability of reaction
+        has_risk = bool(prediction)
+        
+        if has_risk:
+            risk_level = "High Risk"
+            warning = "⚠️ This product may cause allergic reactions based on your sensitivity level"
+        else:
+            risk_level = "Low Risk"
+            warning = "✓ This product is likely safe for your skin type"
+        
+        results.append({
+            "algorithm": "Support Vector Machine (SVM)",
+            "allergen_risk": risk_level,
+            "has_risk": has_risk,
+            "risk_probability": round(risk_probability, 2),
+            "warning": warning,
+            "advice": "Patch test recommended" if has_risk else "Product appears safe for your skin"
+        })
+    timer.done('format')
+    return results
+
+def run_decision_tree(X: np.ndarray, bundle) -> list:
+    """Classify product suitability for every row of X (no scaling needed)."""
+    timer = api_metrics.stage_timer('decision_tree', len(X))
+    predictions, probabilities = model_outputs(X, bundle['decision_tree'], None, bundle.get('decision_tree_lookup'),
+                                               timer=timer)
+    
+    results = []
+    for prediction, row_probabilities in zip(predictions, probabilities):
+        is_suitable = bool(prediction)
+        confidence = float(max(row_probabilities)) * 100
+        
+        if is_suitable:
+            verdict = "✓ Suitable Product"
+            explanation = "This product matches your skin profile and is likely to give good results"
+        else:
+            verdict = "✗ Not Suitable"
+            explanation = "This product may not be ideal for your skin type and conditions"
+        
+        results.append({
+            "algorithm": "Decision Tree",
+            "verdict": verdict,
+            "is_suitable": is_suitable,
+            "confidence": round(confidence, 2),
+            "explanation": explanation,
+            "expected_satisfaction": "High (7+/10)" if is_suitable else "Low (<7/10)"
+        })
+    timer.done('format')
+    return results
+
+def run_ann(X: np.ndarray, bundle) -> list:
+    """Predict satisfaction scores for every row of X."""
+    timer = api_metrics.stage_timer('ann', len(X))
+    features_scaled = bundle['ann_scaler'].transform(X)
+    timer.mark('scale')
+    predictions = bundle['ann'].predict(features_scaled, verbose=0)[:, 0]
+    timer.mark('predict')
+    
+    results = []
+    for prediction in predictions:
+        # Interpret score
+        score = float(prediction)
+        if score >= 8:
+            rating = "Excellent Match"
+            emoji = "🌟"
+        elif score >= 7:
+            rating = "Good Match"
+            emoji = "✓"
+        elif score >= 5:
+            rating = "Average Match"
+            emoji = "○"
+        else:
+            rating = "Poor Match"
+            emoji = "✗"
+        
+        results.append({
+            "algorithm": "Artificial Neural Network (ANN)",
+            "predicted_satisfaction_score": round(score, 2),
+            "rating": f"{emoji} {rating}",
+            "interpretation": f"Expected satisfaction: {round(score, 1)}/10",
+            "recommendation": "Highly recommended" if score >= 7 else "Consider alternatives" if score >= 5 else "Not recommended",
+            "deep_learning_insight": "This prediction uses neural network analysis of complex patterns in user-product interactions"
+        })
+    timer.done('format')
+    return results
+
+async def run_inference(response: Response, name: str, X: np.ndarray, bundle) -> list:
+    """Run a model's runner on the inference pool and report queue/exec timings."""
+    try:
+        results, timing = await inference_pool.run(MODEL_RUNNERS[name], X, bundle)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    api_metrics.observe_stages(name, {"queue": timing.queue_ms / 1000})
+    response.headers["Server-Timing"] = timing.server_timing()
+    return results
+
+async def run_coalesced(response: Response, batcher, X: np.ndarray, bundle) -> dict:
+    """Score one row through a micro-batcher shared with concurrent requests on the same bundle."""
+    try:
+        result, timing, batch_size, batch_wait_ms = await batcher.submit(X, bundle)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    # Queue time includes waiting for the batch to fill, not just for a pool thread
+    timing = dataclasses.replace(timing, queue_ms=batch_wait_ms + timing.queue_ms)
+    api_metrics.observe_stages('ann', {"queue": timing.queue_ms / 1000})
+    response.headers["Server-Timing"] = (f'{timing.server_timing()}, '
+                                         f'batch;dur={batch_wait_ms:.3f};desc="{batch_size} rows"')
+    return result
+
+# Concurrent /predict/ann requests share one forward pass
+# (window via ANN_BATCH_WINDOW_MS, size via ANN_BATCH_MAX_ROWS)
+# Rows are batched per bundle, so each one is scored by the bundle its request pinned
+ann_batcher = batcher_from_env(run_ann, inference_pool.run, "ANN")
+
+# Counters and gauges the pool, cache, batcher and registry already keep, read on each /metrics scrape
+def _stat(component, key: str):
+    return lambda: {(): component.stats()[key]}
+
+api_metrics.gauge("skinsync_inference_pool_outstanding", "Inference calls running or queued",
+                  collect=_stat(inference_pool, "outstanding"))
+api_metrics.counter("skinsync_inference_pool_completed_total", "Inference calls completed",
+                    collect=_stat(inference_pool, "completed"))
+api_metrics.counter("skinsync_inference_pool_rejected_total", "Inference calls shed with 503 (queue full)",
+                    collect=_stat(inference_pool, "rejected"))
+api_metrics.counter("skinsync_prediction_cache_hits_total", "Prediction cache hits (rows)",
+                    collect=_stat(prediction_cache, "hits"))
+api_metrics.counter("skinsync_prediction_cache_misses_total", "Prediction cache misses (rows)",
+                    collect=_stat(prediction_cache, "misses"))
+api_metrics.counter("skinsync_prediction_cache_evictions_total", "Prediction cache LRU evictions",
+                    collect=_stat(prediction_cache, "evictions"))
+api_metrics.gauge("skinsync_prediction_cache_entries", "Rows in the prediction cache",
+                  collect=_stat(prediction_cache, "entries"))
+api_metrics.counter("skinsync_ann_batcher_batches_total", "Coalesced ANN forward passes",
+                    collect=_stat(ann_batcher, "batches"))
+api_metrics.counter("skinsync_ann_batcher_rows_total", "Rows sent through coalesced ANN forward passes",
+                    collect=_stat(ann_batcher, "rows"))
+api_metrics.gauge("skinsync_ann_batcher_pending_rows", "Rows waiting for the next ANN batch",
+                  collect=_stat(ann_batcher, "pending"))
+api_metrics.gauge("skinsync_model_ready", "1 once the model is loaded in the served bundle", ("model",),
+                  collect=lambda: {(name,): int(status["status"] == "ready")
+                                   for name, status in registry.current().status().items()})
+api_metrics.gauge("skinsync_model_load_seconds", "Time the model took to load into the served bundle", ("model",),
+                  collect=lambda: {(name,): status["load_seconds"]
+                                   for name, status in registry.current().status().items()})
+api_metrics.gauge("skinsync_model_bundle_version", "Registry version of the served bundle (bumped by each reload)",
+                  collect=lambda: {(): registry.current().version})
+
+MODEL_RUNNERS = {
+    'linear_regression': run_linear_regression,
+    'naive_bayes': run_naive_bayes,
+    'knn': run_knn,
+    'svm': run_svm,
+    'decision_tree': run_decision_tree,
+    'ann': run_ann,
+}
+
+# ?compact=true keeps each model's machine-readable outputs only: no
+# input_features echo and none of the fixed explanatory text
+COMPACT_FIELDS = {
+    'linear_regression': ('predicted_hydration_level',),
+    'naive_bayes': ('predicted_skin_type', 'confidence', 'all_probabilities'),
+    'knn': ('would_recommend', 'confidence'),
+    'svm': ('has_risk', 'risk_probability'),
+    'decision_tree': ('is_suitable', 'confidence'),
+    'ann': ('predicted_satisfaction_score',),
+}
+
+def compact_result(name: str, result: dict) -> dict:
+    return {field: result[field] for field in COMPACT_FIELDS[name]}
+
+def prediction_response(response: Response, content: dict) -> FastJSONResponse:
+    """
+    Encode a prediction body in one pass (no jsonable_encoder copy), keeping
+    the headers already set on the request's `response` (Server-Timing).
+    """
+    return FastJSONResponse(content, headers=response.headers)
+
+async def predict_rows(response: Response, name: str, X: np.ndarray, bundle) -> list:
+    """
+    Results for every row of X: cached rows are answered directly, only the
+    misses reach the inference pool (single ANN rows go through the batcher,
+    whether or not the cache is enabled).
+    """
+    if prediction_cache.enabled:
+        timer = api_metrics.stage_timer(name, None)
+        keys = prediction_cache.keys_for(name, bundle.version, X)
+        results = prediction_cache.lookup(keys)
+        missing = [i for i, result in enumerate(results) if result is None]
+        timer.done('cache')
+        if not missing:
+            response.headers["Server-Timing"] = 'cache;desc="hit"'
+            return results
+    else:
+        keys, results, missing = None, [None] * len(X), list(range(len(X)))
+    
+    X_missing = X[missing]
+    if name == 'ann' and ann_batcher.enabled and len(missing) == 1:
+        fresh = [await run_coalesced(response, ann_batcher, X_missing, bundle)]
+    else:
+        fresh = await run_inference(response, name, X_missing, bundle)
+    if keys is not None:
+        prediction_cache.store([keys[i] for i in missing], fresh)
+    for i, result in zip(missing, fresh):
+        results[i] = result
+    return results
+
+# Batch endpoint registry: URL name -> (input schema, model key)
+# The model key indexes MODEL_RUNNERS, MODEL_ARTIFACTS and its '<key>_features' column list.
+BATCH_MODELS = {
+    "linear-regression": (UserProfile, 'linear_regression'),
+    "naive-bayes": (UserProfile, 'naive_bayes'),
+    "knn": (UserProfile, 'knn'),
+    "svm": (AllergenInput, 'svm'),
+    "decision-tree": (SuitabilityInput, 'decision_tree'),
+    "ann": (SatisfactionInput, 'ann'),
+}
+
+@app.post("/predict/linear-regression")
+async def predict_hydration(profile: UserProfile, response: Response, compact: bool = False):
+    """
+    Linear Regression: Predict skin hydration level
+    Business Context: Helps users understand their skin's moisture needs
+    """
+    try:
+        bundle = await ensure_model('linear_regression')
+        # Prepare features, scale and predict
+        X = feature_matrix([profile], bundle['linear_regression_features'])
+        result = (await predict_rows(response, 'linear_regression', X, bundle))[0]
+        if compact:
+            return prediction_response(response, compact_result('linear_regression', result))
+        
+        return prediction_response(response, {
+            **result,
             "input_features": {
                 "age": profile.age,
                 "oil_production": profile.oil_production,
                 "sensitivity_level": profile.sensitivity_level,
                 "pore_size": profile.pore_size
             }
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict/naive-bayes")
-async def predict_skin_type(profile: UserProfile):
+async def predict_skin_type(profile: UserProfile, response: Response, compact: bool = False):
     """
     Naive Bayes: Classify skin type
     Business Context: Helps users identify their skin type for targeted product selection
     """
     try:
-        # Prepare features
-        features = [
-            profile.age,
-            profile.oil_production,
-            profile.hydration_level,
-            profile.sensitivity_level,
-            profile.pore_size
-        ]
+        bundle = await ensure_model('naive_bayes')
+        # Prepare features, scale and predict
+        X = feature_matrix([profile], bundle['naive_bayes_features'])
+        result = (await predict_rows(response, 'naive_bayes', X, bundle))[0]
+        if compact:
+            return prediction_response(response, compact_result('naive_bayes', result))
         
-        # Scale and predict
-        features_scaled = models['naive_bayes_scaler'].transform([features])
-        prediction = models['naive_bayes'].predict(features_scaled)[0]
-        probabilities = models['naive_bayes'].predict_proba(features_scaled)[0]
-        
-        # Decode prediction
-        skin_type = models['naive_bayes_encoder'].inverse_transform([prediction])[0]
-        confidence = float(max(probabilities)) * 100
-        
-        # Recommendations based on skin type
-        recommendations = {
-            "Oily": "Use oil-free, mattifying products with Salicylic Acid and Niacinamide",
-            "Dry": "Focus on rich moisturizers with Hyaluronic Acid, Ceramides, and Squalane",
-            "Combination": "Use targeted treatments - lightweight for T-zone, richer for dry areas",
-            "Sensitive": "Choose fragrance-free, hypoallergenic products with soothing ingredients",
-            "Normal": "Maintain balance with gentle cleansers and lightweight moisturizers"
-        }
-        
-        return {
-            "algorithm": "Naive Bayes",
-            "predicted_skin_type": skin_type,
-            "confidence": round(confidence, 2),
-            "all_probabilities": {
-                skin_type: round(float(prob) * 100, 2) 
-                for skin_type, prob in zip(models['naive_bayes_encoder'].classes_, probabilities)
-            },
-            "recommendation": recommendations[skin_type],
+        return prediction_response(response, {
+            **result,
             "input_features": {
                 "age": profile.age,
                 "oil_production": profile.oil_production,
@@ -362,42 +725,28 @@ async def predict_skin_type(profile: UserProfile):
                 "sensitivity_level": profile.sensitivity_level,
                 "pore_size": profile.pore_size
             }
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict/knn")
-async def recommend_product(profile: UserProfile):
+async def recommend_product(profile: UserProfile, response: Response, compact: bool = False):
     """
     KNN: Product recommendation based on similar users
     Business Context: Recommends products that similar users have liked
     """
     try:
-        # Prepare features
-        features = [
-            profile.age,
-            profile.oil_production,
-            profile.hydration_level,
-            profile.sensitivity_level,
-            profile.pore_size,
-            profile.wrinkle_score
-        ]
-        
-        # Scale and predict
-        features_scaled = models['knn_scaler'].transform([features])
-        prediction = models['knn'].predict(features_scaled)[0]
-        probabilities = models['knn'].predict_proba(features_scaled)[0]
+        bundle = await ensure_model('knn')
+        # Prepare features, scale and predict
+        X = feature_matrix([profile], bundle['knn_features'])
+        result = (await predict_rows(response, 'knn', X, bundle))[0]
+        if compact:
+            return prediction_response(response, compact_result('knn', result))
         
-        confidence = float(max(probabilities)) * 100
-        would_recommend = bool(prediction)
-        
-        return {
-            "algorithm": "K-Nearest Neighbors (KNN)",
-            "recommendation": "Recommended" if would_recommend else "Not Recommended",
-            "would_recommend": would_recommend,
-            "confidence": round(confidence, 2),
-            "explanation": "Based on similar users' experiences and satisfaction scores",
-            "similar_users_liked": would_recommend,
+        return prediction_response(response, {
+            **result,
             "input_features": {
                 "age": profile.age,
                 "oil_production": profile.oil_production,
@@ -406,162 +755,241 @@ async def recommend_product(profile: UserProfile):
                 "pore_size": profile.pore_size,
                 "wrinkle_score": profile.wrinkle_score
             }
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict/svm")
-async def detect_allergen_risk(data: dict):
+async def detect_allergen_risk(data: AllergenInput, response: Response, compact: bool = False):
     """
     SVM: Allergen risk detection
     Business Context: Prevents allergic reactions by identifying risky products
     """
     try:
-        # Prepare features
-        features = [
-            data['sensitivity_level'],
-            data['has_fragrance'],
-            data['has_alcohol'],
-            data['is_hypoallergenic']
-        ]
-        
-        # Scale and predict
-        features_scaled = models['svm_scaler'].transform([features])
-        prediction = models['svm'].predict(features_scaled)[0]
-        probabilities = models['svm'].predict_proba(features_scaled)[0]
+        bundle = await ensure_model('svm')
+        # Prepare features, scale and predict
+        X = feature_matrix([data], bundle['svm_features'])
+        result = (await predict_rows(response, 'svm', X, bundle))[0]
+        if compact:
+            return prediction_response(response, compact_result('svm', result))
         
-        risk_probability = float(probabilities[1]) * 100  # Probability of reaction
-        has_risk = bool(prediction)
-        
-        if has_risk:
-            risk_level = "High Risk"
-            warning = "⚠️ This product may cause allergic reactions based on your sensitivity level"
-        else:
-            risk_level = "Low Risk"
-            warning = "✓ This product is likely safe for your skin type"
-        
-        return {
-            "algorithm": "Support Vector Machine (SVM)",
-            "allergen_risk": risk_level,
-            "has_risk": has_risk,
-            "risk_probability": round(risk_probability, 2),
-            "warning": warning,
-            "advice": "Patch test recommended" if has_risk else "Product appears safe for your skin",
+        return prediction_response(response, {
+            **result,
             "input_features": {
-                "sensitivity_level": data['sensitivity_level'],
-                "has_fragrance": bool(data['has_fragrance']),
-                "has_alcohol": bool(data['has_alcohol']),
-                "is_hypoallergenic": bool(data['is_hypoallergenic'])
+                "sensitivity_level": data.sensitivity_level,
+                "has_fragrance": bool(data.has_fragrance),
+                "has_alcohol": bool(data.has_alcohol),
+                "is_hypoallergenic": bool(data.is_hypoallergenic)
             }
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict/decision-tree")
-async def classify_suitability(data: SuitabilityInput):
+async def classify_suitability(data: SuitabilityInput, response: Response, compact: bool = False):
     """
     Decision Tree: Product suitability classification
     Business Context: Determines if a product is suitable for user's profile
     """
     try:
-        # Prepare features
-        features = [
-            data.age,
-            data.sensitivity_level,
-            data.oil_production,
-            data.hydration_level,
-            data.suitable_for_oily,
-            data.suitable_for_dry,
-            data.suitable_for_sensitive,
-            data.has_fragrance,
-            data.has_alcohol
-        ]
-        
-        # Predict (no scaling needed for decision tree)
-        prediction = models['decision_tree'].predict([features])[0]
-        probabilities = models['decision_tree'].predict_proba([features])[0]
-        
-        is_suitable = bool(prediction)
-        confidence = float(max(probabilities)) * 100
+        bundle = await ensure_model('decision_tree')
+        # Prepare features and predict
+        X = feature_matrix([data], bundle['decision_tree_features'])
+        result = (await predict_rows(response, 'decision_tree', X, bundle))[0]
+        if compact:
+            return prediction_response(response, compact_result('decision_tree', result))
         
-        if is_suitable:
-            verdict = "✓ Suitable Product"
-            explanation = "This product matches your skin profile and is likely to give good results"
-        else:
-            verdict = "✗ Not Suitable"
-            explanation = "This product may not be ideal for your skin type and conditions"
-        
-        return {
-            "algorithm": "Decision Tree",
-            "verdict": verdict,
-            "is_suitable": is_suitable,
-            "confidence": round(confidence, 2),
-            "explanation": explanation,
-            "expected_satisfaction": "High (7+/10)" if is_suitable else "Low (<7/10)",
-            "input_features": data.dict()
-        }
+        return prediction_response(response, {
+            **result,
+            "input_features": data.model_dump()
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict/ann")
-async def predict_satisfaction(data: SatisfactionInput):
+async def predict_satisfaction(data: SatisfactionInput, response: Response, compact: bool = False):
     """
     Artificial Neural Network: Advanced satisfaction prediction
     Business Context: Uses deep learning to predict product satisfaction score
     """
     try:
-        ensure_model_keys(['ann', 'ann_scaler'])
-        # Prepare features
-        features = [
-            data.age,
-            data.oil_production,
-            data.hydration_level,
-            data.sensitivity_level,
-            data.pore_size,
-            data.wrinkle_score,
-            data.suitable_for_oily,
-            data.suitable_for_dry,
-            data.suitable_for_sensitive,
-            data.has_fragrance,
-            data.has_alcohol,
-            data.is_hypoallergenic
-        ]
+        bundle = await ensure_model('ann')
+        # Prepare features, scale and predict
+        X = feature_matrix([data], bundle['ann_features'])
+        result = (await predict_rows(response, 'ann', X, bundle))[0]
+        if compact:
+            return prediction_response(response, compact_result('ann', result))
         
-        # Scale and predict
-        features_scaled = models['ann_scaler'].transform([features])
-        prediction = models['ann'].predict(features_scaled, verbose=0)[0][0]
+        return prediction_response(response, {
+            **result,
+            "input_features": data.model_dump()
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# /predict/all extracts this canonical vector once and slices each model's
+# '<key>_features' columns out of it
+COMPOSITE_FEATURES = list(ProfileProductInput.model_fields)
+COMPOSITE_INDEX = {feature: i for i, feature in enumerate(COMPOSITE_FEATURES)}
+
+@app.post("/predict/all")
+async def predict_all(data: ProfileProductInput, response: Response, compact: bool = False):
+    """
+    All six models for one profile + product in one call
+    Validates and extracts the features once, then runs every model
+    concurrently on the same bundle, so the request takes about as long as
+    the slowest model. Per-model wall times are in timings_ms and Server-Timing.
+    """
+    try:
+        bundle = registry.current()
+        for name in MODEL_RUNNERS:
+            await ensure_model(name, bundle)
+        x = np.array([getattr(data, f) for f in COMPOSITE_FEATURES], dtype=float)
         
-        # Interpret score
-        score = float(prediction)
-        if score >= 8:
-            rating = "Excellent Match"
-            emoji = "🌟"
-        elif score >= 7:
-            rating = "Good Match"
-            emoji = "✓"
-        elif score >= 5:
-            rating = "Average Match"
-            emoji = "○"
-        else:
-            rating = "Poor Match"
-            emoji = "✗"
+        wall_ms = {}
         
-        return {
-            "algorithm": "Artificial Neural Network (ANN)",
-            "predicted_satisfaction_score": round(score, 2),
-            "rating": f"{emoji} {rating}",
-            "interpretation": f"Expected satisfaction: {round(score, 1)}/10",
-            "recommendation": "Highly recommended" if score >= 7 else "Consider alternatives" if score >= 5 else "Not recommended",
-            "deep_learning_insight": "This prediction uses neural network analysis of complex patterns in user-product interactions",
-            "input_features": data.dict()
-        }
+        async def run_model(name: str):
+            start = time.perf_counter()
+            X = x[None, [COMPOSITE_INDEX[f] for f in bundle[f'{name}_features']]]
+            # Each model's own Server-Timing goes to a scratch response; this one reports wall times
+            result = (await predict_rows(Response(), name, X, bundle))[0]
+            wall_ms[name] = round((time.perf_counter() - start) * 1000, 3)
+            return result
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_model(name) for name in MODEL_RUNNERS))
+        timings = {name: wall_ms[name] for name in MODEL_RUNNERS}
+        timings["total"] = round((time.perf_counter() - start) * 1000, 3)
+        response.headers["Server-Timing"] = ", ".join(f"{name};dur={ms}" for name, ms in timings.items())
+        if compact:
+            return prediction_response(response, {
+                "model_version": bundle.version,
+                "predictions": {name: compact_result(name, result) for name, result in zip(MODEL_RUNNERS, results)},
+                "timings_ms": timings
+            })
+        
+        return prediction_response(response, {
+            "model_version": bundle.version,
+            "predictions": dict(zip(MODEL_RUNNERS, results)),
+            "timings_ms": timings,
+            "input_features": data.model_dump()
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/{model_name}/batch")
+async def predict_batch(model_name: str, request: BatchRequest, response: Response, compact: bool = False):
+    """
+    Batch prediction for any of the six models
+    Validates each row on its own, runs one vectorized scaler + model call
+    over the valid rows and returns results in input order. Invalid rows
+    carry their validation errors instead of a prediction.
+    """
+    if model_name not in BATCH_MODELS:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model_name}'. Available: {', '.join(BATCH_MODELS)}")
+    schema, model_key = BATCH_MODELS[model_name]
+    try:
+        bundle = await ensure_model(model_key)
+        
+        # Validate rows individually so one bad row doesn't fail the batch
+        results = [None] * len(request.inputs)
+        valid_rows, valid_indices = [], []
+        for i, raw in enumerate(request.inputs):
+            try:
+                valid_rows.append(schema.model_validate(raw))
+                valid_indices.append(i)
+            except ValidationError as e:
+                results[i] = {"index": i, "error": e.errors(include_url=False)}
+        
+        api_metrics.batch_rows.observe(len(request.inputs), model_key)
+        
+        # One vectorized call for all valid rows
+        if valid_rows:
+            X = feature_matrix(valid_rows, bundle[f'{model_key}_features'])
+            for i, result in zip(valid_indices, await predict_rows(response, model_key, X, bundle)):
+                results[i] = {"index": i, **(compact_result(model_key, result) if compact else result)}
+        
+        # Validation errors are built from the raw JSON rows, so they encode as they are
+        return prediction_response(response, {
+            "model": model_name,
+            "count": len(results),
+            "valid_count": len(valid_rows),
+            "results": results
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/recommend/top-k")
+async def recommend_top_k(profile: UserProfile, response: Response, k: int = Query(10, ge=1, le=100)):
+    """
+    Rank the whole product catalog for one profile
+    Business Context: Turns the satisfaction, suitability and allergen models into a shopping list
+    Every product is scored in one vectorized pass per model:
+    ANN satisfaction x decision-tree P(suitable) x (1 - SVM P(reaction)).
+    """
+    try:
+        bundle = registry.current()
+        for name in RECOMMEND_MODELS:
+            await ensure_model(name, bundle)
+        catalog = await ensure_catalog(bundle)
+        try:
+            (recommendations, stages), timing = await inference_pool.run(rank_products, catalog, profile, bundle, k)
+        except PoolSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        response.headers["Server-Timing"] = ", ".join(
+            [timing.server_timing()] + [f"{stage};dur={ms}" for stage, ms in stages.items()])
+        api_metrics.observe_stages('recommend_top_k', {"queue": timing.queue_ms / 1000,
+                                                       **{stage: ms / 1000 for stage, ms in stages.items()}},
+                                   len(catalog))
+        
+        return prediction_response(response, {
+            "k": len(recommendations),
+            "catalog_size": len(catalog),
+            "model_version": bundle.version,
+            "recommendations": recommendations,
+            "timings_ms": {"queue": round(timing.queue_ms, 3), "exec": round(timing.exec_ms, 3), **stages}
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request, inference stage, cache, batching and model-load metrics in the Prometheus text format"""
+    return Response(api_metrics.render(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """Health check for deployment"""
-    return {"status": "healthy", "models_loaded": len(models) > 0}
+    bundle = registry.current()
+    return {
+        "status": "healthy",
+        "pid": os.getpid(),
+        "models_loaded": len(bundle) > 0,
+        "ready": all(bundle.is_ready(name) for name in MODEL_ARTIFACTS),
+        "model_version": bundle.version,
+        "model_source": bundle.source.describe(),
+        "models": bundle.status(),
+        "last_reload": registry.last_reload,
+        "inference_pool": inference_pool.stats(),
+        "ann_batcher": ann_batcher.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "json_encoder": json_encoder(),
+        "catalog": {"products": len(product_catalog), "loaded_at": product_catalog.loaded_at} if product_catalog else None
+    }
 
 if __name__ == "__main__":
     import uvicorn
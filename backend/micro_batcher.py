@@ -0,0 +1,104 @@
+"""
+Request coalescing for models with a high fixed per-call cost
+Concurrent single-row requests are collected for a short window and sent
+through the model as one batch; each caller gets its own row back.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects rows from concurrent callers and flushes them as one batch when
+    either max_rows rows are waiting or max_wait_ms has passed since the
+    first row arrived.
+    `execute(fn, X, context)` must be awaitable and return (results, timing),
+    which is what InferencePool.run provides. Rows are only batched with rows
+    submitted under the same context (the model bundle a request pinned), so
+    a reload never changes which models score a row that is already queued.
+    Each caller also gets how long its row waited for the batch to flush.
+    """
+
+    def __init__(self, fn, execute, max_rows: int = 64, max_wait_ms: float = 2.0):
+        self.fn = fn
+        self.execute = execute
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        # id(context) -> (context, [(row, future, submitted), ...], flush timer)
+        self._pending = {}
+        # The loop only keeps weak references to tasks; running flushes live here
+        self._tasks = set()
+        self._batches = 0
+        self._rows = 0
+        self._batch_sizes = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 1 and self.max_wait > 0
+
+    async def submit(self, X: np.ndarray, context=None):
+        """
+        Queue a (1, n_features) row to be scored as fn(batch, context);
+        returns (result, timing, batch_size, batch_wait_ms).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = id(context)
+        if key not in self._pending:
+            # Every group gets its own window, started by its first row
+            self._pending[key] = (context, [], loop.call_later(self.max_wait, self._flush, key))
+        _, batch, _ = self._pending[key]
+        batch.append((X, future, time.perf_counter()))
+        if len(batch) >= self.max_rows:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: int):
+        context, batch, timer = self._pending.pop(key)
+        # A group filled before its window ended; its timer must not flush the next group
+        timer.cancel()
+        task = asyncio.ensure_future(self._run(context, batch, time.perf_counter()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, context, batch: list, flushed: float):
+        X = np.vstack([row for row, _, _ in batch])
+        try:
+            results, timing = await self.execute(self.fn, X, context)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._rows += len(batch)
+        self._batch_sizes[len(batch)] += 1
+        for (_, future, submitted), result in zip(batch, results):
+            # Callers that went away (client disconnect) are simply skipped
+            if not future.done():
+                future.set_result((result, timing, len(batch), (flushed - submitted) * 1000))
+
+    def stats(self) -> dict:
+        """Window configuration and observed batch sizes."""
+        return {
+            "enabled": self.enabled,
+            "max_rows": self.max_rows,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": sum(len(batch) for _, batch, _ in self._pending.values()),
+            "batches": self._batches,
+            "rows": self._rows,
+            "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else None,
+            "max_batch_size": max(self._batch_sizes) if self._batch_sizes else None,
+        }
+
+
+def batcher_from_env(fn, execute, prefix: str) -> MicroBatcher:
+    """Build a batcher from <prefix>_BATCH_MAX_ROWS / <prefix>_BATCH_WINDOW_MS."""
+    max_rows = int(os.getenv(f"{prefix}_BATCH_MAX_ROWS", "64"))
+    max_wait_ms = float(os.getenv(f"{prefix}_BATCH_WINDOW_MS", "2"))
+    return MicroBatcher(fn, execute, max_rows=max_rows, max_wait_ms=max_wait_ms)
@@ -0,0 +1,210 @@
+"""
+Consolidated, versioned model bundles
+Training writes one directory per version:
+
+    models/bundles/<version>/
+        manifest.json       version, per-model file, sha256 and feature list
+        <model>.joblib      model + scaler/encoder + feature list for one model,
+                            plus <model>_lookup for small-domain models
+    models/bundles/CURRENT  name of the version the API serves
+
+joblib stores NumPy arrays (KNN training matrix, SVM support vectors, forest
+node arrays, ANN weights) uncompressed inside each file, so the API opens them with
+mmap_mode='r' and every worker process shares those pages through the OS
+page cache instead of holding a private copy.
+
+Pack the current per-file artifacts into a new bundle (from backend/):
+    python model_bundle.py
+"""
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+
+from ann_numpy import ANN_MODEL_PATH, ANN_WEIGHTS_PATH, NumpyANN
+from forest_numpy import FOREST_ARRAYS_PATH, FOREST_MODEL_PATH, NumpyForest
+from lookup_tables import compile_table
+
+BUNDLES_DIR = 'models/bundles'
+
+# Artifacts each model needs at inference time
+MODEL_ARTIFACTS = {
+    'linear_regression': ['linear_regression', 'linear_regression_scaler', 'linear_regression_features'],
+    'naive_bayes': ['naive_bayes', 'naive_bayes_scaler', 'naive_bayes_encoder', 'naive_bayes_features'],
+    'knn': ['knn', 'knn_scaler', 'knn_features'],
+    'svm': ['svm', 'svm_scaler', 'svm_features'],
+    'decision_tree': ['decision_tree', 'decision_tree_features'],
+    'ann': ['ann', 'ann_scaler', 'ann_features'],
+}
+
+
+def fingerprint(paths: list) -> str:
+    """SHA-256 over the contents of one or more files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def legacy_artifact_path(key: str, ann_backend: str = 'numpy', forest_backend: str = 'numpy') -> str:
+    """File a per-file (pre-bundle) artifact lives in."""
+    if key == 'ann':
+        if ann_backend != 'keras' and os.path.exists(ANN_WEIGHTS_PATH):
+            return ANN_WEIGHTS_PATH
+        return ANN_MODEL_PATH
+    if key == 'decision_tree':
+        if forest_backend != 'sklearn' and os.path.exists(FOREST_ARRAYS_PATH):
+            return FOREST_ARRAYS_PATH
+        return FOREST_MODEL_PATH
+    return f'models/{key}.pkl'
+
+
+def load_legacy_artifact(key: str, ann_backend: str = 'numpy', forest_backend: str = 'numpy'):
+    """
+    Load one per-file artifact; the ANN and the random forest use their NumPy
+    engines unless Keras / scikit-learn is requested.
+    """
+    path = legacy_artifact_path(key, ann_backend, forest_backend)
+    if path == FOREST_ARRAYS_PATH:
+        return NumpyForest.load(path)
+    if key == 'ann':
+        if path == ANN_WEIGHTS_PATH:
+            return NumpyANN.load(path)
+        # Imported lazily: TensorFlow is only needed for the Keras fallback
+        from tensorflow import keras
+        return keras.models.load_model(path)
+    return joblib.load(path)
+
+
+class LegacySource:
+    """Reads the individual models/*.pkl files written before bundles existed."""
+
+    def __init__(self, groups: dict = MODEL_ARTIFACTS, ann_backend: str = 'numpy', forest_backend: str = 'numpy'):
+        self.groups = groups
+        self.ann_backend = ann_backend
+        self.forest_backend = forest_backend
+
+    def fingerprint(self, name: str) -> str:
+        return fingerprint([legacy_artifact_path(key, self.ann_backend, self.forest_backend)
+                            for key in self.groups[name]])
+
+    def load(self, name: str) -> dict:
+        return {key: load_legacy_artifact(key, self.ann_backend, self.forest_backend) for key in self.groups[name]}
+
+    def describe(self) -> dict:
+        return {"format": "legacy", "ann_backend": self.ann_backend, "forest_backend": self.forest_backend}
+
+
+class BundleSource:
+    """Reads one version directory written by write_bundle."""
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.mmap = mmap
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+
+    def fingerprint(self, name: str) -> str:
+        return self.manifest['models'][name]['sha256']
+
+    def load(self, name: str) -> dict:
+        entry = self.manifest['models'][name]
+        group = joblib.load(os.path.join(self.path, entry['file']), mmap_mode='r' if self.mmap else None)
+        for artifact in group.values():
+            if hasattr(artifact, 'support_vectors_'):
+                # libsvm's predict_proba rejects read-only buffers; SVM arrays
+                # are small, so give them private copies
+                for attr, value in vars(artifact).items():
+                    if isinstance(value, np.memmap):
+                        setattr(artifact, attr, np.array(value))
+        return group
+
+    def describe(self) -> dict:
+        return {"format": "bundle", "version": self.manifest['version'], "mmap": self.mmap}
+
+
+def write_bundle(artifacts: dict, root: str = BUNDLES_DIR, version: str = None,
+                 metadata: dict = None, make_current: bool = True) -> str:
+    """
+    Write {model name: {artifact key: object}} as a new bundle version and
+    (by default) point CURRENT at it. Returns the bundle directory.
+    """
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(root, version)
+    os.makedirs(path, exist_ok=False)
+
+    manifest = {"version": version, "created_at": time.time(), "models": {}, **(metadata or {})}
+    for name, group in artifacts.items():
+        filename = f'{name}.joblib'
+        # Uncompressed so arrays can be memory-mapped at load time
+        joblib.dump(group, os.path.join(path, filename))
+        manifest["models"][name] = {
+            "file": filename,
+            "sha256": fingerprint([os.path.join(path, filename)]),
+            "artifacts": list(group),
+            "features": list(group.get(f'{name}_features', [])),
+        }
+        if f'{name}_lookup' in group:
+            manifest["models"][name]["lookup_rows"] = group[f'{name}_lookup'].n_rows
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    if make_current:
+        set_current(version, root)
+    return path
+
+
+def set_current(version: str, root: str = BUNDLES_DIR):
+    """Atomically point CURRENT at a bundle version."""
+    tmp = os.path.join(root, 'CURRENT.tmp')
+    with open(tmp, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, 'CURRENT'))
+
+
+def current_bundle_dir(root: str = BUNDLES_DIR):
+    """Directory of the CURRENT bundle, or None if no bundle has been written."""
+    try:
+        with open(os.path.join(root, 'CURRENT')) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(root, version)
+    return path if os.path.exists(os.path.join(path, 'manifest.json')) else None
+
+
+def pack_legacy_artifacts(root: str = BUNDLES_DIR, metadata: dict = None) -> str:
+    """
+    Bundle the current per-file artifacts (NumPy ANN weights and forest
+    arrays, not the .keras model or the scikit-learn forest).
+    """
+    artifacts = {
+        name: {key: load_legacy_artifact(key, 'numpy', 'numpy') for key in keys}
+        for name, keys in MODEL_ARTIFACTS.items()
+    }
+    if not isinstance(artifacts['ann']['ann'], NumpyANN):
+        raise FileNotFoundError(f"{ANN_WEIGHTS_PATH} is missing; run `python ann_numpy.py` first")
+    if not isinstance(artifacts['decision_tree']['decision_tree'], NumpyForest):
+        raise FileNotFoundError(f"{FOREST_ARRAYS_PATH} is missing; run `python forest_numpy.py` first")
+    attach_lookup_tables(artifacts)
+    return write_bundle(artifacts, root, metadata=metadata)
+
+
+def attach_lookup_tables(artifacts: dict):
+    """Add a precomputed <model>_lookup table to every group whose input domain is small enough."""
+    for name, group in artifacts.items():
+        if name == 'ann':
+            continue  # served through the micro-batcher; its domain is far too large anyway
+        table = compile_table(group[f'{name}_features'], group[name], group.get(f'{name}_scaler'))
+        if table is not None:
+            group[f'{name}_lookup'] = table
+
+
+if __name__ == "__main__":
+    path = pack_legacy_artifacts()
+    print(f"[OK] Wrote model bundle {path}")
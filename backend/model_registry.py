@@ -0,0 +1,167 @@
+"""
+Versioned, lazily loaded model bundles
+A ModelBundle holds one version of every model's artifacts; models inside
+it are loaded the first time they are used (or by a background warm-up).
+The ModelRegistry points at the current bundle and hot-reloads by building
+a complete new bundle off to the side and swapping the reference, so
+requests that already hold the old bundle finish on a consistent set of
+scaler + model + features.
+Artifacts come from a source (see model_bundle.py) with
+load(name) -> {key: object}, fingerprint(name) -> str and describe() -> dict.
+"""
+import threading
+import time
+
+
+class ModelBundle:
+    """
+    Dict-like access to one version of the model artifacts
+    (bundle['knn_scaler']) with per-model lazy loading. Each model has its
+    own lock, so loading one model never blocks requests for another.
+    """
+
+    def __init__(self, version: int, groups: dict, source):
+        # groups: model name -> artifact keys the model needs at inference time
+        self.version = version
+        self.created_at = time.time()
+        self.source = source
+        self._groups = groups
+        self._group_of = {key: name for name, keys in groups.items() for key in keys}
+        self._artifacts = {}
+        self._locks = {name: threading.Lock() for name in groups}
+        self._status = {name: {"status": "not_loaded", "load_seconds": None, "error": None} for name in groups}
+        self.fingerprints = {}
+
+    def fingerprint(self, name: str) -> str:
+        return self.source.fingerprint(name)
+
+    def is_ready(self, name: str) -> bool:
+        return self._status[name]["status"] == "ready"
+
+    def load(self, name: str):
+        """Load every artifact of one model; no-op if it's already loaded."""
+        if self.is_ready(name):
+            return
+        with self._locks[name]:
+            if self.is_ready(name):
+                return
+            self._status[name] = {"status": "loading", "load_seconds": None, "error": None}
+            start = time.perf_counter()
+            try:
+                file_hash = self.fingerprint(name)
+                loaded = self.source.load(name)
+                missing = [key for key in self._groups[name] if key not in loaded]
+                if missing:
+                    raise KeyError(f"missing artifacts: {', '.join(missing)}")
+            except Exception as e:
+                self._status[name] = {"status": "error", "load_seconds": None, "error": str(e)}
+                raise
+            self._artifacts.update(loaded)
+            # Optional extras shipped with the model (e.g. its lookup table)
+            self._group_of.update({key: name for key in loaded})
+            self.fingerprints[name] = file_hash
+            self._status[name] = {"status": "ready", "load_seconds": round(time.perf_counter() - start, 4), "error": None}
+
+    def adopt(self, name: str, other: "ModelBundle"):
+        """Share an already-loaded model with another bundle instead of reloading it."""
+        with self._locks[name]:
+            for key, group in other._group_of.items():
+                if group == name and key in other._artifacts:
+                    self._artifacts[key] = other._artifacts[key]
+                    self._group_of[key] = name
+            self.fingerprints[name] = other.fingerprints[name]
+            self._status[name] = {**other._status[name], "reused_from": other.version}
+
+    def load_all(self) -> dict:
+        """Load every model, collecting failures instead of stopping at the first one."""
+        errors = {}
+        for name in self._groups:
+            try:
+                self.load(name)
+            except Exception as e:
+                errors[name] = str(e)
+        return errors
+
+    def status(self) -> dict:
+        return {name: dict(state) for name, state in self._status.items()}
+
+    def get(self, key, default=None):
+        """Optional artifact of a model that is already loaded (no lazy load)."""
+        return self._artifacts.get(key, default)
+
+    def keys(self):
+        return self._artifacts.keys()
+
+    def __getitem__(self, key):
+        if key not in self._artifacts:
+            self.load(self._group_of[key])
+        return self._artifacts[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._artifacts
+
+    def __len__(self) -> int:
+        return len(self._artifacts)
+
+
+class ModelRegistry:
+    """Owns the current ModelBundle and replaces it atomically on reload."""
+
+    def __init__(self, groups: dict, make_source):
+        # make_source() is called for every new bundle so a reload picks up
+        # whatever training wrote since the last one
+        self._groups = groups
+        self._make_source = make_source
+        self._current = self._new_bundle(1)
+        self._reload_lock = threading.Lock()
+        self.last_reload = None
+
+    def _new_bundle(self, version: int) -> ModelBundle:
+        return ModelBundle(version, self._groups, self._make_source())
+
+    def current(self) -> ModelBundle:
+        """The bundle new requests should use; hold on to it for the whole request."""
+        return self._current
+
+    def warm_up(self) -> threading.Thread:
+        """Load all models of the current bundle on a daemon thread."""
+        thread = threading.Thread(target=self._current.load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def reload(self, force: bool = False) -> dict:
+        """
+        Build the next bundle completely, then swap it in with one reference
+        assignment. Models whose artifact files hash the same as the loaded
+        ones are shared with the new bundle unless force=True. If any model
+        fails to load, the current bundle stays in place.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            old = self._current
+            reused, reloaded = [], []
+            try:
+                new = self._new_bundle(old.version + 1)
+                for name in self._groups:
+                    if not force and old.is_ready(name) and old.fingerprints.get(name) == new.fingerprint(name):
+                        new.adopt(name, old)
+                        reused.append(name)
+                    else:
+                        new.load(name)
+                        reloaded.append(name)
+            except Exception as e:
+                self.last_reload = {"status": "failed", "error": str(e), "kept_version": old.version, "at": time.time()}
+                raise
+
+            self._current = new
+            self.last_reload = {
+                "status": "ok",
+                "version": new.version,
+                "previous_version": old.version,
+                "source": new.source.describe(),
+                "reloaded": reloaded,
+                "reused": reused,
+                "seconds": round(time.perf_counter() - start, 4),
+                "at": time.time(),
+            }
+            return self.last_reload
@@ -0,0 +1,318 @@
+"""
+Pluggable nearest-neighbour indexes for the KNN recommender
+Every backend answers kneighbors(Q, k) -> (distances, indices) with rows
+sorted by distance, so IndexedKNN can vote over any of them:
+
+    brute      exact, NumPy ||q||^2 - 2 q.x + ||x||^2 in query chunks
+    kd_tree    exact, sklearn KDTree
+    ball_tree  exact, sklearn BallTree
+    lsh        approximate, p-stable (E2) LSH: candidates share a hash bucket
+               in at least one table, then get exact reranking
+    ivf        approximate, inverted file: k-means lists, the closest
+               n_probe lists are searched exactly
+
+The backend is picked at train time (KNN_INDEX) and pickled with the model.
+Approximate backends fall back to brute force for a query whose candidate
+set is smaller than k. add(X) appends reference rows without refitting the
+hashes or k-means cells (sklearn trees are static, so those are rebuilt).
+"""
+import os
+
+import numpy as np
+from sklearn.neighbors import BallTree, KDTree
+
+# Neighbour index train_models.py builds for the KNN recommender
+KNN_INDEX = os.getenv("KNN_INDEX", "brute")
+
+# Budget for one (queries x rows) distance block, in matrix cells
+_BLOCK_CELLS = 1 << 23
+
+
+def _squared_distances(Q: np.ndarray, X: np.ndarray, X_sq: np.ndarray) -> np.ndarray:
+    d = X_sq[None, :] - 2 * (Q @ X.T) + np.einsum('ij,ij->i', Q, Q)[:, None]
+    return np.maximum(d, 0, out=d)
+
+
+def _top_k(d: np.ndarray, k: int):
+    """Sorted k smallest squared distances per row -> (distances, column indices)."""
+    k = min(k, d.shape[1])
+    part = np.argpartition(d, k - 1, axis=1)[:, :k] if k < d.shape[1] else np.tile(np.arange(d.shape[1]), (len(d), 1))
+    part_d = np.take_along_axis(d, part, axis=1)
+    order = np.argsort(part_d, axis=1, kind='stable')
+    return np.sqrt(np.take_along_axis(part_d, order, axis=1)), np.take_along_axis(part, order, axis=1)
+
+
+class BruteIndex:
+    """Exact search over every stored row."""
+    name = 'brute'
+
+    def fit(self, X: np.ndarray):
+        self._X = np.ascontiguousarray(X, dtype=np.float64)
+        self._X_sq = np.einsum('ij,ij->i', self._X, self._X)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._X)
+
+    def add(self, X: np.ndarray):
+        X = np.asarray(X, dtype=np.float64)
+        self._X = np.concatenate([self._X, X])
+        self._X_sq = np.concatenate([self._X_sq, np.einsum('ij,ij->i', X, X)])
+        return self
+
+    def kneighbors(self, Q: np.ndarray, k: int):
+        Q = np.asarray(Q, dtype=np.float64)
+        chunk = max(1, _BLOCK_CELLS // max(len(self._X), 1))
+        dist, ind = zip(*(_top_k(_squared_distances(Q[i:i + chunk], self._X, self._X_sq), k)
+                          for i in range(0, len(Q), chunk)))
+        return np.vstack(dist), np.vstack(ind)
+
+    def candidates_search(self, q: np.ndarray, candidates: np.ndarray, k: int):
+        """Exact top k of one query among a subset of rows (used by the approximate indexes)."""
+        d = _squared_distances(q[None, :], self._X[candidates], self._X_sq[candidates])
+        dist, cols = _top_k(d, k)
+        return dist[0], candidates[cols[0]]
+
+    def describe(self) -> dict:
+        return {"index": self.name, "rows": len(self)}
+
+
+class TreeIndex:
+    """Exact search through an sklearn KDTree or BallTree."""
+
+    def __init__(self, kind: str = 'kd_tree', leaf_size: int = 40):
+        self.name = kind
+        self.leaf_size = leaf_size
+
+    def fit(self, X: np.ndarray):
+        tree_class = KDTree if self.name == 'kd_tree' else BallTree
+        self._tree = tree_class(np.asarray(X, dtype=np.float64), leaf_size=self.leaf_size)
+        self._n = len(X)
+        return self
+
+    def __len__(self) -> int:
+        return self._n
+
+    def add(self, X: np.ndarray):
+        return self.fit(np.concatenate([np.asarray(self._tree.data), np.asarray(X, dtype=np.float64)]))
+
+    def kneighbors(self, Q: np.ndarray, k: int):
+        return self._tree.query(np.asarray(Q, dtype=np.float64), k=min(k, self._n))
+
+    def describe(self) -> dict:
+        return {"index": self.name, "rows": len(self), "leaf_size": self.leaf_size}
+
+
+class LSHIndex(BruteIndex):
+    """
+    E2LSH: each table hashes a row to floor((a.x + b) / w) for n_hashes random
+    Gaussian projections a. Rows are stored sorted by their combined bucket
+    key per table, so a lookup is one binary search. By default n_hashes
+    grows with the row count so buckets stay small as the data gets denser.
+    """
+    name = 'lsh'
+
+    def __init__(self, n_tables: int = 8, n_hashes: int = None, bucket_width: float = 3.0, seed: int = 42):
+        self.n_tables = n_tables
+        self.n_hashes = n_hashes
+        self.bucket_width = bucket_width
+        self.seed = seed
+
+    def _keys(self, X: np.ndarray) -> np.ndarray:
+        # (n_tables, n_rows) int64 bucket keys
+        codes = np.floor((np.einsum('ij,thj->thi', X, self._projections) + self._offsets[..., None]) / self.bucket_width)
+        return np.einsum('thi,h->ti', codes.astype(np.int64), self._mix)
+
+    def fit(self, X: np.ndarray):
+        super().fit(X)
+        rng = np.random.default_rng(self.seed)
+        # 4 hashes at 10k rows, 8 at 100k, 12 at 1M
+        n_hashes = self.n_hashes or max(4, int(4 * np.log10(max(len(X), 1))) - 12)
+        self._projections = rng.normal(size=(self.n_tables, n_hashes, X.shape[1]))
+        self._offsets = rng.uniform(0, self.bucket_width, size=(self.n_tables, n_hashes))
+        # Odd random multipliers fold the per-hash codes into one key
+        self._mix = rng.integers(1, 1 << 31, size=n_hashes, dtype=np.int64) | 1
+        keys = self._keys(self._X)
+        self._order = np.argsort(keys, axis=1, kind='stable')
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=1)
+        return self
+
+    def add(self, X: np.ndarray):
+        start = len(self)
+        super().add(X)
+        # Insert the new keys into each table's sorted run, after equal keys
+        keys = self._keys(self._X[start:])
+        sorted_keys, order = [], []
+        for t in range(self.n_tables):
+            new = np.argsort(keys[t], kind='stable')
+            at = np.searchsorted(self._sorted_keys[t], keys[t, new], side='right')
+            sorted_keys.append(np.insert(self._sorted_keys[t], at, keys[t, new]))
+            order.append(np.insert(self._order[t], at, start + new))
+        self._sorted_keys, self._order = np.array(sorted_keys), np.array(order)
+        return self
+
+    def kneighbors(self, Q: np.ndarray, k: int):
+        Q = np.asarray(Q, dtype=np.float64)
+        keys = self._keys(Q)
+        dist = np.empty((len(Q), min(k, len(self))))
+        ind = np.empty(dist.shape, dtype=np.int64)
+        for i, q in enumerate(Q):
+            buckets = []
+            for t in range(self.n_tables):
+                lo, hi = np.searchsorted(self._sorted_keys[t], [keys[t, i], keys[t, i] + 1])
+                buckets.append(self._order[t, lo:hi])
+            candidates = np.unique(np.concatenate(buckets))
+            if len(candidates) < dist.shape[1]:
+                candidates = np.arange(len(self))
+            dist[i], ind[i] = self.candidates_search(q, candidates, k)
+        return dist, ind
+
+    def describe(self) -> dict:
+        return {"index": self.name, "rows": len(self), "n_tables": self.n_tables,
+                "n_hashes": len(self._mix), "bucket_width": self.bucket_width}
+
+
+class IVFIndex(BruteIndex):
+    """
+    Inverted file: k-means (trained on a sample) splits the rows into n_lists
+    cells stored contiguously; a query searches its n_probe closest cells.
+    """
+    name = 'ivf'
+
+    def __init__(self, n_lists: int = None, n_probe: int = 8, n_iter: int = 10,
+                 sample_size: int = 50000, seed: int = 42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.sample_size = sample_size
+        self.seed = seed
+
+    def _assign(self, X: np.ndarray) -> np.ndarray:
+        centroid_sq = np.einsum('ij,ij->i', self._centroids, self._centroids)
+        chunk = max(1, _BLOCK_CELLS // len(self._centroids))
+        return np.concatenate([_squared_distances(X[i:i + chunk], self._centroids, centroid_sq).argmin(axis=1)
+                               for i in range(0, len(X), chunk)])
+
+    def fit(self, X: np.ndarray):
+        super().fit(X)
+        rng = np.random.default_rng(self.seed)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(X))))
+        sample = self._X[rng.choice(len(X), size=min(len(X), self.sample_size), replace=False)]
+        self._centroids = sample[rng.choice(len(sample), size=min(n_lists, len(sample)), replace=False)].copy()
+        # Lloyd iterations on the sample; empty cells keep their old centroid
+        for _ in range(self.n_iter):
+            labels = self._assign(sample)
+            counts = np.bincount(labels, minlength=len(self._centroids))
+            sums = np.zeros_like(self._centroids)
+            np.add.at(sums, labels, sample)
+            filled = counts > 0
+            self._centroids[filled] = sums[filled] / counts[filled, None]
+
+        labels = self._assign(self._X)
+        self._order = np.argsort(labels, kind='stable')
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(self._centroids)))])
+        return self
+
+    def add(self, X: np.ndarray):
+        start = len(self)
+        super().add(X)
+        # New rows go to the end of their nearest cell; the centroids stay as trained
+        labels = self._assign(self._X[start:])
+        new = np.argsort(labels, kind='stable')
+        self._order = np.insert(self._order, self._offsets[labels[new] + 1], start + new)
+        self._offsets[1:] += np.cumsum(np.bincount(labels, minlength=len(self._centroids)))
+        return self
+
+    def kneighbors(self, Q: np.ndarray, k: int):
+        Q = np.asarray(Q, dtype=np.float64)
+        centroid_sq = np.einsum('ij,ij->i', self._centroids, self._centroids)
+        n_probe = min(self.n_probe, len(self._centroids))
+        probes = np.argpartition(_squared_distances(Q, self._centroids, centroid_sq), n_probe - 1, axis=1)[:, :n_probe]
+        dist = np.empty((len(Q), min(k, len(self))))
+        ind = np.empty(dist.shape, dtype=np.int64)
+        for i, q in enumerate(Q):
+            candidates = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in probes[i]])
+            if len(candidates) < dist.shape[1]:
+                candidates = np.arange(len(self))
+            dist[i], ind[i] = self.candidates_search(q, candidates, k)
+        return dist, ind
+
+    def describe(self) -> dict:
+        return {"index": self.name, "rows": len(self), "n_lists": len(self._centroids), "n_probe": self.n_probe}
+
+
+def recall_at_k(found_dist: np.ndarray, exact_dist: np.ndarray) -> float:
+    """
+    Share of returned neighbours that are at least as close as the true k-th
+    neighbour; counts ties as hits, which matters on integer-valued features.
+    """
+    kth = exact_dist[:, -1:] * (1 + 1e-9) + 1e-12
+    return float(np.mean(found_dist <= kth))
+
+
+def make_index(kind: str = KNN_INDEX, **params):
+    """Unfitted index for a KNN_INDEX name."""
+    if kind == 'brute':
+        return BruteIndex()
+    if kind in ('kd_tree', 'ball_tree'):
+        return TreeIndex(kind, **params)
+    if kind == 'lsh':
+        return LSHIndex(**params)
+    if kind == 'ivf':
+        return IVFIndex(**params)
+    raise ValueError(f"Unknown KNN index '{kind}'. Use brute, kd_tree, ball_tree, lsh or ivf.")
+
+
+class IndexedKNN:
+    """
+    k-nearest-neighbour classifier over a pluggable index, with the same
+    predict / predict_proba / classes_ interface and voting rules
+    (uniform or inverse-distance weights) as sklearn's KNeighborsClassifier.
+    """
+
+    def __init__(self, index, n_neighbors: int = 5, weights: str = 'uniform'):
+        self.index = index
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+
+    @classmethod
+    def from_sklearn(cls, knn) -> "IndexedKNN":
+        """Brute-force IndexedKNN over a fitted KNeighborsClassifier's training rows."""
+        model = cls(BruteIndex().fit(knn._fit_X), knn.n_neighbors, knn.weights)
+        model.classes_, model._y = knn.classes_, np.asarray(knn._y)
+        return model
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        self.classes_, self._y = np.unique(y, return_inverse=True)
+        self.index.fit(X)
+        return self
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray):
+        """Append labelled reference rows to the index; unseen labels become new classes."""
+        classes = np.union1d(self.classes_, y)
+        self._y = np.concatenate([np.searchsorted(classes, self.classes_)[self._y], np.searchsorted(classes, y)])
+        self.classes_ = classes
+        self.index.add(X)
+        return self
+
+    def kneighbors(self, X: np.ndarray, n_neighbors: int = None):
+        return self.index.kneighbors(X, n_neighbors or self.n_neighbors)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        dist, ind = self.kneighbors(X)
+        if self.weights == 'distance':
+            # Like sklearn: an exact match outvotes every other neighbour
+            exact = dist == 0
+            with np.errstate(divide='ignore'):
+                weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), 1 / dist)
+        else:
+            weights = np.ones_like(dist)
+        proba = np.zeros((len(dist), len(self.classes_)))
+        np.add.at(proba, (np.arange(len(dist))[:, None], self._y[ind]), weights)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def describe(self) -> dict:
+        return {**self.index.describe(), "n_neighbors": self.n_neighbors, "weights": self.weights}
@@ -0,0 +1,79 @@
+"""
+In-process LRU cache for deterministic per-row predictions
+Every model input is a small bounded integer vector, so the same feature
+tuples repeat constantly. Results are keyed by (model, bundle version,
+feature tuple); a reload bumps the bundle version, which makes old entries
+unreachable, and the API also clears the cache when it swaps bundles.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Size-bounded LRU map with hit/miss/eviction counters."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def keys_for(model: str, version: int, X: np.ndarray) -> list:
+        """Canonical keys: the row as a tuple of floats, so 7 and 7.0 match."""
+        return [(model, version, tuple(row)) for row in X.tolist()]
+
+    def lookup(self, keys: list) -> list:
+        """Cached result per key, None where missing."""
+        results = []
+        with self._lock:
+            for key in keys:
+                result = self._entries.get(key)
+                if result is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                results.append(result)
+        return results
+
+    def store(self, keys: list, results: list):
+        if not self.enabled:
+            return
+        with self._lock:
+            for key, result in zip(keys, results):
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "max_entries": self.max_entries,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def cache_from_env() -> PredictionCache:
+    """Build the cache from PREDICTION_CACHE_SIZE (0 disables it)."""
+    return PredictionCache(max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "4096")))
@@ -0,0 +1,212 @@
+"""
+Multi-worker server that loads the models once
+The parent process imports the app, loads every model of the current bundle
+and the product catalog, marks the model arrays read-only and then forks N
+uvicorn workers that accept on one shared socket. Workers inherit the loaded
+models as copy-on-write pages, so a worker only pays for what it writes
+itself (request state, its prediction cache); `uvicorn --workers N` would
+import and load everything N times instead. Arrays the workers read are
+read-only NumPy arrays, or memory-mapped bundle files shared through the
+page cache.
+
+The parent restarts workers that exit. SIGHUP (or GET /models/reload on any
+worker) reloads the models in the parent and replaces the workers one by
+one; SIGUSR1 (or ?force=true) does the same but also reloads models whose
+files are unchanged. SIGTERM / SIGINT stop every worker gracefully. Linux and macOS only
+(needs fork), and only with the NumPy ANN: TensorFlow is not fork-safe.
+
+Usage (from backend/, after training):
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import time
+
+import numpy as np
+import uvicorn
+
+# Seconds a worker gets to finish its requests after SIGTERM before it is killed
+GRACEFUL_TIMEOUT = 30
+
+
+def make_read_only(obj, seen=None) -> int:
+    """Clear the writeable flag of every NumPy array reachable from obj; returns bytes covered."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(make_read_only(item, seen) for item in obj)
+    if isinstance(obj, dict):
+        return sum(make_read_only(item, seen) for item in obj.values())
+    if hasattr(obj, 'support_vectors_'):
+        # libsvm's predict_proba rejects read-only buffers (see BundleSource.load)
+        return 0
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return make_read_only(vars(obj), seen)
+    return 0
+
+
+class Supervisor:
+    """Forks uvicorn workers from the loaded parent and keeps N of them running."""
+
+    def __init__(self, app_module, config: uvicorn.Config, workers: int):
+        self.main = app_module
+        self.config = config
+        self.workers = workers
+        self.socket = config.bind_socket()
+        self.pids = set()
+        self.stopping = False
+        self.reload_requested = False
+        self.reload_force = False
+
+    def prepare(self):
+        """Load every model and the catalog in the parent, then freeze what workers will share."""
+        errors = self.main.load_models()
+        if errors:
+            raise SystemExit("Models failed to load; not starting workers")
+        bundle = self.main.registry.current()
+        try:
+            catalog = self.main.ProductCatalog.load()
+            catalog.warm([bundle[f'{name}_features'] for name in self.main.RECOMMEND_MODELS])
+            self.main.product_catalog = catalog
+        except FileNotFoundError:
+            print("data/products.csv not found; /recommend/top-k will answer 503")
+        shared = make_read_only([bundle[key] for key in bundle.keys()])
+        # Objects allocated so far are never scanned by the workers' GC, which would dirty their pages
+        gc.collect()
+        gc.freeze()
+        print(f"✓ Models loaded once (bundle version {bundle.version}, {shared / 2**20:.1f} MB of read-only arrays)")
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            # Worker: uvicorn installs its own SIGINT / SIGTERM handling
+            for signum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            self.main.serve_parent_pid = os.getppid()
+            try:
+                uvicorn.Server(self.config).run(sockets=[self.socket])
+            finally:
+                os._exit(0)
+        self.pids.add(pid)
+        return pid
+
+    def stop_worker(self, pid: int):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reap(self) -> list:
+        """Pids of workers that have exited since the last call."""
+        exited = []
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            self.pids.discard(pid)
+            exited.append(pid)
+        return exited
+
+    def reload(self):
+        """Reload the models in the parent, then replace the workers one at a time."""
+        force, self.reload_requested, self.reload_force = self.reload_force, False, False
+        gc.unfreeze()
+        try:
+            summary = self.main.registry.reload(force)
+        except Exception as e:
+            print(f"Reload failed, workers keep the current models: {e}")
+            gc.freeze()
+            return
+        self.main.prediction_cache.clear()
+        self.main.product_catalog = None
+        self.prepare()
+        print(f"✓ Reloaded: {summary}")
+        for pid in list(self.pids):
+            # The new worker shares the socket, so connections keep being accepted
+            self.spawn()
+            self.pids.discard(pid)
+            self.stop_worker(pid)
+            self.wait_for([pid], GRACEFUL_TIMEOUT)
+
+    def wait_for(self, pids: list, timeout: float):
+        deadline = time.monotonic() + timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+            time.sleep(0.05)
+        for pid in remaining:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+    def run(self):
+        self.prepare()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGUSR1, self._request_reload)
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"✓ {self.workers} workers serving on http://{self.config.host}:{self.config.port} (parent pid {os.getpid()})")
+        while not self.stopping:
+            for pid in self.reap():
+                print(f"Worker {pid} exited; starting a replacement")
+                self.spawn()
+            if self.reload_requested:
+                self.reload()
+            time.sleep(0.2)
+        workers = list(self.pids)
+        for pid in workers:
+            self.stop_worker(pid)
+        self.wait_for(workers, GRACEFUL_TIMEOUT)
+        self.socket.close()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _request_reload(self, signum, frame):
+        # A forced request still applies if a plain one arrives before the reload runs
+        self.reload_force = self.reload_force or signum == signal.SIGUSR1
+        self.reload_requested = True
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        raise SystemExit("serve.py needs fork(); use `uvicorn main:app` on this platform")
+    # Split the cores between workers unless the inference pool size is set explicitly
+    os.environ.setdefault("INFERENCE_WORKERS", str(max(1, (os.cpu_count() or 1) // args.workers)))
+    # Workers must not warm up on their own: the parent has loaded everything
+    os.environ["MODEL_WARMUP"] = "0"
+    import main
+    if main.ANN_BACKEND == "keras":
+        raise SystemExit("serve.py forks after loading the models and TensorFlow is not fork-safe; "
+                         "use ANN_BACKEND=numpy or `uvicorn main:app --workers N`")
+
+    config = uvicorn.Config(main.app, host=args.host, port=args.port, log_level=args.log_level)
+    Supervisor(main, config, max(1, args.workers)).run()
+
+
+if __name__ == "__main__":
+    main_cli()
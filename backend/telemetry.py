@@ -0,0 +1,348 @@
+"""
+Prometheus metrics for the API
+Counters, gauges and fixed-bucket histograms kept in process and rendered in
+the Prometheus text format by GET /metrics, without a client library. On the
+request path an observation is a perf_counter delta and a deque append;
+bucketing waits until /metrics is scraped. That is cheap enough to time every
+request and every inference stage:
+
+    request    validate (body parsing + pydantic), handler, serialize
+    inference  queue, cache, lookup, scale, predict, predict_proba,
+               inverse_transform, format (per model)
+
+Numbers other components already keep (cache hits, pool queue, model load
+times) are read from them at scrape time instead of being counted twice.
+"""
+import bisect
+import collections
+import contextvars
+import functools
+import inspect
+import math
+import os
+import threading
+from time import perf_counter
+
+from fastapi.routing import APIRoute
+
+# Latency buckets in seconds (100 us .. 10 s) and row-count buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """
+    One metric family. Series are keyed by their label values; `collect`
+    (optional) returns {label values: value} at scrape time instead.
+
+    The hot path only appends (label values, amount) to a deque, which is
+    atomic under the GIL; the appends are folded into the series under the
+    lock at scrape time, or once MAX_PENDING of them have piled up.
+    """
+    kind = "untyped"
+    MAX_PENDING = 65536
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._values = {} if labels else {(): 0}
+
+    def _record(self, labels: tuple, amount):
+        self._pending.append((labels, amount))
+        if len(self._pending) > self.MAX_PENDING:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending = self._pending
+            while pending:
+                labels, amount = pending.popleft()
+                self._fold(labels, amount)
+
+    def _fold(self, labels: tuple, amount):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _snapshot(self) -> dict:
+        self._flush()
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        """(name suffix, label names, label values, value) per exposed line."""
+        values = self.collect() if self.collect is not None else self._snapshot()
+        for key, value in sorted(values.items()):
+            if value is not None:
+                yield "", self.labels, key, value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._record(labels, amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        self._record(labels, amount)
+
+    def dec(self, *labels, amount=1):
+        self._record(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value: float, *labels):
+        self._record(labels, value)
+
+    def observe_each(self, values: dict, *labels):
+        """One observation per {last label value: value}, e.g. every stage of one call, in one append."""
+        self._record(labels, values)
+
+    def _fold(self, labels: tuple, value):
+        if isinstance(value, dict):
+            for last, each in value.items():
+                self._fold(labels + (last,), each)
+            return
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        # Buckets are inclusive upper bounds (le), as in Prometheus
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        self._flush()
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        bounds = [_format_value(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                yield "_bucket", self.labels + ("le",), key + (bound,), cumulative
+            yield "_sum", self.labels, key, total
+            yield "_count", self.labels, key, count
+
+
+class StageTimer:
+    """
+    Splits one model call into named stages: mark(stage) closes the stage
+    that just ran, done(stage) closes the last one and records them all.
+    """
+    __slots__ = ("_telemetry", "model", "rows", "stages", "_last")
+
+    def __init__(self, telemetry: "Telemetry", model: str, rows: int):
+        self._telemetry = telemetry
+        self.model = model
+        self.rows = rows
+        self.stages = {}
+        self._last = perf_counter()
+
+    def mark(self, stage: str):
+        now = perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def done(self, stage: str):
+        self.mark(stage)
+        self._telemetry.observe_stages(self.model, self.stages, self.rows)
+
+
+class _NullTimer:
+    """StageTimer stand-in when metrics are disabled."""
+
+    def mark(self, stage: str):
+        pass
+
+    def done(self, stage: str):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+# Per-request timestamps, set by MetricsMiddleware and filled in by timed endpoints
+_request_trace = contextvars.ContextVar("skinsync_request_trace", default=None)
+
+
+class RequestTrace:
+    __slots__ = ("started", "endpoint_started", "endpoint_finished", "response_started", "status")
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.endpoint_started = self.endpoint_finished = self.response_started = None
+        self.status = None
+
+
+def time_endpoint(endpoint):
+    """Wrap an endpoint so the current request records when it starts and returns."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            trace = _request_trace.get()
+            if trace is None:
+                return await endpoint(*args, **kwargs)
+            trace.endpoint_started = perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                trace.endpoint_finished = perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            trace = _request_trace.get()
+            if trace is None:
+                return endpoint(*args, **kwargs)
+            trace.endpoint_started = perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                trace.endpoint_finished = perf_counter()
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """APIRoute whose endpoint is wrapped by time_endpoint (set as the router's route_class)."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, time_endpoint(endpoint), **kwargs)
+
+
+class Telemetry:
+    """The API's metric families plus helpers for the hot path."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics = []
+        self.requests = self.counter(
+            "skinsync_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+        self.request_seconds = self.histogram(
+            "skinsync_http_request_duration_seconds", "End-to-end HTTP request latency", ("method", "route"))
+        self.request_stage_seconds = self.histogram(
+            "skinsync_http_request_stage_seconds",
+            "HTTP request latency by stage: validate (parsing + validation), handler, serialize", ("route", "stage"))
+        self.in_flight = self.gauge("skinsync_http_requests_in_flight", "HTTP requests being served")
+        self.stage_seconds = self.histogram(
+            "skinsync_inference_stage_seconds", "Inference latency by model and stage", ("model", "stage"))
+        self.rows = self.histogram(
+            "skinsync_inference_rows", "Rows per model call (ANN: per coalesced batch)", ("model",), ROW_BUCKETS)
+        self.batch_rows = self.histogram(
+            "skinsync_batch_request_rows", "Rows per /predict/{model}/batch request", ("model",), ROW_BUCKETS)
+
+    def _add(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = (), collect=None) -> Counter:
+        return self._add(Counter(name, help, labels, collect))
+
+    def gauge(self, name: str, help: str, labels: tuple = (), collect=None) -> Gauge:
+        return self._add(Gauge(name, help, labels, collect))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+    def stage_timer(self, model: str, rows: int):
+        return StageTimer(self, model, rows) if self.enabled else NULL_TIMER
+
+    def observe_stages(self, model: str, stages: dict, rows: int = None):
+        """Record {stage: seconds} for one model call."""
+        if not self.enabled:
+            return
+        self.stage_seconds.observe_each(stages, model)
+        if rows is not None:
+            self.rows.observe(rows, model)
+
+    def observe_request(self, method: str, route: str, trace: RequestTrace):
+        finished = perf_counter()
+        self.requests.inc(method, route, str(trace.status or 500))
+        self.request_seconds.observe(finished - trace.started, method, route)
+        if trace.endpoint_started is None:
+            # Rejected before the endpoint ran (422, 404): all of it was parsing / validation
+            stages = {"validate": (trace.response_started or finished) - trace.started}
+        else:
+            stages = {"validate": trace.endpoint_started - trace.started}
+            if trace.endpoint_finished is not None:
+                stages["handler"] = trace.endpoint_finished - trace.endpoint_started
+                if trace.response_started is not None:
+                    stages["serialize"] = trace.response_started - trace.endpoint_finished
+        self.request_stage_seconds.observe_each(stages, route)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task hop): counts requests,
+    tracks the in-flight gauge and times each request by route template.
+    """
+
+    def __init__(self, app, telemetry: Telemetry):
+        self.app = app
+        self.telemetry = telemetry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = RequestTrace()
+        token = _request_trace.set(trace)
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                trace.response_started = perf_counter()
+            await send(message)
+
+        self.telemetry.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            self.telemetry.in_flight.dec()
+            _request_trace.reset(token)
+            # Route templates (/predict/{model_name}/batch), never raw paths, keep label sets bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.telemetry.observe_request(scope["method"], route, trace)
+
+
+def telemetry_from_env() -> Telemetry:
+    """Build from METRICS_ENABLED (1 by default, 0 turns off per-request timing)."""
+    return Telemetry(enabled=os.getenv("METRICS_ENABLED", "1") == "1")
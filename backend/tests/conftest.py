@@ -0,0 +1,5 @@
+# The backend modules are imported top-level, as the API and scripts do from backend/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+"""
+Parity of the NumPy inference engines with the models they replace
+Small models built on the spot: a Keras stack with BatchNormalization (folded
+by fold_batchnorm) and a random forest (flattened by flatten_forest). Both
+engines must answer like the originals, including after a save / load round
+trip.
+
+Run from backend/:
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_numpy import NumpyForest
+
+
+def test_ann_matches_keras_with_batchnorm(tmp_path):
+    keras = pytest.importorskip("tensorflow").keras
+    from ann_numpy import NumpyANN, fold_batchnorm
+
+    model = keras.Sequential([
+        keras.layers.Input(shape=(6,)),
+        keras.layers.Dense(16, activation='relu'),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dropout(0.3),
+        keras.layers.Dense(8, activation='relu'),
+        # Two in a row, one without scale: both fold into the last Dense layer
+        keras.layers.BatchNormalization(),
+        keras.layers.BatchNormalization(scale=False),
+        keras.layers.Dense(1),
+    ])
+    # Fresh BatchNormalization layers are the identity; give them real statistics
+    rng = np.random.default_rng(0)
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.BatchNormalization):
+            # Weights are [gamma], [beta], moving_mean, moving_variance; gamma and variance stay positive
+            weights = [rng.normal(0, 0.5, w.shape) for w in layer.get_weights()]
+            if layer.scale:
+                weights[0] = rng.uniform(0.5, 2.0, weights[0].shape)
+            weights[-1] = rng.uniform(0.5, 2.0, weights[-1].shape)
+            layer.set_weights(weights)
+
+    X = rng.normal(0, 3, size=(256, 6)).astype(np.float32)
+    expected = model.predict(X, verbose=0)
+    engine = NumpyANN(fold_batchnorm(model))
+    np.testing.assert_allclose(engine.predict(X), expected, rtol=1e-5, atol=1e-5)
+
+    engine.save(tmp_path / 'ann_weights.npz')
+    np.testing.assert_allclose(NumpyANN.load(tmp_path / 'ann_weights.npz').predict(X), expected, rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("continuous", [False, True])
+def test_forest_matches_sklearn_exactly(tmp_path, continuous):
+    rng = np.random.default_rng(0)
+    # Small-integer features like the API's, or floats whose thresholds are not float32 values
+    X = rng.uniform(0, 10, size=(600, 6)) if continuous else rng.integers(0, 11, size=(600, 6)).astype(np.float64)
+    y = (X[:, 0] + X[:, 1] * (X[:, 2] > 4) + rng.normal(0, 2, len(X)) > 8).astype(int)
+    forest = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+    # Rows beyond the training range, between its integers, and exactly on
+    # every split threshold as scikit-learn sees it (cast to float32)
+    thresholds = np.concatenate([tree.tree_.threshold[tree.tree_.feature >= 0] for tree in forest.estimators_])
+    on_threshold = np.repeat(thresholds.astype(np.float32).astype(np.float64)[:, None], X.shape[1], axis=1)
+    X_check = np.vstack([X, np.round(rng.uniform(-2, 12, size=(400, 6)), 1), on_threshold])
+    engine = NumpyForest.from_sklearn(forest)
+    np.testing.assert_array_equal(engine.predict_proba(X_check), forest.predict_proba(X_check))
+    np.testing.assert_array_equal(engine.predict(X_check), forest.predict(X_check))
+
+    engine.save(tmp_path / 'forest.npz')
+    np.testing.assert_array_equal(NumpyForest.load(tmp_path / 'forest.npz').predict_proba(X_check),
+                                  forest.predict_proba(X_check))
@@ -1,10 +1,18 @@
 """
 Train all 6 ML models for SkinSync
+Independent trainers run concurrently in a process pool, each with its own
+share of the cores:
+    python train_models.py                    # all six
+    python train_models.py --only svm,knn     # a subset; other metrics are kept
 """
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder, RobustScaler
 from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.naive_bayes import GaussianNB
@@ -13,29 +21,44 @@ from sklearn.svm import SVC
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, mean_squared_error, classification_report, r2_score
-import numpy as np
-import pandas as pd
-import joblib
+import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import os
 import json
+from threadpoolctl import threadpool_limits
+from ann_numpy import ANN_WEIGHTS_PATH, export_ann
+from forest_numpy import FOREST_ARRAYS_PATH, export_forest
+from dataset import load_training_data
+from hyperparameter_search import STRATEGIES, search
+from model_bundle import MODEL_ARTIFACTS, pack_legacy_artifacts
+from neighbor_index import KNN_INDEX, IndexedKNN, make_index, recall_at_k
 
 # Create models directory
 os.makedirs('models', exist_ok=True)
 
 # Reproducibility
-np.random.seed(42)
+SEED = 42
+np.random.seed(SEED)
+
+# Cores one trainer may use for grid-search workers, BLAS and TensorFlow.
+# run_trainer sets it per trainer so concurrent trainers never ask for more
+# cores than the machine has (nested n_jobs=-1 would oversubscribe).
+N_JOBS = -1
+
+# Hyperparameter search strategy (grid, halving or random) and, for random
+# search, a time budget per model; set from the command line
+SEARCH = {"strategy": "halving", "budget_seconds": None}
 
 def load_data():
-    """Load the combined dataset"""
+    """Load the shared, typed training matrix (interactions joined with users and products)"""
     print("Loading data...")
-    df = pd.read_csv('data/combined_data.csv')
-    print(f"[OK] Loaded {len(df)} records")
-    return df
+    data = load_training_data()
+    print(f"[OK] Loaded {len(data)} records ({data.nbytes() / 1e6:.1f} MB, from {data.source})")
+    return data
 
-def train_linear_regression(df):
+def train_linear_regression(data):
     """
     Algorithm 1: Linear Regression
     Purpose: Predict skin hydration level based on user characteristics
@@ -45,8 +68,8 @@ def train_linear_regression(df):
     
     # Features for predicting hydration
     features = ['age', 'oil_production', 'sensitivity_level', 'pore_size']
-    X = df[features].values
-    y = df['hydration_level'].values
+    X = data.features(features)
+    y = data.target('hydration_level')
     
     # Split data with stratification consideration
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -59,12 +82,11 @@ def train_linear_regression(df):
     # Hyperparameter tuning for Ridge Regression
     ridge = Ridge()
     param_grid = {"alpha": [0.1, 0.3, 1.0, 3.0, 10.0]}
-    grid = GridSearchCV(ridge, param_grid, cv=5, scoring='r2', n_jobs=-1)
-    grid.fit(X_train_scaled, y_train)
-    model = grid.best_estimator_
+    result = search(ridge, param_grid, X_train_scaled, y_train, 'r2', n_jobs=N_JOBS, **SEARCH)
+    model = result.best_estimator
     
-    # Cross-validation score
-    cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='r2')
+    # Cross-validation score (the best candidate's folds from the search)
+    cv_scores = result.cv_scores
     print(f"[OK] Cross-validation R² scores: {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
     
     # Evaluate
@@ -86,15 +108,17 @@ def train_linear_regression(df):
     print("[OK] Model saved")
     metrics = {
         "algorithm": "Ridge Regression",
+        "search": result.summary(),
         "cv_r2_mean": float(cv_scores.mean()),
         "cv_r2_std": float(cv_scores.std()),
         "train_rmse": float(train_rmse),
         "test_rmse": float(test_rmse),
         "test_r2": float(r2),
+        "train_rows": int(len(X_train)),
     }
     return model, scaler, metrics
 
-def train_naive_bayes(df):
+def train_naive_bayes(data):
     """
     Algorithm 2: Naive Bayes
     Purpose: Classify skin type based on user characteristics
@@ -104,8 +128,8 @@ def train_naive_bayes(df):
     
     # Features for skin type classification
     features = ['age', 'oil_production', 'hydration_level', 'sensitivity_level', 'pore_size']
-    X = df[features].values
-    y = df['skin_type'].values
+    X = data.features(features)
+    y = data.target('skin_type')
     
     # Encode labels
     label_encoder = LabelEncoder()
@@ -122,12 +146,11 @@ def train_naive_bayes(df):
     # Hyperparameter tuning for variance smoothing
     gnb = GaussianNB()
     param_grid = {"var_smoothing": [1e-9, 1e-8, 1e-7, 1e-6]}
-    grid = GridSearchCV(gnb, param_grid, cv=5, scoring='accuracy', n_jobs=-1)
-    grid.fit(X_train_scaled, y_train)
-    model = grid.best_estimator_
+    result = search(gnb, param_grid, X_train_scaled, y_train, 'accuracy', n_jobs=N_JOBS, **SEARCH)
+    model = result.best_estimator
     
-    # Cross-validation
-    cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='accuracy')
+    # Cross-validation (the best candidate's folds from the search)
+    cv_scores = result.cv_scores
     print(f"[OK] Cross-validation Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
     
     # Evaluate
@@ -146,6 +169,7 @@ def train_naive_bayes(df):
     print("[OK] Model saved")
     metrics = {
         "algorithm": "Naive Bayes",
+        "search": result.summary(),
         "cv_acc_mean": float(cv_scores.mean()),
         "cv_acc_std": float(cv_scores.std()),
         "train_acc": float(train_acc),
@@ -153,7 +177,7 @@ def train_naive_bayes(df):
     }
     return model, scaler, label_encoder, metrics
 
-def train_knn(df):
+def train_knn(data):
     """
     Algorithm 3: K-Nearest Neighbors
     Purpose: Recommend products based on similar users
@@ -163,8 +187,8 @@ def train_knn(df):
     
     # Features for product recommendation
     features = ['age', 'oil_production', 'hydration_level', 'sensitivity_level', 'pore_size', 'wrinkle_score']
-    X = df[features].values
-    y = df['would_recommend'].values
+    X = data.features(features)
+    y = data.target('would_recommend')
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -176,10 +200,14 @@ def train_knn(df):
     
     # Hyperparameter tuning for KNN
     param_grid = {'n_neighbors': [3, 5, 7, 9, 11], 'weights': ['uniform', 'distance']}
-    grid_search = GridSearchCV(KNeighborsClassifier(), param_grid, cv=5, scoring='accuracy')
-    grid_search.fit(X_train_scaled, y_train)
-    model = grid_search.best_estimator_
-    print(f"[OK] Best KNN parameters: {grid_search.best_params_}")
+    result = search(KNeighborsClassifier(), param_grid, X_train_scaled, y_train, 'accuracy', n_jobs=N_JOBS, **SEARCH)
+    print(f"[OK] Best KNN parameters: {result.best_params}")
+    
+    # Serve the tuned parameters over the neighbour index chosen by KNN_INDEX
+    model = IndexedKNN(make_index(KNN_INDEX), **result.best_params).fit(X_train_scaled, y_train)
+    exact = IndexedKNN(make_index('brute'), **result.best_params).fit(X_train_scaled, y_train)
+    recall = recall_at_k(model.kneighbors(X_test_scaled)[0], exact.kneighbors(X_test_scaled)[0])
+    print(f"[OK] Neighbour index: {KNN_INDEX} (recall@{model.n_neighbors} vs brute force: {recall:.4f})")
     
     # Evaluate
     train_acc = accuracy_score(y_train, model.predict(X_train_scaled))
@@ -196,13 +224,18 @@ def train_knn(df):
     print("[OK] Model saved")
     metrics = {
         "algorithm": "KNN",
+        "search": result.summary(),
         "train_acc": float(train_acc),
         "test_acc": float(test_acc),
-        "best_params": grid_search.best_params_,
+        "cv_acc_mean": float(result.cv_scores.mean()),
+        "cv_acc_std": float(result.cv_scores.std()),
+        "best_params": result.best_params,
+        "index": model.describe(),
+        "index_recall": float(recall),
     }
     return model, scaler, metrics
 
-def train_svm(df):
+def train_svm(data):
     """
     Algorithm 4: Support Vector Machine
     Purpose: Detect potential allergen risks
@@ -212,8 +245,8 @@ def train_svm(df):
     
     # Features for allergen detection
     features = ['sensitivity_level', 'has_fragrance', 'has_alcohol', 'is_hypoallergenic']
-    X = df[features].values
-    y = df['had_reaction'].values
+    X = data.features(features)
+    y = data.target('had_reaction')
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -229,12 +262,11 @@ def train_svm(df):
         "C": [0.5, 1, 3, 10],
         "gamma": ['scale', 0.1, 0.01, 0.001]
     }
-    grid = GridSearchCV(svm, param_grid, cv=5, scoring='accuracy', n_jobs=-1)
-    grid.fit(X_train_scaled, y_train)
-    model = grid.best_estimator_
+    result = search(svm, param_grid, X_train_scaled, y_train, 'accuracy', n_jobs=N_JOBS, **SEARCH)
+    model = result.best_estimator
     
-    # Cross-validation
-    cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='accuracy')
+    # Cross-validation (the best candidate's folds from the search)
+    cv_scores = result.cv_scores
     print(f"[OK] Cross-validation Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
     
     # Evaluate
@@ -252,15 +284,16 @@ def train_svm(df):
     print("[OK] Model saved")
     metrics = {
         "algorithm": "SVM",
+        "search": result.summary(),
         "cv_acc_mean": float(cv_scores.mean()),
         "cv_acc_std": float(cv_scores.std()),
         "train_acc": float(train_acc),
         "test_acc": float(test_acc),
-        "best_params": grid.best_params_,
+        "best_params": result.best_params,
     }
     return model, scaler, metrics
 
-def train_decision_tree(df):
+def train_decision_tree(data):
     """
     Algorithm 5: Decision Tree
     Purpose: Classify product suitability
@@ -269,32 +302,34 @@ def train_decision_tree(df):
     print("Purpose: Classify product suitability based on user profile")
     
     # Create suitability target based on satisfaction score
-    df['is_suitable'] = (df['satisfaction_score'] >= 7).astype(int)
+    is_suitable = (data.target('satisfaction_score') >= 7).astype(int)
     
     # Features for suitability classification
     features = ['age', 'sensitivity_level', 'oil_production', 'hydration_level', 
                 'suitable_for_oily', 'suitable_for_dry', 'suitable_for_sensitive',
                 'has_fragrance', 'has_alcohol']
-    X = df[features].values
-    y = df['is_suitable'].values
+    X = data.features(features)
+    y = is_suitable
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Use Random Forest for better performance (ensemble of decision trees)
-    base = RandomForestClassifier(random_state=42, n_jobs=-1, class_weight='balanced')
+    # The grid search parallelizes over candidates; trees inside one fit stay serial
+    base = RandomForestClassifier(random_state=42, n_jobs=1, class_weight='balanced')
     param_grid = {
         "n_estimators": [100, 200, 300],
         "max_depth": [10, 15, 20, None],
         "min_samples_split": [2, 5, 10],
         "min_samples_leaf": [1, 2, 4]
     }
-    grid = GridSearchCV(base, param_grid, cv=5, scoring='accuracy', n_jobs=-1)
-    grid.fit(X_train, y_train)
-    model = grid.best_estimator_
+    # Successive halving grows the forest (n_estimators) rather than the training set
+    result = search(base, param_grid, X_train, y_train, 'accuracy', n_jobs=N_JOBS,
+                    resource='n_estimators', **SEARCH)
+    model = result.best_estimator
     
-    # Cross-validation
-    cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring='accuracy')
+    # Cross-validation (the best candidate's folds from the search)
+    cv_scores = result.cv_scores
     print(f"[OK] Cross-validation Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
     
     # Evaluate
@@ -314,19 +349,24 @@ def train_decision_tree(df):
     joblib.dump(model, 'models/decision_tree.pkl')
     joblib.dump(features, 'models/decision_tree_features.pkl')
     
+    # Export flattened node arrays for the NumPy serving engine
+    max_diff = export_forest(model, X_test, FOREST_ARRAYS_PATH)
+    print(f"[OK] NumPy export matches scikit-learn (max |diff| {max_diff:.2e})")
+    
     print("[OK] Model saved")
     metrics = {
         "algorithm": "RandomForest (Suitability)",
+        "search": result.summary(),
         "cv_acc_mean": float(cv_scores.mean()),
         "cv_acc_std": float(cv_scores.std()),
         "train_acc": float(train_acc),
         "test_acc": float(test_acc),
-        "best_params": grid.best_params_,
+        "best_params": result.best_params,
         "feature_importance": {feat: float(imp) for feat, imp in zip(features, importance)}
     }
     return model, metrics
 
-def train_ann(df):
+def train_ann(data):
     """
     Algorithm 6: Artificial Neural Network
     Purpose: Advanced skin condition and satisfaction prediction
@@ -339,8 +379,8 @@ def train_ann(df):
                 'pore_size', 'wrinkle_score', 'suitable_for_oily', 'suitable_for_dry',
                 'suitable_for_sensitive', 'has_fragrance', 'has_alcohol', 'is_hypoallergenic']
     
-    X = df[features].values
-    y = df['satisfaction_score'].values
+    X = data.features(features)
+    y = data.target('satisfaction_score')
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -410,6 +450,10 @@ def train_ann(df):
     joblib.dump(scaler, 'models/ann_scaler.pkl')
     joblib.dump(features, 'models/ann_features.pkl')
     
+    # Export BatchNorm-folded weights for TensorFlow-free serving
+    max_diff = export_ann(model, X_test_scaled, ANN_WEIGHTS_PATH)
+    print(f"[OK] NumPy export matches Keras (max |diff| {max_diff:.2e})")
+    
     print("[OK] Model saved")
     metrics = {
         "algorithm": "ANN",
@@ -420,44 +464,130 @@ def train_ann(df):
     }
     return model, scaler, metrics
 
-def main():
-    """Train all models"""
+# Trainer per model, heaviest first so the longest jobs start earliest
+TRAINERS = {
+    'decision_tree': train_decision_tree,
+    'ann': train_ann,
+    'svm': train_svm,
+    'knn': train_knn,
+    'naive_bayes': train_naive_bayes,
+    'linear_regression': train_linear_regression,
+}
+
+def cpu_seconds():
+    """CPU time of this process plus its finished children (joblib workers)."""
+    try:
+        import resource
+    except ImportError:
+        return time.process_time()
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def run_trainer(name, n_jobs, search_options=None, data=None):
+    """Train one model on a budget of n_jobs cores; returns (name, metrics with timings)."""
+    global N_JOBS
+    N_JOBS = n_jobs
+    SEARCH.update(search_options or {})
+    if data is None:
+        data = load_training_data()  # memory-mapped cache written by main()
+    
+    # Same seeds for every trainer, so results don't depend on what ran before in this process
+    keras.utils.set_random_seed(SEED)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(n_jobs)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass  # TensorFlow already initialized in this process (sequential run)
+    
+    wall_start, cpu_start = time.perf_counter(), cpu_seconds()
+    with threadpool_limits(limits=n_jobs):
+        metrics = TRAINERS[name](data)[-1]
+    # Stop joblib's worker processes so their CPU time is counted
+    from joblib.externals.loky import get_reusable_executor
+    get_reusable_executor().shutdown(wait=True)
+    
+    metrics["training"] = {
+        "wall_seconds": round(time.perf_counter() - wall_start, 3),
+        "cpu_seconds": round(cpu_seconds() - cpu_start, 3),
+        "n_jobs": n_jobs,
+    }
+    return name, metrics
+
+def main(argv=None):
+    """Train all models (or the --only subset)"""
+    parser = argparse.ArgumentParser(description="Train the SkinSync models")
+    parser.add_argument("--only", help="comma-separated models to train, e.g. svm,knn (default: all)")
+    parser.add_argument("--workers", type=int, help="trainers run at once (default: one per core, at most one per model)")
+    parser.add_argument("--search", choices=STRATEGIES, default=SEARCH["strategy"], help="hyperparameter search strategy")
+    parser.add_argument("--search-budget", type=float, help="seconds per model for --search random (default: first 20 candidates)")
+    args = parser.parse_args(argv)
+    search_options = {"strategy": args.search, "budget_seconds": args.search_budget}
+    
+    names = list(TRAINERS)
+    if args.only:
+        names = [name.strip() for name in args.only.split(',')]
+        unknown = [name for name in names if name not in TRAINERS]
+        if unknown:
+            parser.error(f"unknown model(s) {', '.join(unknown)}; choose from {', '.join(MODEL_ARTIFACTS)}")
+        names = [name for name in TRAINERS if name in names]
+    
     print("="*60)
     print("SkinSync ML Model Training Pipeline")
     print("="*60)
     
-    # Load data
-    df = load_data()
-    
-    # Train all models
+    # Load data (also refreshes the memory-mapped cache the workers read)
+    data = load_data()
+    
+    # Split the cores between concurrent trainers
+    cores = os.cpu_count() or 1
+    workers = max(1, min(args.workers or cores, len(names)))
+    n_jobs = max(1, cores // workers)
+    print(f"Training {', '.join(names)} with {workers} worker(s) x {n_jobs} core(s), {args.search} search")
+    
+    start = time.perf_counter()
+    results = {}
+    if workers == 1:
+        for name in names:
+            results.update([run_trainer(name, n_jobs, search_options, data)])
+    else:
+        # spawn, not fork: TensorFlow is not fork-safe
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for future in as_completed([pool.submit(run_trainer, name, n_jobs, search_options) for name in names]):
+                results.update([future.result()])
+    elapsed = time.perf_counter() - start
+    
+    # Keep metrics of models that weren't retrained this run
     metrics_report = {}
-    _, _, lr_metrics = train_linear_regression(df)
-    _, _, _, nb_model_metrics = train_naive_bayes(df)
-    _, _, knn_metrics = train_knn(df)
-    _, _, svm_metrics = train_svm(df)
-    _, dt_metrics = train_decision_tree(df)
-    _, _, ann_metrics = train_ann(df)
-
-    metrics_report["linear_regression"] = lr_metrics
-    metrics_report["naive_bayes"] = nb_model_metrics
-    metrics_report["knn"] = knn_metrics
-    metrics_report["svm"] = svm_metrics
-    metrics_report["decision_tree"] = dt_metrics
-    metrics_report["ann"] = ann_metrics
+    if os.path.exists('models/metrics.json'):
+        with open('models/metrics.json') as f:
+            metrics_report = json.load(f)
+    metrics_report.update(results)
+    metrics_report = {name: metrics_report[name] for name in MODEL_ARTIFACTS if name in metrics_report}
 
     with open('models/metrics.json', 'w') as f:
         json.dump(metrics_report, f, indent=2)
     
+    # Consolidated, memory-mappable bundle the API serves from
+    bundle_path = pack_legacy_artifacts(metadata={"metrics": metrics_report})
+    
     print("\n" + "="*60)
-    print("[OK] All models trained successfully!")
+    print(f"[OK] Trained {len(results)} model(s) in {elapsed:.1f}s")
     print("="*60)
+    for name in names:
+        timing = results[name]["training"]
+        searched = results[name].get("search")
+        score = f"   best CV {searched['best_score']:.4f} ({searched['fits']} fits)" if searched else ""
+        print(f"  {name:<18} wall {timing['wall_seconds']:>8.1f}s   cpu {timing['cpu_seconds']:>8.1f}s{score}")
     print("\nModels saved in 'models/' directory:")
     print("  1. linear_regression.pkl - Hydration prediction")
     print("  2. naive_bayes.pkl - Skin type classification")
     print("  3. knn.pkl - Product recommendation")
     print("  4. svm.pkl - Allergen risk detection")
     print("  5. decision_tree.pkl - Product suitability")
+    print("     decision_tree_forest.npz - NumPy serving arrays for the random forest")
     print("  6. ann_model.keras - Advanced satisfaction prediction")
+    print("     ann_weights.npz - NumPy serving weights for the ANN")
+    print(f"\nServing bundle: {bundle_path} (models/bundles/CURRENT)")
 
 if __name__ == "__main__":
     main()
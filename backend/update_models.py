@@ -0,0 +1,252 @@
+"""
+Incremental model updates from a delta of new interactions
+Folds new interactions into the trained models without retraining from
+scratch, so an update costs time proportional to the delta, then publishes
+a new bundle version:
+    python update_models.py data/delta.csv          # or a .parquet file
+    python update_models.py data/delta.csv --only naive_bayes,knn
+
+    naive_bayes        GaussianNB.partial_fit, running scaler statistics
+    linear_regression  SGD passes over the delta, warm-started from the Ridge
+                       coefficients (the RobustScaler's median/IQR has no
+                       running update and stays fixed)
+    knn                delta rows appended to the neighbour index (the scaler
+                       stays fixed so old and new rows share one space)
+    ann                a few epochs of fine-tuning from models/ann_model.keras,
+                       kept only if they lower the loss on a held-out fifth
+                       of the delta; running scaler statistics
+
+A StandardScaler update is an affine change of the scaled features, so the
+model is first re-expressed in the new coordinates and predicts exactly as
+before; only the delta itself then changes it. The SVM and random forest
+have no incremental fit and carry over unchanged until the next
+train_models.py run. The delta is added to data/interactions/ as a new
+part, so that run includes it.
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+from sklearn.metrics import accuracy_score, mean_absolute_error
+from sklearn.neighbors import KNeighborsClassifier
+
+from ann_numpy import ANN_MODEL_PATH, ANN_WEIGHTS_PATH, export_ann
+from dataset import append_interactions, join_interactions, read_part
+from model_bundle import MODEL_ARTIFACTS, load_legacy_artifact, pack_legacy_artifacts
+from neighbor_index import IndexedKNN
+
+SEED = 42
+
+# Passes of SGD over the delta for the linear model
+SGD_EPOCHS = 5
+
+# Fine-tuning epochs and Adam learning rate (the training rate) for the ANN
+ANN_FINE_TUNE_EPOCHS = 3
+ANN_FINE_TUNE_LR = 1e-3
+
+def update_scaler(scaler, X):
+    """
+    Fold X into a StandardScaler's running mean / variance. Returns (a, c)
+    with new_scaled = a * old_scaled + c, to re-express models fitted on
+    the old scaled features.
+    """
+    mean, scale = scaler.mean_.copy(), scaler.scale_.copy()
+    scaler.partial_fit(X)
+    return scale / scaler.scale_, (mean - scaler.mean_) / scaler.scale_
+
+def sgd_from_ridge(ridge, train_rows=None):
+    """SGDRegressor with the Ridge solution as its starting point and a matching L2 penalty."""
+    # Ridge penalizes alpha * ||w||^2 against the summed loss, SGD against the mean
+    alpha = ridge.alpha / train_rows if train_rows else 0.0001
+    sgd = SGDRegressor(alpha=alpha, learning_rate='invscaling', eta0=0.01, random_state=SEED)
+    sgd.coef_ = np.asarray(ridge.coef_, dtype=np.float64).copy()
+    sgd.intercept_ = np.atleast_1d(ridge.intercept_).astype(np.float64)
+    sgd.n_features_in_ = ridge.n_features_in_
+    # Continue the learning-rate schedule as if SGD had seen the training rows
+    sgd.t_ = float(train_rows or 0) + 1
+    return sgd
+
+def update_linear_regression(delta, metrics):
+    print("\n=== Updating Linear Regression Model ===")
+    model = load_legacy_artifact('linear_regression')
+    scaler = load_legacy_artifact('linear_regression_scaler')
+    features = load_legacy_artifact('linear_regression_features')
+    X = scaler.transform(delta.features(features))
+    y = delta.target('hydration_level').astype(np.float64)
+
+    r2_before = model.score(X, y)
+    if not isinstance(model, SGDRegressor):
+        model = sgd_from_ridge(model, metrics.get('train_rows'))
+        print(f"[OK] Converted Ridge to SGDRegressor (alpha {model.alpha:.2e})")
+    rng = np.random.default_rng(SEED)
+    for _ in range(SGD_EPOCHS):
+        order = rng.permutation(len(X))
+        model.partial_fit(X[order], y[order])
+    r2_after = model.score(X, y)
+    print(f"[OK] Delta R²: {r2_before:.4f} before, {r2_after:.4f} after")
+
+    joblib.dump(model, 'models/linear_regression.pkl')
+    return {"delta_r2_before": float(r2_before), "delta_r2_after": float(r2_after)}
+
+def update_naive_bayes(delta, metrics):
+    print("\n=== Updating Naive Bayes Model ===")
+    model = load_legacy_artifact('naive_bayes')
+    scaler = load_legacy_artifact('naive_bayes_scaler')
+    encoder = load_legacy_artifact('naive_bayes_encoder')
+    features = load_legacy_artifact('naive_bayes_features')
+    X = delta.features(features).astype(np.float64)
+    labels = delta.target('skin_type')
+    known = np.isin(labels, encoder.classes_)
+    X, y = X[known], encoder.transform(labels[known])
+
+    acc_before = accuracy_score(y, model.predict(scaler.transform(X)))
+    # Per-class Gaussians move with the scaled features; var_ carries epsilon_ unscaled
+    a, c = update_scaler(scaler, X)
+    model.theta_ = a * model.theta_ + c
+    model.var_ = a ** 2 * (model.var_ - model.epsilon_) + model.epsilon_
+    model.partial_fit(scaler.transform(X), y)
+    acc_after = accuracy_score(y, model.predict(scaler.transform(X)))
+    print(f"[OK] Delta accuracy: {acc_before:.4f} before, {acc_after:.4f} after")
+
+    joblib.dump(model, 'models/naive_bayes.pkl')
+    joblib.dump(scaler, 'models/naive_bayes_scaler.pkl')
+    return {"delta_acc_before": float(acc_before), "delta_acc_after": float(acc_after)}
+
+def update_knn(delta, metrics):
+    print("\n=== Updating KNN Model ===")
+    model = load_legacy_artifact('knn')
+    scaler = load_legacy_artifact('knn_scaler')
+    features = load_legacy_artifact('knn_features')
+    if isinstance(model, KNeighborsClassifier):
+        model = IndexedKNN.from_sklearn(model)  # knn.pkl from before neighbor_index.py
+    X = scaler.transform(delta.features(features))
+    y = delta.target('would_recommend')
+
+    acc_before = accuracy_score(y, model.predict(X))
+    model.partial_fit(X, y)
+    acc_after = accuracy_score(y, model.predict(X))
+    print(f"[OK] Appended {len(X)} rows to the {model.index.name} index ({len(model.index)} rows)")
+    print(f"[OK] Delta accuracy: {acc_before:.4f} before, {acc_after:.4f} after")
+
+    joblib.dump(model, 'models/knn.pkl')
+    return {"delta_acc_before": float(acc_before), "delta_acc_after": float(acc_after), "index_rows": len(model.index)}
+
+def update_ann(delta, metrics):
+    print("\n=== Fine-tuning Artificial Neural Network ===")
+    # Imported here: TensorFlow is only needed when the ANN is updated
+    from tensorflow import keras
+    keras.utils.set_random_seed(SEED)
+    model = keras.models.load_model(ANN_MODEL_PATH)
+    scaler = load_legacy_artifact('ann_scaler')
+    features = load_legacy_artifact('ann_features')
+    X = delta.features(features).astype(np.float64)
+    y = delta.target('satisfaction_score')
+
+    mae_before = mean_absolute_error(y, model.predict(scaler.transform(X), verbose=0).ravel())
+    # Absorb the scaler change into the first Dense layer: old_scaled = (new_scaled - c) / a
+    a, c = update_scaler(scaler, X)
+    first = model.layers[0]
+    W, b = first.get_weights()
+    first.set_weights([W / a[:, None], b - (c / a) @ W])
+
+    # Fine-tune on the first 80% of the delta; keep the result only if the
+    # last 20% (like validation_split in training) got better
+    X_scaled = scaler.transform(X)
+    n_fit = max(1, int(len(X) * 0.8))
+    val_X, val_y = X_scaled[n_fit:], y[n_fit:]
+    start_weights = model.get_weights()
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=ANN_FINE_TUNE_LR), loss='mse', metrics=['mae'])
+    val_before = model.evaluate(val_X, val_y, verbose=0)[0] if len(val_X) else None
+    model.fit(X_scaled[:n_fit], y[:n_fit], epochs=ANN_FINE_TUNE_EPOCHS, batch_size=32, verbose=0)
+    val_after = model.evaluate(val_X, val_y, verbose=0)[0] if len(val_X) else None
+    kept = val_before is None or val_after < val_before
+    if val_before is None:
+        print(f"[OK] Fine-tuned for {ANN_FINE_TUNE_EPOCHS} epochs (delta too small to validate)")
+    elif kept:
+        print(f"[OK] Fine-tuned for {ANN_FINE_TUNE_EPOCHS} epochs (validation MSE {val_before:.4f} -> {val_after:.4f})")
+    else:
+        model.set_weights(start_weights)
+        print(f"[OK] Fine-tuning did not improve validation MSE ({val_before:.4f} -> {val_after:.4f}); weights kept")
+    mae_after = mean_absolute_error(y, model.predict(X_scaled, verbose=0).ravel())
+    print(f"[OK] Delta MAE: {mae_before:.4f} before, {mae_after:.4f} after")
+
+    model.save(ANN_MODEL_PATH)
+    joblib.dump(scaler, 'models/ann_scaler.pkl')
+    max_diff = export_ann(model, X_scaled, ANN_WEIGHTS_PATH)
+    print(f"[OK] NumPy export matches Keras (max |diff| {max_diff:.2e})")
+    return {"delta_mae_before": float(mae_before), "delta_mae_after": float(mae_after), "fine_tuned": bool(kept)}
+
+# Models with an incremental update
+UPDATERS = {
+    'ann': update_ann,
+    'knn': update_knn,
+    'naive_bayes': update_naive_bayes,
+    'linear_regression': update_linear_regression,
+}
+
+def main(argv=None):
+    """Update the models from a delta file and publish a new bundle version"""
+    parser = argparse.ArgumentParser(description="Update the SkinSync models from new interactions")
+    parser.add_argument("delta", help="new interactions (.csv or .parquet) with user_id, product_id and the targets")
+    parser.add_argument("--only", help=f"comma-separated models to update (default: {','.join(UPDATERS)})")
+    parser.add_argument("--no-store", action="store_true", help="don't add the delta to data/interactions/")
+    args = parser.parse_args(argv)
+
+    names = list(UPDATERS)
+    if args.only:
+        names = [name.strip() for name in args.only.split(',')]
+        unknown = [name for name in names if name not in UPDATERS]
+        if unknown:
+            parser.error(f"no incremental update for {', '.join(unknown)}; choose from {', '.join(UPDATERS)}")
+    if not os.path.exists('models/metrics.json'):
+        parser.error("no trained models; run train_models.py first")
+
+    print("="*60)
+    print("SkinSync Incremental Model Update")
+    print("="*60)
+
+    start = time.perf_counter()
+    interactions = read_part(args.delta)
+    delta = join_interactions(interactions)
+    print(f"[OK] Loaded {len(delta)} new interactions from {args.delta}")
+    if len(delta) < len(interactions):
+        print(f"[WARN] Dropped {len(interactions) - len(delta)} rows with an unknown user or product")
+    if not len(delta):
+        raise SystemExit("Nothing to update")
+
+    with open('models/metrics.json') as f:
+        metrics_report = json.load(f)
+    timings = {}
+    for name in names:
+        model_start = time.perf_counter()
+        result = UPDATERS[name](delta, metrics_report.get(name, {}))
+        timings[name] = time.perf_counter() - model_start
+        record = metrics_report.setdefault(name, {}).setdefault("incremental", {"updates": 0, "rows": 0})
+        record["updates"] += 1
+        record["rows"] += len(delta)
+        record["last"] = {**result, "rows": len(delta), "seconds": round(timings[name], 3)}
+
+    if not args.no_store:
+        part = append_interactions(interactions)
+        print(f"\n[OK] Added the delta to the training data as {part}")
+
+    with open('models/metrics.json', 'w') as f:
+        json.dump(metrics_report, f, indent=2)
+    update = {"delta": args.delta, "rows": len(delta), "models": [name for name in MODEL_ARTIFACTS if name in names]}
+    bundle_path = pack_legacy_artifacts(metadata={"metrics": metrics_report, "update": update})
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*60)
+    print(f"[OK] Updated {len(names)} model(s) with {len(delta)} interactions in {elapsed:.1f}s")
+    print("="*60)
+    for name in names:
+        print(f"  {name:<18} {timings[name]:>8.2f}s")
+    print(f"\nServing bundle: {bundle_path} (models/bundles/CURRENT)")
+    print("A running API picks it up on GET /models/reload")
+
+if __name__ == "__main__":
+    main()